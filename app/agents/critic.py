@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from typing import Any, Dict
+import re
+from typing import Any, Dict, List, Tuple
 
 from langchain_core.prompts import ChatPromptTemplate
 
-from llm import llm
+from llm import ainvoke_prompt, get_llm, invoke_prompt
 
-CRITIC_PROMPT = ChatPromptTemplate.from_template(
+_CRITIC_INSTRUCTIONS = (
     "You are a careful scientific reviewer. Judge SUMMARY against NOTES. "
     "Mark as wrong any claim not supported by NOTES. Mark as wrong any number not supported by NOTES. Mark as wrong any dataset not supported by NOTES. Mark as wrong any metric not supported by NOTES. Mark as wrong any conclusion not supported by NOTES.\n\n"
     "STRICT RULES:\n\n"
@@ -28,16 +29,52 @@ CRITIC_PROMPT = ChatPromptTemplate.from_template(
     "- <short fix #1>\n"
     "- <short fix #2>\n"
     "- <optional fix #3>\n\n"
-    "NOTES:\n{notes}\n\nSUMMARY:\n{summary}"
 )
 
+CRITIC_PROMPT = ChatPromptTemplate.from_template(
+    _CRITIC_INSTRUCTIONS + "NOTES:\n{notes}\n\nSUMMARY:\n{summary}"
+)
+
+# Mit Belegstellen aus dem Retrieval-Index. Critic sieht dann Originaltext zu
+# strittigen Aussagen und muss nicht nur den Notes glauben.
+CRITIC_EVIDENCE_PROMPT = ChatPromptTemplate.from_template(
+    _CRITIC_INSTRUCTIONS
+    + "EVIDENCE contains passages from the paper retrieved for the claims in SUMMARY. "
+    "A claim or number that EVIDENCE states explicitly counts as supported even if NOTES omit it. "
+    "A claim that EVIDENCE contradicts is wrong. Quote EVIDENCE passage numbers like [3] when you cite them.\n\n"
+    "NOTES:\n{notes}\n\nEVIDENCE:\n{evidence}\n\nSUMMARY:\n{summary}"
+)
+
+
+_IMPROVEMENTS_HEADING = re.compile(r"^\W*improvements\W*:?\s*$", re.IGNORECASE)
+_BULLET = re.compile(r"^(?:[-*•]|\d+[.)])\s*")
+
+
+def improvements(critic_text: str) -> List[str]:
+    """Punkte unter "Improvements:" aus Critic-Ausgabe, ohne Bullet-Zeichen."""
+    items: List[str] = []
+    in_list = False
+    for line in (critic_text or "").splitlines():
+        stripped = line.strip()
+        if _IMPROVEMENTS_HEADING.match(stripped):
+            in_list = True
+        elif in_list and stripped:
+            items.append(_BULLET.sub("", stripped).strip())
+    return [item for item in items if item]
+
 
 def _clean_output_text(raw_output: str) -> str:
     """Removes leading/trailing whitespace."""
     return (raw_output or "").strip()
 
 
-def run(notes: str = "", summary: str = "", *args, **kwargs) -> Dict[str, Any]:
+def _prompt_and_inputs(notes: str, summary: str, evidence: str) -> Tuple[ChatPromptTemplate, Dict[str, str]]:
+    if evidence:
+        return CRITIC_EVIDENCE_PROMPT, {"notes": notes, "summary": summary, "evidence": evidence}
+    return CRITIC_PROMPT, {"notes": notes, "summary": summary}
+
+
+def run(notes: str = "", summary: str = "", *args, evidence: str = "", **kwargs) -> Dict[str, Any]:
     if args and not kwargs:
         notes_text = args[0]
         summary_text = args[1] if len(args) > 1 else ""
@@ -45,8 +82,16 @@ def run(notes: str = "", summary: str = "", *args, **kwargs) -> Dict[str, Any]:
         notes_text = kwargs.get("notes", notes) or ""
         summary_text = kwargs.get("summary", summary) or ""
     
-    prompt_chain = CRITIC_PROMPT | llm
-    llm_response = prompt_chain.invoke({"notes": notes_text, "summary": summary_text})
-    critique_text = _clean_output_text(getattr(llm_response, "content", llm_response))
+    prompt, inputs = _prompt_and_inputs(notes_text, summary_text, evidence or "")
+    llm_response = invoke_prompt("critic", prompt, inputs, get_llm())
+    critique_text = _clean_output_text(llm_response)
     
     return {"critic": critique_text, "critique": critique_text}
+
+
+async def arun(notes: str = "", summary: str = "", evidence: str = "") -> Dict[str, Any]:
+    """Async-Variante über ainvoke. Gleiches Ergebnis-Format wie run()."""
+    prompt, inputs = _prompt_and_inputs(notes or "", summary or "", evidence or "")
+    llm_response = await ainvoke_prompt("critic", prompt, inputs, get_llm())
+    critique_text = _clean_output_text(llm_response)
+    return {"critic": critique_text, "critique": critique_text}
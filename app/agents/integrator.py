@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from langchain_core.prompts import ChatPromptTemplate
 
-from llm import llm
+from llm import ainvoke_prompt, get_llm, invoke_prompt
 
 INTEGRATOR_PROMPT = ChatPromptTemplate.from_template(
     "Create a final Meta Summary. Combine SUMMARY with CRITIC. Base everything on NOTES. "
@@ -39,7 +39,21 @@ def run(notes: str = "", summary: str = "", critic: str = "", *args, **kwargs) -
         summary_text = kwargs.get("summary", summary) or ""
         critic_text = kwargs.get("critic", critic) or ""
     
-    prompt_chain = INTEGRATOR_PROMPT | llm
-    llm_response = prompt_chain.invoke({"notes": notes_text, "summary": summary_text, "critic": critic_text})
-    output_text = getattr(llm_response, "content", llm_response)
+    output_text = invoke_prompt(
+        "integrator",
+        INTEGRATOR_PROMPT,
+        {"notes": notes_text, "summary": summary_text, "critic": critic_text},
+        get_llm(),
+    )
+    return _clean_output_text(output_text)
+
+
+async def arun(notes: str = "", summary: str = "", critic: str = "") -> str:
+    """Async-Variante über ainvoke."""
+    output_text = await ainvoke_prompt(
+        "integrator",
+        INTEGRATOR_PROMPT,
+        {"notes": notes or "", "summary": summary or "", "critic": critic or ""},
+        get_llm(),
+    )
     return _clean_output_text(output_text)
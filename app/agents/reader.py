@@ -1,13 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures as cf
+import contextvars
+from typing import Any, Dict, List, Optional
+
 from langchain_core.prompts import ChatPromptTemplate
 
-from llm import llm
+from llm import ainvoke_prompt, get_llm, invoke_prompt
+from utils import (
+    DEFAULT_READER_CHUNK_CHARS,
+    DEFAULT_READER_PARALLELISM,
+    chunk_sections,
+    reader_chunk_settings,
+    use_chunked_reader,
+)
 
-READER_PROMPT = ChatPromptTemplate.from_template(
-    "You are a careful scientific note-taker. Work only with TEXT below. "
-    "Do not invent facts. Do not include author info. "
-    "If a field is missing in TEXT, write 'not reported'. Do not guess.\n\n"
+# Schema und Regeln werden auch von Chunk- und Merge-Prompts genutzt
+_NOTES_SCHEMA = (
     "Return notes in this Markdown schema:\n\n"
     "Title: <copy exactly from TEXT. If multi-line, join with spaces. Use 'not reported' only if no title exists>\n"
     "Objective: <1-2 sentences or 'not reported'>\n"
@@ -20,6 +30,9 @@ READER_PROMPT = ChatPromptTemplate.from_template(
     "Limitations: <short phrase or 'not reported'>\n"
     "Applications/Use-cases: <short phrase or 'not reported'>\n"
     "Notes: <any other important detail or 'not reported'>\n\n"
+)
+
+_NOTES_RULES = (
     "STRICT RULES:\n\n"
     "Title:\n"
     "- Copy title exactly from TEXT. Do not shorten. Do not change.\n"
@@ -37,7 +50,42 @@ READER_PROMPT = ChatPromptTemplate.from_template(
     "- If tables are present, include context. Include model/system. Include dataset/task. Include metric name. Include split.\n"
     "- If only one result is present, extract it. Also extract next-best outcome. Next-best could be baseline comparison, comparison test, another metric, or p-value.\n"
     "- If no metrics exist, write exactly: No quantitative metrics reported in provided text.\n\n"
-    "TEXT:\n{content}"
+)
+
+READER_PROMPT = ChatPromptTemplate.from_template(
+    "You are a careful scientific note-taker. Work only with TEXT below. "
+    "Do not invent facts. Do not include author info. "
+    "If a field is missing in TEXT, write 'not reported'. Do not guess.\n\n"
+    + _NOTES_SCHEMA
+    + _NOTES_RULES
+    + "TEXT:\n{content}"
+)
+
+# Map-Schritt: Notizen aus einem Ausschnitt. Gleiches Schema, damit Merge
+# Feld für Feld zusammenführen kann.
+READER_CHUNK_PROMPT = ChatPromptTemplate.from_template(
+    "You are a careful scientific note-taker. TEXT is excerpt {index} of {total} from one paper. "
+    "Write partial notes for this excerpt only. Work only with TEXT below. "
+    "Do not invent facts. Do not include author info. "
+    "If a field is missing in this excerpt, write 'not reported'. Do not guess.\n\n"
+    + _NOTES_SCHEMA
+    + _NOTES_RULES
+    + "TEXT:\n{content}"
+)
+
+# Reduce-Schritt: Teilnotizen zu einem Satz Notizen im bekannten Schema
+READER_MERGE_PROMPT = ChatPromptTemplate.from_template(
+    "You are a careful scientific note-taker. PARTIAL NOTES below were extracted from consecutive excerpts "
+    "of the same paper, in order. Merge them into one set of notes. Work only with PARTIAL NOTES. "
+    "Do not invent facts. Do not add numbers that are not in PARTIAL NOTES.\n\n"
+    "MERGE RULES:\n"
+    "- Title: take the title from the earliest excerpt that reports one.\n"
+    "- A field is 'not reported' only if every excerpt says 'not reported'.\n"
+    "- Results: keep every quantitative outcome from all excerpts, drop exact duplicates. "
+    "Write 'No quantitative metrics reported in provided text.' only if no excerpt lists a metric.\n"
+    "- Other fields: combine short, remove repetition.\n\n"
+    + _NOTES_SCHEMA
+    + "PARTIAL NOTES:\n{partial_notes}"
 )
 
 
@@ -60,11 +108,114 @@ def run(input_text: str) -> str:
     Titel, Ziel, Methoden, Ergebnisse usw. Prompt ziemlich detailliert mit
     vielen Regeln. Brauchen konsistentes Ausgabeformat.
     
-    getattr() etwas defensiv. Manchmal llm_response String, manchmal Objekt
-    mit .content. Behandelt beide Fälle.
+    invoke_prompt() fragt zuerst den Antwort-Cache. Gleicher Paper-Text mit
+    gleichem Modell kostet dann keinen zweiten API-Aufruf.
+    """
+    output_text = invoke_prompt("reader", READER_PROMPT, {"content": input_text}, get_llm())
+    return _clean_output_text(output_text)
+
+
+async def arun(input_text: str) -> str:
+    """Async-Variante von run() über ainvoke."""
+    output_text = await ainvoke_prompt("reader", READER_PROMPT, {"content": input_text}, get_llm())
+    return _clean_output_text(output_text)
+
+
+def run_chunked(
+    input_text: str,
+    chunk_chars: int = DEFAULT_READER_CHUNK_CHARS,
+    max_workers: int = DEFAULT_READER_PARALLELISM,
+) -> str:
     """
-    prompt_chain = READER_PROMPT | llm
-    llm_response = prompt_chain.invoke({"content": input_text})
-    # Beide Fälle behandeln: String-Antworten und Objekt-Antworten
-    output_text = getattr(llm_response, "content", llm_response)
+    Map-Reduce-Reader für lange Papers.
+
+    Text wird an Abschnittsgrenzen in Chunks geteilt. Jeder Chunk bekommt
+    eigene Teilnotizen, parallel in Threads. Merge-Aufruf führt sie ins
+    gewohnte Schema zusammen. Kürzere Prompts, Wartezeit etwa ein Chunk
+    plus Merge statt ein riesiger Prompt.
+
+    Passt alles in einen Chunk, normaler Reader. Spart Merge-Aufruf.
+    """
+    chunks = chunk_sections(input_text or "", chunk_chars)
+    if len(chunks) <= 1:
+        return run(input_text)
+
+    def _read_chunk(index: int, chunk: str) -> str:
+        output_text = invoke_prompt(
+            "reader",
+            READER_CHUNK_PROMPT,
+            {"content": chunk, "index": index, "total": len(chunks)},
+            get_llm(),
+            stream=False,
+        )
+        return _clean_output_text(output_text)
+
+    workers = max(1, min(int(max_workers), len(chunks)))
+    with cf.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reader-chunk") as executor:
+        # Eigener Kontext pro Task, damit Cache-Zähler des Laufs mitzählen
+        futures = [
+            executor.submit(contextvars.copy_context().run, _read_chunk, index, chunk)
+            for index, chunk in enumerate(chunks, 1)
+        ]
+        partial_notes = [future.result() for future in futures]
+
+    output_text = invoke_prompt(
+        "reader", READER_MERGE_PROMPT, {"partial_notes": _join_partial_notes(partial_notes)}, get_llm()
+    )
+    return _clean_output_text(output_text)
+
+
+async def arun_chunked(
+    input_text: str,
+    chunk_chars: int = DEFAULT_READER_CHUNK_CHARS,
+    max_workers: int = DEFAULT_READER_PARALLELISM,
+) -> str:
+    """Async-Variante von run_chunked. Semaphore statt Thread-Pool begrenzt Parallelität."""
+    chunks = chunk_sections(input_text or "", chunk_chars)
+    if len(chunks) <= 1:
+        return await arun(input_text)
+
+    semaphore = asyncio.Semaphore(max(1, int(max_workers)))
+
+    async def _read_chunk(index: int, chunk: str) -> str:
+        async with semaphore:
+            output_text = await ainvoke_prompt(
+                "reader",
+                READER_CHUNK_PROMPT,
+                {"content": chunk, "index": index, "total": len(chunks)},
+                get_llm(),
+                stream=False,
+            )
+        return _clean_output_text(output_text)
+
+    partial_notes = await asyncio.gather(
+        *(_read_chunk(index, chunk) for index, chunk in enumerate(chunks, 1))
+    )
+    output_text = await ainvoke_prompt(
+        "reader", READER_MERGE_PROMPT, {"partial_notes": _join_partial_notes(partial_notes)}, get_llm()
+    )
     return _clean_output_text(output_text)
+
+
+def _join_partial_notes(partial_notes: List[str]) -> str:
+    total = len(partial_notes)
+    return "\n\n".join(
+        f"--- Excerpt {index} of {total} ---\n{notes}"
+        for index, notes in enumerate(partial_notes, 1)
+    )
+
+
+def run_with_config(input_text: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Wählt Reader-Modus nach config (reader_mode). Von LangChain und LangGraph genutzt."""
+    if not use_chunked_reader(input_text, config):
+        return run(input_text)
+    chunk_chars, parallelism = reader_chunk_settings(config)
+    return run_chunked(input_text, chunk_chars=chunk_chars, max_workers=parallelism)
+
+
+async def arun_with_config(input_text: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Async-Variante von run_with_config."""
+    if not use_chunked_reader(input_text, config):
+        return await arun(input_text)
+    chunk_chars, parallelism = reader_chunk_settings(config)
+    return await arun_chunked(input_text, chunk_chars=chunk_chars, max_workers=parallelism)
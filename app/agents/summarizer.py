@@ -1,8 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import concurrent.futures as cf
+import contextvars
+import re
+from typing import List, Optional, Sequence, Tuple
+
 from langchain_core.prompts import ChatPromptTemplate
 
-from llm import llm
+from llm import ainvoke_prompt, get_llm, invoke_prompt
 
 SUMMARIZER_PROMPT = ChatPromptTemplate.from_template(
     "Produce a concise scientific summary from NOTES. Do not invent facts. Do not include citations.\n\n"
@@ -26,12 +32,183 @@ SUMMARIZER_PROMPT = ChatPromptTemplate.from_template(
 )
 
 
+# Überarbeitung nach Critic. Statt ganzer Neufassung nur geänderte Felder,
+# wird lokal in vorige Zusammenfassung eingesetzt. Kleines max_tokens reicht.
+REVISION_PROMPT = ChatPromptTemplate.from_template(
+    "Revise SUMMARY with minimal edits so that it fixes the REVIEW points. NOTES are the only source of facts. "
+    "Ignore review points that NOTES cannot support.\n\n"
+    "Output only the fields that change, each starting with its label exactly as in SUMMARY "
+    "(Title, Objective, Method, Results, Limitations, Practical Takeaways). "
+    "Write each changed field in full. For Practical Takeaways write the label line followed by all three bullets. "
+    "Do not repeat unchanged fields. If nothing needs to change, output exactly: NO CHANGES\n\n"
+    "STRICT RULES:\n"
+    "- Never add numbers that are not in NOTES Results. Copy metric values exactly.\n"
+    "- If NOTES Results has no metrics, Results must be exactly 'No quantitative metrics reported in provided text.'\n"
+    "- Title must be copied exactly from NOTES Title.\n\n"
+    "NOTES:\n{notes}\n\nSUMMARY:\n{summary}\n\nREVIEW:\n{review}"
+)
+
+# Größter Abstand der Temperaturen bei Best-of-N. Gleiche Temperatur hieße
+# bei temperature=0 und Antwort-Cache N-mal dieselbe Zusammenfassung.
+CANDIDATE_TEMPERATURE_STEP = 0.3
+
+NO_CHANGES = "NO CHANGES"
+DEFAULT_REVISION_MAX_TOKENS = 256
+
+SUMMARY_FIELDS = ("Title", "Objective", "Method", "Results", "Limitations", "Practical Takeaways")
+_FIELD_ALIASES = {
+    "title": "Title",
+    "objective": "Objective",
+    "method": "Method",
+    "methods": "Method",
+    "result": "Results",
+    "results": "Results",
+    "limitation": "Limitations",
+    "limitations": "Limitations",
+    "practical takeaways": "Practical Takeaways",
+    "takeaways": "Practical Takeaways",
+}
+# Kein "-" vorne, sonst wären Takeaway-Bullets wie "- Method: ..." neue Felder
+_FIELD_LINE = re.compile(
+    r"^[\s*_#>]*(" + "|".join(sorted(_FIELD_ALIASES, key=len, reverse=True)) + r")[\s*_]*:",
+    re.IGNORECASE,
+)
+
+Block = Tuple[Optional[str], List[str]]
+
+
+def _blocks(text: str) -> List[Block]:
+    """Zerlegt Zusammenfassung in (Feld, Zeilen). Text vor erstem Feld hat Feld None."""
+    blocks: List[Block] = []
+    for line in (text or "").strip().splitlines():
+        match = _FIELD_LINE.match(line)
+        if match:
+            blocks.append((_FIELD_ALIASES[match.group(1).lower()], [line.rstrip()]))
+        elif blocks:
+            blocks[-1][1].append(line.rstrip())
+        elif line.strip():
+            blocks.append((None, [line.rstrip()]))
+    # Leerzeilen zwischen Feldern gehören zu keinem Feld
+    for _, lines in blocks:
+        while lines and not lines[-1].strip():
+            lines.pop()
+    return blocks
+
+
+def apply_revision(summary: str, patch: str) -> Tuple[str, List[str]]:
+    """
+    Setzt geänderte Felder aus patch in summary ein.
+
+    Gibt (neue Zusammenfassung, geänderte Felder) zurück. Felder, die in
+    summary fehlen, kommen an ihre Stelle in SUMMARY_FIELDS. Ohne erkennbare
+    Felder (NO CHANGES, Geplauder) bleibt summary unverändert.
+    """
+    changes = {name: lines for name, lines in _blocks(patch) if name is not None}
+    if not changes:
+        return summary, []
+    blocks = _blocks(summary)
+    present = {name for name, _ in blocks}
+    changed: List[str] = []
+    merged: List[Block] = []
+    for name, lines in blocks:
+        if name in changes and changes[name] != lines:
+            changed.append(name)
+            lines = changes[name]
+        merged.append((name, lines))
+    for name in SUMMARY_FIELDS:
+        if name in changes and name not in present:
+            position = len(merged)
+            for i, (existing, _) in enumerate(merged):
+                if existing in SUMMARY_FIELDS and SUMMARY_FIELDS.index(existing) > SUMMARY_FIELDS.index(name):
+                    position = i
+                    break
+            merged.insert(position, (name, changes[name]))
+            changed.append(name)
+    text = "\n".join(line for _, lines in merged for line in lines)
+    return text.strip(), changed
+
+
+def _review_text(review: List[str]) -> str:
+    return "\n".join(f"- {item}" for item in review) or "- Fix any rule violations."
+
+
 def _clean_output_text(raw_output: str) -> str:
     return (raw_output or "").strip()
 
 
 def run(structured_notes: str) -> str:
-    prompt_chain = SUMMARIZER_PROMPT | llm
-    llm_response = prompt_chain.invoke({"notes": structured_notes})
-    output_text = getattr(llm_response, "content", llm_response)
+    output_text = invoke_prompt("summarizer", SUMMARIZER_PROMPT, {"notes": structured_notes}, get_llm())
+    return _clean_output_text(output_text)
+
+
+async def arun(structured_notes: str) -> str:
+    output_text = await ainvoke_prompt("summarizer", SUMMARIZER_PROMPT, {"notes": structured_notes}, get_llm())
+    return _clean_output_text(output_text)
+
+
+def revise(structured_notes: str, summary: str, review: List[str], max_tokens: int = DEFAULT_REVISION_MAX_TOKENS) -> Tuple[str, List[str]]:
+    """Gezielte Überarbeitung. Gibt (Zusammenfassung, geänderte Felder) zurück."""
+    inputs = {"notes": structured_notes, "summary": summary, "review": _review_text(review)}
+    output_text = invoke_prompt("reviser", REVISION_PROMPT, inputs, get_llm(max_tokens))
+    return apply_revision(summary, _clean_output_text(output_text))
+
+
+async def arevise(structured_notes: str, summary: str, review: List[str], max_tokens: int = DEFAULT_REVISION_MAX_TOKENS) -> Tuple[str, List[str]]:
+    inputs = {"notes": structured_notes, "summary": summary, "review": _review_text(review)}
+    output_text = await ainvoke_prompt("reviser", REVISION_PROMPT, inputs, get_llm(max_tokens))
+    return apply_revision(summary, _clean_output_text(output_text))
+
+
+def candidate_temperatures(base_temperature: float, count: int) -> List[float]:
+    """
+    Erster Kandidat mit konfigurierter Temperatur, weitere jeweils höher.
+
+    Schritt höchstens CANDIDATE_TEMPERATURE_STEP, bei hoher Basis kleiner,
+    damit alle N verschieden in [base, 1.0] liegen. Früher per min(1.0, ...)
+    gekappt, mehrere Kandidaten bei 1.0 bekamen aus dem Cache denselben Text.
+    Ab base >= 1.0 bleibt nur base, dort greift der Cache nicht (llm_cache).
+    """
+    base = float(base_temperature or 0.0)
+    count = max(1, int(count))
+    if count == 1 or base >= 1.0:
+        return [base] * count
+    step = min(CANDIDATE_TEMPERATURE_STEP, (1.0 - base) / (count - 1))
+    return [round(base + step * i, 3) for i in range(count)]
+
+
+def _run_at(structured_notes: str, temperature: float) -> str:
+    # Kandidaten nicht streamen, Pipeline meldet den gewählten
+    output_text = invoke_prompt(
+        "summarizer", SUMMARIZER_PROMPT, {"notes": structured_notes}, get_llm(temperature=temperature), stream=False
+    )
     return _clean_output_text(output_text)
+
+
+def run_candidates(structured_notes: str, temperatures: Sequence[float]) -> List[str]:
+    """
+    Mehrere Zusammenfassungen parallel, eine pro Temperatur.
+
+    Threads wie bei run_chunked. Wartezeit etwa ein Summarizer-Aufruf.
+    """
+    if len(temperatures) <= 1:
+        return [run(structured_notes)]
+    with cf.ThreadPoolExecutor(max_workers=len(temperatures), thread_name_prefix="summarizer-candidate") as executor:
+        # Eigener Kontext pro Task, damit Cache- und Token-Zähler des Laufs mitzählen
+        futures = [
+            executor.submit(contextvars.copy_context().run, _run_at, structured_notes, temperature)
+            for temperature in temperatures
+        ]
+        return [future.result() for future in futures]
+
+
+async def arun_candidates(structured_notes: str, temperatures: Sequence[float]) -> List[str]:
+    if len(temperatures) <= 1:
+        return [await arun(structured_notes)]
+
+    async def _candidate(temperature: float) -> str:
+        output_text = await ainvoke_prompt(
+            "summarizer", SUMMARIZER_PROMPT, {"notes": structured_notes}, get_llm(temperature=temperature), stream=False
+        )
+        return _clean_output_text(output_text)
+
+    return list(await asyncio.gather(*(_candidate(t) for t in temperatures)))
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import count_numeric_results, tokenize
+
+# Lokaler Verifier. Prüft die Critic-Regeln, die keine Sprachverständnis
+# brauchen: Titel exakt übernommen, keine Zahlen ohne Beleg in NOTES,
+# "No quantitative metrics"-Satz eingehalten, Pflichtfelder vorhanden. Läuft
+# in Mikrosekunden vor dem LLM-Critic. Ausgabe im gleichen Format wie der
+# Critic, Routing und Integrator merken keinen Unterschied.
+
+NO_METRICS_SENTENCE = "No quantitative metrics reported in provided text."
+REQUIRED_FIELDS = ("Title", "Objective", "Method", "Results", "Limitations")
+
+# off: nie, precheck: bei klaren Fehlern LLM-Critic sparen, replace: nie LLM-Critic
+VERIFIER_MODES = ("off", "precheck", "replace")
+
+_FIELD_PATTERN = re.compile(r"^\s*[*_#]*\s*([A-Za-z][A-Za-z /()]*?)\s*[*_]*\s*:\s*(.*)$")
+_NUMBER_PATTERN = re.compile(r"(?<![\w.])\d+(?:[.,]\d+)?")
+_SPACE_PATTERN = re.compile(r"\s+")
+
+
+def verifier_mode(config: Optional[Dict[str, Any]], engine: str) -> str:
+    """
+    Modus aus config["local_verifier"].
+
+    Entweder ein Modus für alle Engines ("precheck") oder pro Engine
+    ({"langgraph": "precheck", "dspy": "off"}). Unbekannte Werte sind "off".
+    """
+    setting = (config or {}).get("local_verifier") or "off"
+    if isinstance(setting, dict):
+        setting = setting.get(engine) or setting.get("default") or "off"
+    mode = str(setting).lower()
+    return mode if mode in VERIFIER_MODES else "off"
+
+
+def _fields(text: str) -> Dict[str, str]:
+    """
+    "Feld: Wert" Zeilen als Dict. Folgezeilen (Bullets) hängen am letzten Feld.
+
+    Markdown wie "**Title:**" wird toleriert, Modelle mögen das.
+    """
+    fields: Dict[str, str] = {}
+    current = None
+    for line in (text or "").splitlines():
+        match = _FIELD_PATTERN.match(line)
+        if match and len(match.group(1)) <= 40:
+            current = match.group(1).strip().title()
+            fields.setdefault(current, match.group(2).strip())
+        elif current is not None and line.strip():
+            fields[current] = f"{fields[current]}\n{line.strip()}".strip()
+    return fields
+
+
+def _field(fields: Dict[str, str], name: str) -> Optional[str]:
+    # "Method" im Summary, "Methods" in NOTES
+    for key in (name, f"{name}s"):
+        if key in fields:
+            return fields[key]
+    return None
+
+
+def _normalize_title(title: str) -> str:
+    return _SPACE_PATTERN.sub(" ", title.strip().strip("*_\"'`").rstrip(".")).lower()
+
+
+def _numbers(text: str) -> List[str]:
+    return [n.replace(",", ".") for n in _NUMBER_PATTERN.findall(text or "")]
+
+
+def _as_key(number: str) -> str:
+    # "87.30" und "87.3" gleich behandeln
+    try:
+        return repr(float(number))
+    except ValueError:
+        return number
+
+
+def run(notes: str = "", summary: str = "") -> Dict[str, Any]:
+    """
+    Prüft SUMMARY gegen NOTES ohne LLM.
+
+    Gibt strukturiertes Urteil zurück: issues (Liste), score (0-1), passed
+    (keine Regel verletzt) und critic (Text im Critic-Format mit
+    Improvements). Einzelne Befunde stehen zusätzlich in eigenen Schlüsseln.
+    """
+    note_fields = _fields(notes)
+    summary_fields = _fields(summary)
+    issues: List[str] = []
+
+    missing_fields = [name for name in REQUIRED_FIELDS if _field(summary_fields, name) is None]
+    for name in missing_fields:
+        issues.append(f"Add the missing '{name}:' line.")
+
+    # 1) Titel exakt aus NOTES
+    notes_title = _field(note_fields, "Title") or ""
+    summary_title = _field(summary_fields, "Title") or ""
+    title_ok = True
+    if notes_title and _normalize_title(notes_title) != "not reported":
+        title_ok = _normalize_title(notes_title) == _normalize_title(summary_title)
+        if not title_ok:
+            issues.append(f"Use the exact title from NOTES: '{notes_title}'.")
+
+    # 2) Zahlen in SUMMARY müssen in NOTES stehen
+    notes_numbers = {_as_key(n) for n in _numbers(notes)}
+    unsupported: List[str] = []
+    for number in _numbers(summary):
+        if _as_key(number) not in notes_numbers and number not in unsupported:
+            unsupported.append(number)
+    if unsupported:
+        issues.append(f"Remove numbers not found in NOTES: {', '.join(unsupported[:6])}.")
+
+    # 3) Ohne Metriken in NOTES: genau der Satz, keine Zahlen in Results
+    notes_results = _field(note_fields, "Result") or ""
+    summary_results = _field(summary_fields, "Result") or ""
+    notes_have_metrics = count_numeric_results(notes) > 0
+    no_metrics_ok = True
+    if NO_METRICS_SENTENCE in notes and not notes_have_metrics:
+        no_metrics_ok = NO_METRICS_SENTENCE in summary and not _numbers(summary_results)
+        if not no_metrics_ok:
+            issues.append(f"NOTES report no metrics. Results must read exactly: '{NO_METRICS_SENTENCE}'")
+
+    # Umgekehrt: NOTES haben Zahlen, SUMMARY-Results keine
+    missing_numbers: List[str] = []
+    if notes_have_metrics:
+        summary_keys = {_as_key(n) for n in _numbers(summary)}
+        missing_numbers = [n for n in dict.fromkeys(_numbers(notes_results)) if _as_key(n) not in summary_keys]
+        if not _numbers(summary_results):
+            issues.append("Results has no numeric outcomes although NOTES Results lists metrics.")
+
+    accuracy = max(0, 5 - 2 * len(unsupported) - (0 if title_ok else 2) - (0 if no_metrics_ok else 2))
+    coverage = max(0, 5 - len(missing_fields))
+    if notes_have_metrics:
+        result_numbers = len(set(_numbers(notes_results))) or 1
+        details = max(1, round(5 * (1 - len(missing_numbers) / result_numbers)))
+    else:
+        # Ohne Metriken keine hohe Details-Bewertung, wie im Critic-Prompt
+        details = 3
+    makes_sense = 5 if not missing_fields else 3
+    scores = {"Makes sense": makes_sense, "Accuracy": accuracy, "Coverage": coverage, "Details": details}
+
+    improvements = issues or ["No rule violations found by local checks."]
+    critic_text = "\n".join(
+        [f"{label}: {value}" for label, value in scores.items()]
+        + ["Improvements:"]
+        + [f"- {item}" for item in improvements[:5]]
+    )
+    return {
+        "passed": not issues,
+        "issues": issues,
+        "score": round(sum(scores.values()) / (5.0 * len(scores)), 3),
+        "scores": scores,
+        "title_ok": title_ok,
+        "unsupported_numbers": unsupported,
+        "missing_numbers": missing_numbers,
+        "no_metrics_ok": no_metrics_ok,
+        "missing_fields": missing_fields,
+        "critic": critic_text,
+    }
+
+
+def precheck(config: Optional[Dict[str, Any]], engine: str, notes: str, summary: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+    """
+    Verifier vor dem LLM-Critic.
+
+    Gibt (Urteil oder None, LLM-Critic überspringen) zurück. precheck
+    überspringt nur bei gefundenen Regelverstößen. Dann ist klar, dass
+    nachgebessert werden muss, und die Improvements sind konkret. Bestandene
+    Prüfung sagt nichts über Logik oder Vollständigkeit, daher läuft der
+    LLM-Critic dann trotzdem. replace überspringt immer.
+    """
+    mode = verifier_mode(config, engine)
+    if mode == "off":
+        return None, False
+    verdict = run(notes, summary)
+    return verdict, mode == "replace" or not verdict["passed"]
+
+
+def _word_f1(candidate: str, reference: str) -> float:
+    # Wortmengen, wie _word_f1 im DSPy-Teleprompting
+    predicted, gold = set(tokenize(candidate)), set(tokenize(reference))
+    overlap = len(predicted & gold)
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / len(predicted), overlap / len(gold)
+    return 2 * precision * recall / (precision + recall)
+
+
+def rank_candidates(notes: str, candidates: List[str]) -> List[Dict[str, Any]]:
+    """
+    Bewertet Zusammenfassungs-Kandidaten lokal, beste zuerst.
+
+    Reihenfolge: Regeln bestanden, dann Verifier-Score, dann Wort-F1 gegen
+    NOTES als Tiebreak (mehr Inhalt aus NOTES übernommen, wenig Eigenes).
+    Bei Gleichstand gewinnt der frühere Kandidat, also niedrigere Temperatur.
+    """
+    ranked = []
+    for index, candidate in enumerate(candidates):
+        verdict = run(notes, candidate)
+        ranked.append({
+            "index": index,
+            "passed": verdict["passed"],
+            "score": verdict["score"],
+            "f1": round(_word_f1(candidate, notes), 3),
+            "issues": len(verdict["issues"]),
+        })
+    ranked.sort(key=lambda c: (not c["passed"], -c["score"], -c["f1"], c["index"]))
+    return ranked
+
+
+def verifier_row(runs: int, failures: int, skipped: int) -> Dict[str, int]:
+    """Telemetrie-Spalten. Immer gesetzt, damit CSV-Header stabil bleibt."""
+    return {"verifier_runs": runs, "verifier_failures": failures, "critic_llm_skipped": skipped}
@@ -5,15 +5,17 @@ LangChain, LangGraph, and DSPy pipelines.
 """
 
 import os
-import io
 import json
 import copy
+import queue
 import time
+import contextvars
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 import pandas as pd
 import altair as alt
 from dotenv import load_dotenv
-from pypdf import PdfReader
 
 from workflows.langchain_pipeline import run_pipeline as run_lc
 try:
@@ -24,7 +26,12 @@ except Exception as e:
     def run_lg(*args, **kwargs):
         raise ImportError(f"LangGraph import failed: {e}")
 from workflows.dspy_pipeline import run_pipeline as run_dspy, DSPY_READY
-from utils import build_analysis_context, extract_confidence_line
+from preprocess_cache import analysis_context as build_cached_context, extract_text as extract_preprocessed_text
+import telemetry as telemetry_store
+from telemetry import flush as flush_telemetry
+from streaming import PARTIAL_FIELDS
+from utils import extract_confidence_line
+from workflows.shared_stages import compute_shared_stages, with_shared_stages
 
 load_dotenv()
 st.set_page_config(
@@ -149,6 +156,44 @@ with st.sidebar:
             0.0, 1.0, default_temperature, 0.05,
             help="Controls randomness in responses:\n\n0.0 = Deterministic, same input always gives same output\n0.1-0.3 = Slightly creative, good for structured tasks\n0.7-1.0 = Very creative, more variation",
         )
+        
+        reader_mode = st.selectbox(
+            "Reader Mode",
+            ["single", "auto", "chunked"],
+            index=0,
+            help="single: Whole paper in one Reader prompt\n\nchunked: Split paper at section boundaries, extract notes per chunk in parallel, then merge\n\nauto: Chunked only if the paper is longer than one chunk",
+        )
+
+        context_budget_tokens = st.number_input(
+            "Context Budget (tokens)",
+            min_value=0, max_value=128000, value=0, step=1000,
+            help="0 = send the whole cleaned paper. Otherwise keep only the most relevant sections (BM25 ranking plus numbers/tables) up to this many tokens. Smaller Reader prompts are faster and cheaper.",
+        )
+
+        critic_evidence = st.checkbox(
+            "Critic Evidence",
+            value=False,
+            help="Index the paper locally (BM25 over section chunks) and give the Critic the passages that match each claim in the summary, so it can check claims against the source text instead of the notes alone. LangChain and LangGraph only.",
+        )
+
+        summary_candidates = st.number_input(
+            "Summary Candidates",
+            min_value=1, max_value=5, value=1, step=1,
+            help="LangGraph only. 1 = summarize, critique, revise in a loop. More than 1 = generate that many summaries in parallel (staggered temperature), pick the best locally (rule checks + word overlap with the notes), then a single Critic call. Costs more tokens, but latency stays at about one Summarizer call.",
+        )
+
+        local_verifier = st.selectbox(
+            "Local Verifier",
+            ["off", "precheck", "replace"],
+            index=0,
+            help="Rule checks before the Critic (exact title, numbers backed by the notes, no-metrics sentence, required fields). No LLM call, runs in milliseconds.\n\nprecheck: If a rule is broken, its findings replace the LLM Critic for that round\n\nreplace: Never call the LLM Critic",
+        )
+
+        langgraph_checkpoint = st.checkbox(
+            "Resume LangGraph Runs",
+            value=False,
+            help="LangGraph only. Save the graph state after every node (local SQLite file if langgraph-checkpoint-sqlite is installed, otherwise in memory). If a run fails or a stage times out, running the same paper again continues after the last finished node. Restored steps are marked '(checkpoint)' in the trace.",
+        )
     
     # DSPy settings
     if DSPY_READY:
@@ -189,6 +234,17 @@ config = {
     "dspy_dev_path": dspy_dev_path,
     "csv_telemetry": True,
     "max_critic_loops": 2, # Default for LangGraph
+    "revision_mode": "patch", # LangGraph loops: targeted edit instead of full rewrite
+    "revision_max_tokens": 256,
+    "reader_mode": reader_mode,
+    "reader_chunk_chars": 12000,
+    "reader_parallelism": 4,
+    "context_budget_tokens": int(context_budget_tokens),
+    "critic_evidence": bool(critic_evidence),
+    "retrieval_top_k": 4,
+    "local_verifier": local_verifier,
+    "summary_candidates": int(summary_candidates),
+    "langgraph_checkpoint": "sqlite" if langgraph_checkpoint else False,
 }
 
 # Main tabs
@@ -230,25 +286,6 @@ with tab_analyse:
     st.markdown("---")
     
     # Text processing
-    def extract_pdf_text(file_handle) -> str:
-        try:
-            import pdfplumber
-            try:
-                with pdfplumber.open(file_handle) as pdf:
-                    pages = [page.extract_text(x_tolerance=1, y_tolerance=1) or "" for page in pdf.pages]
-                    text = "\n\n".join(pages).strip()
-                    if text:
-                        return text
-            except Exception:
-                pass
-        except Exception:
-            pass
-        try:
-            reader = PdfReader(file_handle)
-            return "\n\n".join((page.extract_text() or "") for page in reader.pages).strip()
-        except Exception as e:
-            return f"[PDF error] {e}"
-    
     def read_uploaded_files(files) -> str:
         if not files:
             return ""
@@ -256,10 +293,9 @@ with tab_analyse:
         for file in files:
             try:
                 file_data = file.read()
-                if file.type == "application/pdf" or file.name.lower().endswith(".pdf"):
-                    text_chunks.append(extract_pdf_text(io.BytesIO(file_data)))
-                else:
-                    text_chunks.append(file_data.decode("utf-8", errors="ignore"))
+                is_pdf = file.type == "application/pdf" or file.name.lower().endswith(".pdf")
+                # Cache über Inhalts-Hash, Rerun kostet dann nur Hash statt Parse
+                text_chunks.append(extract_preprocessed_text(file_data, file.name, config, is_pdf=is_pdf))
             except Exception as e:
                 text_chunks.append(f"[Error reading {file.name}: {e}]")
         return "\n\n".join(chunk for chunk in text_chunks if chunk).strip()
@@ -268,8 +304,47 @@ with tab_analyse:
     analysis_context = ""
     
     if raw_text:
-        analysis_context = build_analysis_context(raw_text, config)
+        analysis_context = build_cached_context(raw_text, config)
     
+    def run_with_partials(runner, status, status_label: str) -> dict:
+        """
+        Pipeline im Hintergrund-Thread, Teilausgaben live im Status-Block.
+
+        Streamlit-Elemente nur aus diesem Thread anfassen. Pipeline legt
+        Teilausgaben (Feld, Text, fertig) in Queue, hier wird alle 0.1 s
+        der jeweils neueste Stand pro Feld gezeichnet.
+        """
+        labels = {"notes": "Notes", "summary": "Summary", "critic": "Critic", "meta": "Meta Summary"}
+        placeholders = {field: st.empty() for field in PARTIAL_FIELDS}
+        partial_queue = queue.Queue()
+        latest = {}
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            future = pool.submit(
+                contextvars.copy_context().run,
+                runner,
+                lambda field, text, done: partial_queue.put((field, text, done)),
+            )
+            while True:
+                finished = future.done()
+                changed = []
+                while True:
+                    try:
+                        field, text, done = partial_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    latest[field] = (text, done)
+                    changed.append(field)
+                for field in dict.fromkeys(changed):
+                    text, done = latest[field]
+                    state = "done" if done else "writing..."
+                    placeholders[field].markdown(f"**{labels[field]}** ({state})\n\n{text}")
+                    if not done:
+                        status.update(label=f"{status_label}: {labels[field]}", state="running")
+                if finished:
+                    break
+                time.sleep(0.1)
+            return future.result()
+
     # Analyze button
     if st.button("Analyze", type="primary", use_container_width=True, disabled=not uploaded_files):
         if not analysis_context.strip():
@@ -278,17 +353,27 @@ with tab_analyse:
             pipeline_result = None
             try:
                 with st.status("Analyzing document", expanded=True) as status:
+                    # Teilausgaben (Notes, Summary, Critic, Meta) erscheinen, während sie entstehen
                     if pipeline_mode == "LangChain":
                         status.update(label="Running LangChain", state="running")
-                        pipeline_result = run_lc(analysis_context, config)
+                        pipeline_result = run_with_partials(
+                            lambda on_partial: run_lc(analysis_context, config, on_partial=on_partial),
+                            status, "Running LangChain",
+                        )
                     elif pipeline_mode == "LangGraph":
                         status.update(label="Running LangGraph", state="running")
-                        pipeline_result = run_lg(analysis_context, config)
+                        pipeline_result = run_with_partials(
+                            lambda on_partial: run_lg(analysis_context, config, on_partial=on_partial),
+                            status, "Running LangGraph",
+                        )
                     else:
                         status.update(label="Running DSPy", state="running")
                         if use_dspy_teleprompt:
                             status.update(label="Optimizing with Teleprompting...", state="running")
-                        pipeline_result = run_dspy(analysis_context, config)
+                        pipeline_result = run_with_partials(
+                            lambda on_partial: run_dspy(analysis_context, config, on_partial=on_partial),
+                            status, "Running DSPy",
+                        )
                     
                     status.update(label="Analysis complete!", state="complete")
                 
@@ -308,7 +393,7 @@ with tab_analyse:
                         st.metric("Meta Length", f"{meta_len:,} chars", help="Number of characters in the meta summary (final integrated summary)")
                     with col_meta4:
                         loops = int(pipeline_result.get("critic_loops", 0) or 0)
-                        st.metric("Critic Loops", str(loops), help="How many times LangGraph routed back to Summarizer due low critic score (LangGraph only).")
+                        st.metric("Critic Loops", str(loops), help="How many times LangGraph sent the summary back for revision due to a low critic score (LangGraph only).")
 
                     execution_trace = pipeline_result.get("execution_trace", []) or []
                     trace_set = {str(x).lower() for x in execution_trace if x}
@@ -317,10 +402,20 @@ with tab_analyse:
                         ("reader", "Reader"),
                         ("summarizer", "Summarizer"),
                         ("critic", "Critic"),
+                        ("reviser", "Reviser"),
                         ("integrator", "Integrator"),
                     ):
-                        status_text = "visited" if key in trace_set else "not visited"
+                        if key in trace_set:
+                            status_text = "visited"
+                        elif f"{key} (checkpoint)" in trace_set:
+                            status_text = "restored from checkpoint"
+                        else:
+                            status_text = "not visited"
                         agent_lines.append(f"{label} - {status_text}")
+                    if "verifier" in trace_set:
+                        skipped = int(pipeline_result.get("critic_llm_skipped", 0) or 0)
+                        failures = int(pipeline_result.get("verifier_failures", 0) or 0)
+                        agent_lines.append(f"Local Verifier - {failures} failed check(s), {skipped} LLM Critic call(s) skipped")
 
                     with st.expander("Execution Trace", expanded=True):
                         st.markdown("\n".join(f"- {line}" for line in agent_lines))
@@ -330,6 +425,14 @@ with tab_analyse:
                             branch = (routing[-1] if routing else "n/a").upper()
                             st.markdown(f"LangGraph looped: **{looped}**")
                             st.markdown(f"LangGraph branch: **{branch}**")
+                            candidates = pipeline_result.get("summary_candidates", []) or []
+                            if candidates:
+                                st.caption("Summary candidates (best-of-N, local selection)")
+                                st.dataframe(pd.DataFrame(candidates), hide_index=True, use_container_width=True)
+                            loop_stats = pipeline_result.get("loop_stats", []) or []
+                            if len(loop_stats) > 1:
+                                st.caption("Per critic round: tokens and seconds of revision and critique")
+                                st.dataframe(pd.DataFrame(loop_stats), hide_index=True, use_container_width=True)
                     
                     # Meta Summary
                     if pipeline_result.get("meta"):
@@ -359,6 +462,37 @@ with tab_analyse:
                     for col, (key, value) in zip(cols, times.items()):
                         with col:
                             st.metric(key, f"{value:.2f}s")
+
+                    # Tokens & Kosten
+                    if pipeline_result.get("llm_calls"):
+                        with st.expander("Tokens & Cost", expanded=False):
+                            col_tok1, col_tok2, col_tok3, col_tok4 = st.columns(4)
+                            with col_tok1:
+                                st.metric("LLM Calls", str(int(pipeline_result.get("llm_calls", 0) or 0)))
+                            with col_tok2:
+                                st.metric("Prompt Tokens", f"{int(pipeline_result.get('prompt_tokens', 0) or 0):,}")
+                            with col_tok3:
+                                st.metric("Completion Tokens", f"{int(pipeline_result.get('completion_tokens', 0) or 0):,}")
+                            with col_tok4:
+                                st.metric("Cost", f"${pipeline_result.get('cost_usd', 0.0):.4f}", help="Estimated from the price table (USD per 1M tokens). Override via LLM_PRICE_TABLE.")
+                            usage_rows = []
+                            for key, label in (
+                                ("reader", "Reader"),
+                                ("summarizer", "Summarizer"),
+                                ("critic", "Critic"),
+                                ("reviser", "Reviser"),
+                                ("integrator", "Integrator"),
+                            ):
+                                ttft = pipeline_result.get(f"{key}_ttft_s", 0.0)
+                                usage_rows.append({
+                                    "Stage": label,
+                                    "Prompt Tokens": int(pipeline_result.get(f"{key}_prompt_tokens", 0) or 0),
+                                    "Completion Tokens": int(pipeline_result.get(f"{key}_completion_tokens", 0) or 0),
+                                    "LLM Time (s)": f"{pipeline_result.get(f'{key}_llm_s', 0.0):.2f}",
+                                    "TTFT (s)": f"{ttft:.2f}" if ttft else "-",
+                                    "Cost ($)": f"{pipeline_result.get(f'{key}_cost_usd', 0.0):.4f}",
+                                })
+                            st.dataframe(pd.DataFrame(usage_rows), use_container_width=True, hide_index=True)
                     
                     # Notes & Critic
                     col_notes, col_critic = st.columns(2)
@@ -407,11 +541,19 @@ with tab_vergleich:
     )
     
     raw_text_compare = read_uploaded_files(uploaded_files_compare) if uploaded_files_compare else ""
-    analysis_context_compare = build_analysis_context(raw_text_compare, config) if raw_text_compare else ""
+    analysis_context_compare = build_cached_context(raw_text_compare, config) if raw_text_compare else ""
     
     if analysis_context_compare:
         st.success(f"{len(analysis_context_compare):,} characters loaded")
     
+    shared_stage_choice = st.selectbox(
+        "Shared Stages (LangChain + LangGraph)",
+        ["none", "notes", "notes + summary"],
+        index=0,
+        help="Run Reader (and optionally Summarizer) once and reuse the output in LangChain and LangGraph. Saves the most expensive stage. Reused stages are marked in trace and telemetry. DSPy always runs its own Reader.",
+    )
+    share_stages = {"none": [], "notes": ["notes"], "notes + summary": ["notes", "summary"]}[shared_stage_choice]
+    
     if st.button("Compare Pipelines", type="primary", use_container_width=True):
         if not analysis_context_compare.strip():
             st.error("Please upload a file first!")
@@ -419,37 +561,83 @@ with tab_vergleich:
             with st.status("Comparing pipelines", expanded=True) as status:
                 results = {}
                 errors = {}
+                wall_start = time.perf_counter()
+                shared_result = {}
+                compare_config = config
+                if share_stages:
+                    status.update(label="Running shared Reader")
+                    try:
+                        shared_result = compute_shared_stages(analysis_context_compare, config, share_stages)
+                        compare_config = with_shared_stages(config, shared_result, share_stages)
+                    except Exception as exc:
+                        # Ohne geteilte Stages weiter, jede Engine liest dann selbst
+                        st.warning(f"Shared Reader failed, engines run their own: {exc}")
                 pipelines = [
-                    ("LangChain", lambda: run_lc(analysis_context_compare, config)),
-                    ("LangGraph", lambda: run_lg(analysis_context_compare, config)),
+                    ("LangChain", lambda: run_lc(analysis_context_compare, compare_config)),
+                    ("LangGraph", lambda: run_lg(analysis_context_compare, compare_config)),
                     ("DSPy", lambda: run_dspy(analysis_context_compare, config)),
                 ]
                 
-                for label, runner in pipelines:
-                    try:
-                        status.update(label=f"Running {label}")
-                        results[label] = runner()
-                    except Exception as exc:
-                        import traceback
-                        error_msg = str(exc)
-                        error_trace = traceback.format_exc()
-                        errors[label] = error_msg
-                        results[label] = {
-                            "meta": f"Error: {error_msg}",
-                            "summary": "",
-                            "structured": "",
-                            "critic": "",
-                            "latency_s": 0.0,
-                            "reader_s": 0.0,
-                            "summarizer_s": 0.0,
-                            "critic_s": 0.0,
-                            "integrator_s": 0.0,
-                        }
-                        if show_debug:
-                            st.error(f"{label} error: {error_trace}")
+                # Engines parallel, jede in eigenem Worker. Streamlit-Aufrufe
+                # bleiben im Hauptthread, Worker liefern nur Ergebnisse.
+                progress_slots = {label: st.empty() for label, _ in pipelines}
+                for label, _ in pipelines:
+                    progress_slots[label].info(f"{label}: running...")
+                status.update(label=f"Running {len(pipelines)} pipelines in parallel")
+                with ThreadPoolExecutor(max_workers=len(pipelines)) as pool:
+                    # Eigener Kontext-Snapshot pro Engine, configure() einer Engine
+                    # wirkt so nicht auf die anderen
+                    futures = {
+                        pool.submit(contextvars.copy_context().run, runner): label
+                        for label, runner in pipelines
+                    }
+                    for done_count, future in enumerate(as_completed(futures), start=1):
+                        label = futures[future]
+                        try:
+                            results[label] = future.result()
+                            res = results[label]
+                            with progress_slots[label].container():
+                                st.success(f"{label} finished in {res.get('latency_s', 0.0):.2f}s")
+                                st.caption((res.get("meta", "") or "")[:300])
+                        except Exception as exc:
+                            error_msg = str(exc)
+                            errors[label] = error_msg
+                            results[label] = {
+                                "meta": f"Error: {error_msg}",
+                                "summary": "",
+                                "structured": "",
+                                "critic": "",
+                                "latency_s": 0.0,
+                                "reader_s": 0.0,
+                                "summarizer_s": 0.0,
+                                "critic_s": 0.0,
+                                "integrator_s": 0.0,
+                            }
+                            progress_slots[label].error(f"{label} failed: {error_msg}")
+                            if show_debug:
+                                error_trace = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+                                st.error(f"{label} error: {error_trace}")
+                        status.update(label=f"{label} finished ({done_count}/{len(pipelines)})")
+                wall_clock_s = time.perf_counter() - wall_start
+                # Reihenfolge für Tabelle und Tabs wie vorher, nicht Fertigstellung
+                results = {label: results[label] for label, _ in pipelines}
                 
                 status.update(label="Comparison complete!", state="complete")
             
+            # Geteilte Stages einmal mitzählen, sonst sähe der Vergleich zu günstig aus
+            shared_s = float(shared_result.get("reader_s", 0.0)) + float(shared_result.get("summarizer_s", 0.0))
+            sequential_sum_s = shared_s + sum(float(res.get("latency_s", 0.0) or 0.0) for res in results.values())
+            if shared_s:
+                st.caption(f"Shared stages ({', '.join(share_stages)}) took {shared_s:.2f}s, computed once for LangChain and LangGraph.")
+            col_wall, col_seq, col_speedup = st.columns(3)
+            with col_wall:
+                st.metric("Wall Clock (parallel)", f"{wall_clock_s:.2f}s")
+            with col_seq:
+                st.metric("Sequential Sum", f"{sequential_sum_s:.2f}s")
+            with col_speedup:
+                speedup = sequential_sum_s / wall_clock_s if wall_clock_s > 0 else 0.0
+                st.metric("Speedup", f"{speedup:.1f}x")
+            
             # Comparison table
             st.markdown("## Comparison Table")
             table_rows = []
@@ -462,6 +650,9 @@ with tab_vergleich:
                     "Critic (s)": f"{res.get('critic_s', 0.0):.2f}",
                     "Summary (chars)": len(res.get("summary", "") or ""),
                     "Meta (chars)": len(res.get("meta", "") or ""),
+                    "Tokens": int(res.get("prompt_tokens", 0) or 0) + int(res.get("completion_tokens", 0) or 0),
+                    "Cost ($)": f"{res.get('cost_usd', 0.0):.4f}",
+                    "Reused": res.get("reused_stages", "") or "-",
                 })
             
             df = pd.DataFrame(table_rows)
@@ -515,7 +706,6 @@ with tab_vergleich:
                     if errors.get(label):
                         st.error(f"**Error in {label}:** {errors[label]}")
                         if show_debug:
-                            import traceback
                             st.code(traceback.format_exc(), language="python")
 
                     execution_trace = res.get("execution_trace", []) or []
@@ -558,7 +748,7 @@ with tab_teleprompt:
         )
         
         raw_text_tp = read_uploaded_files(uploaded_files_tp) if uploaded_files_tp else ""
-        analysis_context_tp = build_analysis_context(raw_text_tp, config) if raw_text_tp else ""
+        analysis_context_tp = build_cached_context(raw_text_tp, config) if raw_text_tp else ""
         
         if analysis_context_tp:
             st.success(f"{len(analysis_context_tp):,} characters loaded")
@@ -615,6 +805,8 @@ with tab_teleprompt:
                         })
                     df_gain = pd.DataFrame(rows)
                     st.dataframe(df_gain, use_container_width=True, hide_index=True)
+                    if res_tp.get("teleprompt_cached"):
+                        st.caption("Compiled teleprompt program loaded from local_cache/dspy_programs, no re-optimization.")
                     
                     if len(df_gain) == 2:
                         f1_base = float(df_gain.iloc[0]["F1 Score"])
@@ -640,95 +832,144 @@ with tab_teleprompt:
                             with st.expander("Critic"):
                                 st.text(res.get("critic", ""))
 
-# CSV Telemetry
+# Telemetry
 st.markdown("---")
-with st.expander("CSV Telemetry Data", expanded=False):
-    telemetry_path = "telemetry.csv"
-    if not os.path.exists(telemetry_path):
-        st.info("No telemetry data yet. Run a pipeline to start logging metrics.")
-    else:
-        try:
-            telemetry_df = pd.read_csv(telemetry_path)
-            if len(telemetry_df) > 0:
-                st.markdown(f"**Total runs:** {len(telemetry_df)}")
-                
-                # Last 10 entries
-                last_entries = telemetry_df.tail(10).copy()
-                
-                # Columns for display
-                display_cols = []
-                if "timestamp" in last_entries.columns:
-                    display_cols.append("timestamp")
-                if "engine" in last_entries.columns:
-                    display_cols.append("engine")
-                if "model" in last_entries.columns:
-                    display_cols.append("model")
-                if "latency_s" in last_entries.columns:
-                    display_cols.append("latency_s")
-                if "summary_len" in last_entries.columns:
-                    display_cols.append("summary_len")
-                if "extracted_metrics_count" in last_entries.columns:
-                    display_cols.append("extracted_metrics_count")
-                if "critic_loops" in last_entries.columns:
-                    display_cols.append("critic_loops")
-                if "critic_score" in last_entries.columns:
-                    display_cols.append("critic_score")
+with st.expander("Telemetry Data", expanded=False):
+    # Writer läuft im Hintergrund, vor dem Lesen ausstehende Zeilen schreiben
+    flush_telemetry(timeout=5.0)
+    # Einmal pro Rerun lesen, alle Ansichten daraus. Mit TELEMETRY_BACKEND=sqlite über Indizes.
+    try:
+        dashboard_data = telemetry_store.dashboard(recent=30, last_n=1000)
+        total_runs = dashboard_data["count"]
+        if total_runs == 0:
+            st.info("No telemetry data yet. Run a pipeline to start logging metrics.")
+        else:
+            st.markdown(f"**Total runs:** {total_runs} ({telemetry_store.backend()} backend)")
+            
+            # Last 10 entries
+            last_entries = pd.DataFrame(dashboard_data["recent"][-10:])
+            
+            # Columns for display
+            display_cols = []
+            if "timestamp" in last_entries.columns:
+                display_cols.append("timestamp")
+            if "engine" in last_entries.columns:
+                display_cols.append("engine")
+            if "model" in last_entries.columns:
+                display_cols.append("model")
+            if "latency_s" in last_entries.columns:
+                display_cols.append("latency_s")
+            if "summary_len" in last_entries.columns:
+                display_cols.append("summary_len")
+            if "extracted_metrics_count" in last_entries.columns:
+                display_cols.append("extracted_metrics_count")
+            if "prompt_tokens" in last_entries.columns:
+                display_cols.append("prompt_tokens")
+            if "completion_tokens" in last_entries.columns:
+                display_cols.append("completion_tokens")
+            if "cost_usd" in last_entries.columns:
+                display_cols.append("cost_usd")
+            if "critic_loops" in last_entries.columns:
+                display_cols.append("critic_loops")
+            if "critic_score" in last_entries.columns:
+                display_cols.append("critic_score")
+            if "critic_llm_skipped" in last_entries.columns:
+                display_cols.append("critic_llm_skipped")
+            
+            if display_cols:
+                # Format data for better display
+                display_df = last_entries[display_cols].copy()
+                if "timestamp" in display_df.columns:
+                    # Format timestamp only date and time
+                    try:
+                        display_df["timestamp"] = pd.to_datetime(display_df["timestamp"], errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S")
+                    except Exception:
+                        pass
+                if "latency_s" in display_df.columns:
+                    display_df["latency_s"] = pd.to_numeric(display_df["latency_s"], errors="coerce").round(2)
+                if "summary_len" in display_df.columns:
+                    display_df["summary_len"] = pd.to_numeric(display_df["summary_len"], errors="coerce").fillna(0).astype(int)
+                if "extracted_metrics_count" in display_df.columns:
+                    display_df["extracted_metrics_count"] = pd.to_numeric(display_df["extracted_metrics_count"], errors="coerce").fillna(0).astype(int)
+                if "critic_score" in display_df.columns:
+                    display_df["critic_score"] = pd.to_numeric(display_df["critic_score"], errors="coerce").round(2)
+                for col in ("critic_loops", "critic_llm_skipped"):
+                    if col in display_df.columns:
+                        display_df[col] = pd.to_numeric(display_df[col], errors="coerce").fillna(0).astype(int)
+                for col in ("prompt_tokens", "completion_tokens"):
+                    if col in display_df.columns:
+                        display_df[col] = pd.to_numeric(display_df[col], errors="coerce").fillna(0).astype(int)
+                if "cost_usd" in display_df.columns:
+                    display_df["cost_usd"] = pd.to_numeric(display_df["cost_usd"], errors="coerce").round(4)
                 
-                if display_cols:
-                    # Format data for better display
-                    display_df = last_entries[display_cols].copy()
-                    if "timestamp" in display_df.columns:
-                        # Format timestamp only date and time
-                        try:
-                            display_df["timestamp"] = pd.to_datetime(display_df["timestamp"], errors="coerce").dt.strftime("%Y-%m-%d %H:%M:%S")
-                        except Exception:
-                            pass
-                    if "latency_s" in display_df.columns:
-                        display_df["latency_s"] = pd.to_numeric(display_df["latency_s"], errors="coerce").round(2)
-                    if "summary_len" in display_df.columns:
-                        display_df["summary_len"] = pd.to_numeric(display_df["summary_len"], errors="coerce").fillna(0).astype(int)
-                    if "extracted_metrics_count" in display_df.columns:
-                        display_df["extracted_metrics_count"] = pd.to_numeric(display_df["extracted_metrics_count"], errors="coerce").fillna(0).astype(int)
-                    if "critic_score" in display_df.columns:
-                        display_df["critic_score"] = pd.to_numeric(display_df["critic_score"], errors="coerce").round(2)
-                    if "critic_loops" in display_df.columns:
-                        display_df["critic_loops"] = pd.to_numeric(display_df["critic_loops"], errors="coerce").fillna(0).astype(int)
-                    
-                    st.dataframe(
-                        display_df,
-                        use_container_width=True,
-                        hide_index=True
+                st.dataframe(
+                    display_df,
+                    use_container_width=True,
+                    hide_index=True
+                )
+            
+            # Latency percentiles and stage breakdown per engine
+            percentiles = dashboard_data["latency"]
+            if percentiles:
+                st.markdown("**Latency per engine:**")
+                st.dataframe(
+                    pd.DataFrame([
+                        {"engine": engine, "runs": int(stats["count"]), "p50 (s)": round(stats["p50"], 2), "p95 (s)": round(stats["p95"], 2)}
+                        for engine, stats in sorted(percentiles.items())
+                    ]),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+            breakdown = dashboard_data["stages"]
+            if breakdown:
+                st.markdown("**Average stage time (last 1000 runs):**")
+                stage_df = pd.DataFrame([
+                    {"engine": engine, "stage": stage.replace("_s", ""), "seconds": seconds}
+                    for engine, stages in breakdown.items()
+                    for stage, seconds in stages.items()
+                ])
+                stage_chart = (
+                    alt.Chart(stage_df)
+                    .mark_bar()
+                    .encode(
+                        x=alt.X("seconds:Q", title="Seconds", stack="zero"),
+                        y=alt.Y("engine:N", title="Pipeline"),
+                        color=alt.Color("stage:N", sort=["reader", "summarizer", "critic", "integrator"]),
+                        tooltip=["engine", "stage", "seconds"],
                     )
-                    
-                    # Latency over time
-                    if "latency_s" in telemetry_df.columns and "engine" in telemetry_df.columns:
-                        st.markdown("**Latency over time:**")
-                        plot_data = telemetry_df.tail(30).copy()
-                        plot_data = plot_data.reset_index()
-                        plot_data["run"] = plot_data.index + 1
-                        
-                        chart = (
-                            alt.Chart(plot_data)
-                            .mark_line(point=True, size=2)
-                            .encode(
-                                x=alt.X("run:Q", title="Run #"),
-                                y=alt.Y("latency_s:Q", title="Latency (seconds)"),
-                                color=alt.Color("engine:N", legend=alt.Legend(title="Pipeline")),
-                            )
-                            .properties(height=250)
-                        )
-                        st.altair_chart(chart, use_container_width=True)
+                    .properties(height=150)
+                )
+                st.altair_chart(stage_chart, use_container_width=True)
+            
+            # Latency over time
+            plot_data = pd.DataFrame(dashboard_data["recent"])
+            if "latency_s" in plot_data.columns and "engine" in plot_data.columns:
+                st.markdown("**Latency over time:**")
+                plot_data["latency_s"] = pd.to_numeric(plot_data["latency_s"], errors="coerce")
+                plot_data = plot_data.reset_index()
+                plot_data["run"] = plot_data.index + 1
                 
-                # Download CSV
-                csv_data = telemetry_df.to_csv(index=False)
-                st.download_button(
-                    "Download CSV",
-                    data=csv_data,
-                    file_name="telemetry.csv",
-                    mime="text/csv",
-                    use_container_width=True
+                chart = (
+                    alt.Chart(plot_data)
+                    .mark_line(point=True, size=2)
+                    .encode(
+                        x=alt.X("run:Q", title="Run #"),
+                        y=alt.Y("latency_s:Q", title="Latency (seconds)"),
+                        color=alt.Color("engine:N", legend=alt.Legend(title="Pipeline")),
+                    )
+                    .properties(height=250)
                 )
-            else:
-                st.info("No data yet. Run a pipeline to start logging metrics.")
-        except Exception as e:
-            st.error(f"Could not load telemetry: {e}")
+                st.altair_chart(chart, use_container_width=True)
+            
+            # Download nur beim CSV-Backend
+            if telemetry_store.backend() == "csv" and os.path.exists("telemetry.csv"):
+                with open("telemetry.csv", "rb") as telemetry_file:
+                    st.download_button(
+                        "Download CSV",
+                        data=telemetry_file,
+                        file_name="telemetry.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+    except Exception as e:
+        st.error(f"Could not load telemetry: {e}")
@@ -0,0 +1,317 @@
+"""
+Batch-Runner für große Paper-Korpora.
+
+Beispiel (aus Projekt-Root):
+    python app/batch_runner.py papers/ --engines langchain,langgraph --concurrency 8 --out runs/nightly.jsonl
+
+Eingabe ist ein Ordner mit .pdf/.txt Dateien oder eine JSONL-Datei
+(Felder "text", optional "id"). Ergebnisse werden als JSONL gestreamt,
+eine Zeile pro (Paper, Engine). Checkpoint-Datei merkt sich fertige Paare.
+Nach Absturz einfach gleichen Befehl erneut starten, fertige Paare werden
+übersprungen.
+
+--retries wiederholt fehlgeschlagene Paare sofort. Mit --graph-checkpoint
+setzt LangGraph dabei (und beim nächsten Start) nach letzter fertiger Node
+fort, statt Paper komplett neu zu rechnen.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Set, Tuple
+
+from documents import PDF_ERROR_PREFIX
+from preprocess_cache import analysis_context as build_cached_context, load_document
+from workflows.dspy_pipeline import run_pipeline_async as run_dspy_async
+from workflows.langchain_pipeline import run_pipeline_async as run_lc_async
+from workflows.langgraph_pipeline import TIMEOUT_SENTINEL, run_pipeline_async as run_lg_async
+
+ENGINES: Dict[str, Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+    "langchain": run_lc_async,
+    "langgraph": run_lg_async,
+    "dspy": run_dspy_async,
+}
+
+
+def _doc_id(text: str) -> str:
+    """Stabile ID nur aus Inhalt. Umbenannte Datei mit gleichem Inhalt bleibt fertig."""
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()[:16]
+
+
+def iter_inputs(source: str) -> Iterator[Tuple[str, str]]:
+    """Liefert (Name, Pfad oder Text) Paare. Texte aus JSONL direkt, Dateien lazy."""
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if os.path.splitext(name)[1].lower() in {".pdf", ".txt"}:
+                yield name, os.path.join(source, name)
+        return
+    with open(source, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"skip line {line_no}: invalid JSON", file=sys.stderr)
+                continue
+            text = obj.get("text", "")
+            if text:
+                yield str(obj.get("id") or f"line{line_no}"), text
+
+
+def _load_text(source_is_dir: bool, value: str, cfg: Dict[str, Any]) -> str:
+    return load_document(value, cfg) if source_is_dir else value
+
+
+def load_checkpoint(path: str) -> Set[Tuple[str, str]]:
+    done: Set[Tuple[str, str]] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                obj = json.loads(line)
+                # Ältere Checkpoints: "name:digest", zählt nur noch digest
+                done.add((str(obj["doc_id"]).rsplit(":", 1)[-1], obj["engine"]))
+            except (ValueError, KeyError):
+                # Halbe letzte Zeile nach Absturz ignorieren
+                continue
+    return done
+
+
+class _JsonlSink:
+    """
+    Schreibt Ergebnis- und Checkpoint-Zeilen.
+
+    Checkpoint erst nach flush der Ergebniszeile. Absturz dazwischen heißt
+    höchstens doppelte Ergebniszeile, nie verlorenes Ergebnis.
+    """
+
+    def __init__(self, out_path: str, checkpoint_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+        self._out = open(out_path, "a", encoding="utf-8")
+        self._checkpoint = open(checkpoint_path, "a", encoding="utf-8")
+        self._lock = asyncio.Lock()
+
+    async def write(self, record: Dict[str, Any]) -> None:
+        async with self._lock:
+            self._out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            self._out.flush()
+            if record.get("status") == "ok":
+                self._checkpoint.write(json.dumps({"doc_id": record["doc_id"], "engine": record["engine"]}) + "\n")
+                self._checkpoint.flush()
+
+    def close(self) -> None:
+        self._out.close()
+        self._checkpoint.close()
+
+
+def _error_record(engine: str, doc_id: str, name: str, error: str) -> Dict[str, Any]:
+    """Fehlerzeile für Paper, das nicht geladen werden konnte. Wird nie checkpointet."""
+    return {
+        "doc_id": doc_id,
+        "source": name,
+        "engine": engine,
+        "status": "error",
+        "error": error,
+        "attempts": 0,
+        "elapsed_s": 0.0,
+        "result": {},
+    }
+
+
+def _result_error(result: Dict[str, Any]) -> Tuple[str, bool]:
+    """
+    Prüft, ob Pipeline-Ergebnis wirklich fertig ist. Gibt (Fehler, wiederholbar).
+
+    Pipelines werfen nicht bei jedem Problem. LangGraph liefert bei
+    Stage-Timeout normales Ergebnis mit "__TIMEOUT__" im Feld, lohnt neuen
+    Versuch. Fehlerantwort (z.B. leerer Text) mit Feld error bringt beim
+    nächsten Versuch dasselbe, daher nicht wiederholbar.
+    """
+    if result.get("error"):
+        return str(result["error"]), False
+    timed_out = [key for key, value in result.items() if value == TIMEOUT_SENTINEL]
+    if timed_out or int(result.get("timeouts") or 0) > 0:
+        return f"stage timeout: {', '.join(timed_out) or result.get('timeouts')}", True
+    return "", False
+
+
+async def _run_engine(
+    engine: str, doc_id: str, name: str, context: str, cfg: Dict[str, Any], retries: int = 0
+) -> Dict[str, Any]:
+    """
+    Ein (Paper, Engine) Paar, bei Fehler bis zu retries Wiederholungen.
+    Timeouts zählen als Fehler, nur status "ok" wird checkpointet.
+
+    Wiederholung ist billig: Antwort-Cache liefert fertige Stages sofort,
+    LangGraph mit langgraph_checkpoint springt direkt zur fehlgeschlagenen Node.
+    """
+    start = perf_counter()
+    attempts = 0
+    while True:
+        attempts += 1
+        try:
+            result = await ENGINES[engine](context, dict(cfg))
+            error, retryable = _result_error(result)
+        except Exception as exc:
+            result, error, retryable = {}, f"{type(exc).__name__}: {exc}", True
+        status = "error" if error else "ok"
+        if not error or not retryable or attempts > retries:
+            break
+        print(f"[retry {attempts}/{retries}] {name} {engine}: {error}", file=sys.stderr)
+    return {
+        "doc_id": doc_id,
+        "source": name,
+        "engine": engine,
+        "status": status,
+        "error": error,
+        "attempts": attempts,
+        "elapsed_s": round(perf_counter() - start, 2),
+        "result": result,
+    }
+
+
+async def run_batch(
+    source: str,
+    engines: List[str],
+    cfg: Dict[str, Any],
+    out_path: str,
+    checkpoint_path: str,
+    concurrency: int = 4,
+    retries: int = 0,
+) -> Dict[str, int]:
+    """
+    Führt alle (Paper, Engine) Paare mit begrenzter Parallelität aus.
+
+    concurrency begrenzt gleichzeitig laufende Pipelines. Zusätzlich sind
+    höchstens concurrency Papers gleichzeitig geladen, Eingabe wird lazy
+    gelesen. Bei tausenden Papers liegt also nie der ganze Korpus im Speicher.
+    Kontext wird pro Paper einmal gebaut und für alle Engines genutzt, wie in
+    eval_runner.
+    """
+    done = load_checkpoint(checkpoint_path)
+    source_is_dir = os.path.isdir(source)
+    concurrency = max(1, concurrency)
+    pipeline_slots = asyncio.Semaphore(concurrency)
+    paper_slots = asyncio.Semaphore(concurrency)
+    sink = _JsonlSink(out_path, checkpoint_path)
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    async def _one(engine: str, doc_id: str, name: str, context: str) -> None:
+        async with pipeline_slots:
+            record = await _run_engine(engine, doc_id, name, context, cfg, retries)
+        await sink.write(record)
+        counts[record["status"]] += 1
+        print(f"[{record['status']}] {name} {engine} {record['elapsed_s']}s", file=sys.stderr)
+
+    async def _fail(targets: List[str], doc_id: str, name: str, error: str) -> None:
+        for engine in targets:
+            await sink.write(_error_record(engine, doc_id, name, error))
+            counts["error"] += 1
+            print(f"[error] {name} {engine}: {error}", file=sys.stderr)
+
+    async def _process(name: str, value: str) -> None:
+        try:
+            # Laden/Vorverarbeitung ist CPU-Arbeit, nicht im Event-Loop.
+            # Fehler hier betreffen nur dieses Paper, nicht den ganzen Korpus.
+            try:
+                text = await asyncio.to_thread(_load_text, source_is_dir, value, cfg)
+            except Exception as exc:
+                await _fail(engines, name, name, f"load failed: {type(exc).__name__}: {exc}")
+                return
+            if text.startswith(PDF_ERROR_PREFIX):
+                # Kaputtes PDF kommt als Fehlertext zurück, nicht als Paper an Engines schicken
+                await _fail(engines, name, name, text.strip())
+                return
+            doc_id = _doc_id(text)
+            pending = [e for e in engines if (doc_id, e) not in done]
+            counts["skipped"] += len(engines) - len(pending)
+            if not pending:
+                return
+            try:
+                context = await asyncio.to_thread(build_cached_context, text, cfg)
+            except Exception as exc:
+                await _fail(pending, doc_id, name, f"preprocess failed: {type(exc).__name__}: {exc}")
+                return
+            await asyncio.gather(*(_one(engine, doc_id, name, context) for engine in pending))
+        finally:
+            paper_slots.release()
+
+    tasks = []
+    try:
+        for name, value in iter_inputs(source):
+            await paper_slots.acquire()
+            tasks.append(asyncio.create_task(_process(name, value)))
+        await asyncio.gather(*tasks)
+    finally:
+        sink.close()
+    return counts
+
+
+def _parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run pipelines over a corpus of papers.")
+    parser.add_argument("source", help="Directory with .pdf/.txt files or JSONL with a 'text' field")
+    parser.add_argument("--engines", default="langchain,langgraph,dspy", help="Comma-separated engine list")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max pipelines in flight")
+    parser.add_argument("--out", default="batch_results.jsonl", help="Streaming JSONL output")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint file (default: <out>.checkpoint)")
+    parser.add_argument("--config", default=None, help="JSON file with pipeline config")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--max-tokens", type=int, default=None)
+    parser.add_argument("--temperature", type=float, default=None)
+    parser.add_argument("--no-telemetry", action="store_true", help="Do not write telemetry rows")
+    parser.add_argument("--retries", type=int, default=0, help="Retry failed (paper, engine) pairs this many times")
+    parser.add_argument(
+        "--graph-checkpoint",
+        nargs="?",
+        const="sqlite",
+        default=None,
+        help="Checkpoint LangGraph runs so retries resume at the failed node (optional SQLite path, or 'memory')",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = _parse_args(argv)
+    engines = [e.strip().lower() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        print(f"Unknown engine(s): {', '.join(unknown)}. Choose from {', '.join(ENGINES)}.", file=sys.stderr)
+        return 2
+    if not os.path.exists(args.source):
+        print(f"Missing input: {args.source}", file=sys.stderr)
+        return 1
+
+    cfg: Dict[str, Any] = {"dspy_teleprompt": False}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            cfg.update(json.load(f))
+    if args.model:
+        cfg["model"] = args.model
+    if args.max_tokens is not None:
+        cfg["max_tokens"] = args.max_tokens
+    if args.temperature is not None:
+        cfg["temperature"] = args.temperature
+    if args.no_telemetry:
+        cfg["csv_telemetry"] = False
+    if args.graph_checkpoint:
+        cfg["langgraph_checkpoint"] = args.graph_checkpoint
+
+    checkpoint = args.checkpoint or f"{args.out}.checkpoint"
+    counts = asyncio.run(
+        run_batch(args.source, engines, cfg, args.out, checkpoint, args.concurrency, max(0, args.retries))
+    )
+    print(f"done: {counts['ok']} ok, {counts['error']} errors, {counts['skipped']} skipped (checkpoint)")
+    return 0 if counts["error"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import concurrent.futures as cf
+import io
+import multiprocessing
+import os
+import threading
+from time import perf_counter
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from pypdf import PdfReader
+
+# Hochzählen, wenn sich extrahierter Text ändert (preprocess_cache)
+EXTRACTOR_VERSION = 2
+# Präfix für Fehler statt Text, siehe extract_pdf_pages
+PDF_ERROR_PREFIX = "[PDF error]"
+
+# Parallel erst ab so vielen Seiten. Darunter kostet Prozessstart mehr als er spart.
+_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "12"))
+_DEFAULT_WORKERS = int(os.getenv("PDF_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+# (Seitennummer, Text, Sekunden, Engine) pro Seite
+PageResult = Tuple[int, str, float, str]
+
+_pool: Optional[cf.ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> cf.ProcessPoolExecutor:
+    """
+    Ein Prozess-Pool für alle Extraktionen.
+
+    spawn statt fork: Streamlit und Batch-Runner haben Threads offen, fork
+    kopiert deren Locks mit. Pool bleibt offen, Import von pdfplumber in den
+    Workern zahlen wir also nur einmal.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = cf.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool, _pool_workers = None, 0
+
+
+def _extract_page_range(data: bytes, start: int, end: int) -> List[PageResult]:
+    """
+    Seiten start..end-1 extrahieren. Läuft im Worker-Prozess.
+
+    pdfplumber pro Seite, pypdf nur für Seiten, bei denen pdfplumber
+    scheitert oder nichts liefert (z.B. kaputte Fonts auf einer Seite).
+    Früher fiel ganzes Dokument auf pypdf zurück, wenn pdfplumber komplett
+    scheiterte, und leere Seiten blieben leer.
+    """
+    results: List[PageResult] = []
+    plumber_pdf = None
+    pypdf_reader: Optional[PdfReader] = None
+    try:
+        import pdfplumber
+        plumber_pdf = pdfplumber.open(io.BytesIO(data))
+    except Exception:
+        plumber_pdf = None
+    try:
+        for page_no in range(start, end):
+            page_start = perf_counter()
+            text, engine = "", "pdfplumber"
+            if plumber_pdf is not None:
+                try:
+                    text = plumber_pdf.pages[page_no].extract_text(x_tolerance=1, y_tolerance=1) or ""
+                except Exception:
+                    text = ""
+            if not text.strip():
+                engine = "pypdf"
+                try:
+                    if pypdf_reader is None:
+                        pypdf_reader = PdfReader(io.BytesIO(data))
+                    text = pypdf_reader.pages[page_no].extract_text() or ""
+                except Exception:
+                    text = ""
+            results.append((page_no, text, perf_counter() - page_start, engine))
+    finally:
+        if plumber_pdf is not None:
+            plumber_pdf.close()
+    return results
+
+
+def _effective_workers(page_count: int, workers: Optional[int]) -> int:
+    if page_count < _PARALLEL_MIN_PAGES:
+        return 1
+    return max(1, int(workers or _DEFAULT_WORKERS))
+
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    # Zwei Bereiche pro Worker, damit ein langsamer Bereich (Tabellen, Formeln) nicht alles aufhält
+    size = max(1, -(-page_count // (workers * 2)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _page_count(data: bytes) -> int:
+    """Seitenzahl über pdfplumber wie die Extraktion, pypdf nur wenn das scheitert."""
+    try:
+        import pdfplumber
+        with pdfplumber.open(io.BytesIO(data)) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return len(PdfReader(io.BytesIO(data)).pages)
+
+
+def iter_pdf_pages(data: bytes, workers: Optional[int] = None) -> Iterator[PageResult]:
+    """
+    Liefert Seiten in Reihenfolge, sobald sie fertig sind.
+
+    Seitenbereiche laufen parallel im Prozess-Pool. Erster Bereich kommt
+    raus, sobald er fertig ist, auch wenn spätere noch laufen. Kleine PDFs
+    und workers=1 laufen direkt im aktuellen Prozess.
+    """
+    page_count = _page_count(data)
+    workers = _effective_workers(page_count, workers)
+    if workers == 1:
+        yield from _extract_page_range(data, 0, page_count)
+        return
+    ranges = _page_ranges(page_count, workers)
+    try:
+        pool = _get_pool(workers)
+        futures = [pool.submit(_extract_page_range, data, start, end) for start, end in ranges]
+    except Exception:
+        # Kein Prozessstart möglich (Sandbox, Limits): sequenziell weiter
+        yield from _extract_page_range(data, 0, page_count)
+        return
+    for (start, end), future in zip(ranges, futures):
+        try:
+            pages = future.result()
+        except cf.process.BrokenProcessPool:
+            # Worker abgestürzt, Bereich hier nachholen, Pool beim nächsten Mal neu
+            _reset_pool()
+            pages = _extract_page_range(data, start, end)
+        yield from pages
+
+
+def extract_pdf_pages(file_handle: Union[BinaryIO, bytes], workers: Optional[int] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Extrahiert Text aus PDF, mit Statistik.
+
+    Gibt (Text, Stats) zurück. Stats: pages, workers, total_s, pages_per_s,
+    page_s (Sekunden pro Seite) und fallback_pages (Seiten über pypdf).
+    Fehler landen als "[PDF error] ..." im Text statt als Exception, wie in
+    der UI. Seiten werden gesammelt und erst danach normalisiert: Kopf- und
+    Literaturerkennung in utils brauchen den ganzen Text.
+    """
+    data = file_handle if isinstance(file_handle, (bytes, bytearray)) else file_handle.read()
+    data = bytes(data)
+    start = perf_counter()
+    pages: List[str] = []
+    page_s: List[float] = []
+    fallback_pages: List[int] = []
+    try:
+        for page_no, text, seconds, engine in iter_pdf_pages(data, workers):
+            pages.append(text)
+            page_s.append(round(seconds, 4))
+            if engine != "pdfplumber":
+                fallback_pages.append(page_no + 1)
+    except Exception as e:
+        return f"{PDF_ERROR_PREFIX} {e}", {"pages": 0, "error": str(e)}
+    total_s = perf_counter() - start
+    stats = {
+        "pages": len(pages),
+        "workers": _effective_workers(len(pages), workers),
+        "total_s": round(total_s, 3),
+        "pages_per_s": round(len(pages) / total_s, 1) if total_s > 0 else 0.0,
+        "page_s": page_s,
+        "fallback_pages": fallback_pages,
+    }
+    return "\n\n".join(pages).strip(), stats
+
+
+def extract_pdf_text(file_handle: Union[BinaryIO, bytes], workers: Optional[int] = None) -> str:
+    """
+    Extrahiert Text aus PDF.
+
+    pdfplumber zuerst, liefert bei zweispaltigen Papers meist saubereren Text.
+    Fallback auf pypdf pro Seite. Lange PDFs seitenweise parallel über
+    Prozess-Pool (PDF_WORKERS), Reihenfolge bleibt gleich.
+    """
+    text, _ = extract_pdf_pages(file_handle, workers)
+    return text
+
+
+def load_document(path: str) -> str:
+    """Liest PDF oder Textdatei von Platte. Für Batch- und Eval-Tools."""
+    with open(path, "rb") as f:
+        data = f.read()
+    if os.path.splitext(path)[1].lower() == ".pdf":
+        return extract_pdf_text(data)
+    return data.decode("utf-8", errors="ignore")
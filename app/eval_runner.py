@@ -3,10 +3,11 @@ from __future__ import annotations
 import json, re, os, sys
 from typing import Dict
 
-from utils import build_analysis_context
+from preprocess_cache import analysis_context as build_cached_context
 from workflows.dspy_pipeline import run_pipeline as run_dspy
 from workflows.langchain_pipeline import run_pipeline as run_lc
 from workflows.langgraph_pipeline import run_pipeline as run_lg
+from workflows.shared_stages import with_shared_stages
 
 def _tokens(s: str) -> set[str]:
     """
@@ -51,10 +52,13 @@ def run_example(text: str, cfg: Dict):
     
     Führt LangChain, LangGraph und DSPy auf demselben Input aus, dann Metriken.
     F1-Score vergleicht Zusammenfassung mit ursprünglichen Notizen.
+    Mit cfg["share_stages"] (z.B. ["notes"]) übernimmt LangGraph die
+    Reader-Notizen von LangChain, statt sie nochmal zu bezahlen.
     """
-    ctx = build_analysis_context(text, cfg)
+    ctx = build_cached_context(text, cfg)
     out_lc = run_lc(ctx, cfg)
-    out_lg = run_lg(ctx, cfg)
+    share_stages = cfg.get("share_stages") or []
+    out_lg = run_lg(ctx, with_shared_stages(cfg, out_lc, share_stages) if share_stages else cfg)
     out_dp = run_dspy(ctx, cfg)
 
     def _annotate(out: Dict) -> Dict:
@@ -76,6 +80,8 @@ if __name__ == "__main__":
     # Base config
     cfg = {
         "dspy_teleprompt": False,
+        # Reader-Notizen einmal, LangGraph nutzt die von LangChain
+        "share_stages": ["notes"],
     }
     dev_path = "dev-set/dev.jsonl"
     if not os.path.exists(dev_path):
@@ -96,5 +102,6 @@ if __name__ == "__main__":
         for k in ("lc","lg","dspy"):
             print(
                 f"  {k.upper():5s}  F1={r[k]['f1']:.3f}  "
-                f"total_s={r[k].get('latency_s','?')}"
+                f"total_s={r[k].get('latency_s','?')}  "
+                f"reused={r[k].get('reused_stages') or '-'}"
             )
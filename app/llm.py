@@ -1,17 +1,72 @@
 from __future__ import annotations
 
+import asyncio
+import contextvars
 import os
-from typing import Optional
+import threading
+import weakref
+from time import perf_counter
+from typing import Any, Dict, Optional, Tuple
 
+import httpx
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 
+from llm_cache import acached_completion, cached_completion
+from streaming import active as streaming_active, emit_stage
+from usage import count_tokens, record as record_usage
+
 try:
     from dotenv import load_dotenv
     load_dotenv()
 except ImportError:
     pass
 
-_llm_instance: Optional[ChatOpenAI] = None
+# Standard für gleichzeitige Verbindungen pro geteiltem HTTP-Client. Batch-
+# und Compare-Läufe haben viele Stages parallel offen, httpx-Default
+# (20 Keep-Alive) würde sonst Verbindungen wegwerfen.
+_DEFAULT_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+
+# (model, base_url, temperature, max_tokens, timeout, max_retries, api_key)
+ClientKey = Tuple[str, str, float, int, int, int, str]
+
+_registry_lock = threading.Lock()
+_clients: Dict[Tuple[ClientKey, int], ChatOpenAI] = {}
+# Async-Clients hängen am Event-Loop (httpx-Pool). Streamlit und
+# batch_runner starten mehrere Loops, daher eigener Satz pro Loop.
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[ClientKey, int], ChatOpenAI]]" = (
+    weakref.WeakKeyDictionary()
+)
+_http_clients: Dict[int, httpx.Client] = {}
+_loop_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[int, httpx.AsyncClient]]" = (
+    weakref.WeakKeyDictionary()
+)
+_active_settings: contextvars.ContextVar[Optional[Tuple[ClientKey, int]]] = contextvars.ContextVar(
+    "llm_client_settings", default=None
+)
+
+
+def _limits(max_connections: int) -> httpx.Limits:
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+
+
+def _shared_http_client(max_connections: int) -> httpx.Client:
+    # Aufrufer hält _registry_lock
+    client = _http_clients.get(max_connections)
+    if client is None:
+        client = httpx.Client(limits=_limits(max_connections))
+        _http_clients[max_connections] = client
+    return client
+
+
+def _shared_async_http_client(loop: asyncio.AbstractEventLoop, max_connections: int) -> httpx.AsyncClient:
+    # Aufrufer hält _registry_lock
+    per_loop = _loop_http_clients.setdefault(loop, {})
+    client = per_loop.get(max_connections)
+    if client is None:
+        client = httpx.AsyncClient(limits=_limits(max_connections))
+        per_loop[max_connections] = client
+    return client
 
 
 def _create_openai_llm(
@@ -21,6 +76,9 @@ def _create_openai_llm(
     max_output_tokens: int,
     request_timeout_seconds: int,
     api_key: Optional[str] = None,
+    max_retries: int = 2,
+    http_client: Optional[httpx.Client] = None,
+    http_async_client: Optional[httpx.AsyncClient] = None,
 ) -> ChatOpenAI:
     api_key = api_key or os.getenv("OPENAI_API_KEY")
     if not api_key:
@@ -36,33 +94,192 @@ def _create_openai_llm(
         temperature=temperature,
         max_tokens=max_output_tokens,
         timeout=request_timeout_seconds,
+        max_retries=max_retries,
+        # Usage auch beim Streaming im letzten Chunk, für Token-Telemetrie
+        stream_usage=True,
+        http_client=http_client,
+        http_async_client=http_async_client,
     )
 
 
-def configure(config: Optional[dict] = None) -> None:
-    global _llm_instance
-
-    config_dict = config or {}
-
+def _settings_from_config(config_dict: Dict[str, Any]) -> Tuple[ClientKey, int]:
     model_name = config_dict.get("model") or os.getenv("OPENAI_MODEL", "gpt-4.1")
     base_url = config_dict.get("api_base") or os.getenv("OPENAI_BASE_URL", None)
-    api_key = config_dict.get("api_key") or os.getenv("OPENAI_API_KEY")
+    api_key = config_dict.get("api_key") or os.getenv("OPENAI_API_KEY") or ""
     temperature = float(config_dict.get("temperature") or os.getenv("OPENAI_TEMPERATURE", "0.0"))
     max_output_tokens = int(config_dict.get("max_tokens") or os.getenv("OPENAI_MAX_TOKENS", "4096"))
     request_timeout = int(config_dict.get("timeout") or os.getenv("OPENAI_TIMEOUT", "45"))
-
-    _llm_instance = _create_openai_llm(
-        model_name=model_name,
-        base_url=base_url,
-        api_key=api_key,
-        temperature=temperature,
-        max_output_tokens=max_output_tokens,
-        request_timeout_seconds=request_timeout,
+    # Retries verlängern hängende Aufrufe über Stage-Timeout hinaus, daher einstellbar
+    max_retries = int(config_dict.get("max_retries", os.getenv("OPENAI_MAX_RETRIES", "2")))
+    max_connections = int(config_dict.get("max_connections") or _DEFAULT_MAX_CONNECTIONS)
+    key: ClientKey = (
+        model_name, base_url or "", temperature, max_output_tokens, request_timeout, max_retries, api_key,
     )
+    return key, max(1, max_connections)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _client_for(settings: Tuple[ClientKey, int]) -> ChatOpenAI:
+    """
+    Holt Client aus Registry oder legt ihn an.
+
+    Alle Clients teilen einen httpx-Pool pro max_connections, Keep-Alive
+    und TLS-Sessions bleiben also über Stages und Läufe erhalten.
+    """
+    key, max_connections = settings
+    loop = _running_loop()
+    with _registry_lock:
+        clients = _clients if loop is None else _loop_clients.setdefault(loop, {})
+        chat_model = clients.get(settings)
+        if chat_model is None:
+            model_name, base_url, temperature, max_output_tokens, request_timeout, max_retries, api_key = key
+            chat_model = _create_openai_llm(
+                model_name=model_name,
+                base_url=base_url,
+                api_key=api_key,
+                temperature=temperature,
+                max_output_tokens=max_output_tokens,
+                request_timeout_seconds=request_timeout,
+                max_retries=max_retries,
+                http_client=_shared_http_client(max_connections),
+                http_async_client=(
+                    _shared_async_http_client(loop, max_connections) if loop is not None else None
+                ),
+            )
+            clients[settings] = chat_model
+        return chat_model
+
+
+def configure(config: Optional[dict] = None) -> ChatOpenAI:
+    """
+    Wählt Client-Konfiguration für aktuellen Lauf.
+
+    Gilt für aktuellen contextvars-Kontext, also auch für Worker, die mit
+    copy_context() laufen, und für asyncio-Tasks. Parallele Läufe mit
+    unterschiedlicher Config stören sich nicht.
+    """
+    settings = _settings_from_config(config or {})
+    _active_settings.set(settings)
+    return _client_for(settings)
+
+
+def get_llm(max_tokens: Optional[int] = None, temperature: Optional[float] = None) -> ChatOpenAI:
+    """
+    Client für aktuellen Lauf. Ohne configure() gelten Umgebungsvariablen.
+
+    max_tokens senkt das Ausgabelimit für einzelne Stages (z.B. Reviser),
+    höher als konfiguriert geht es nicht. temperature überschreibt die
+    Temperatur (Kandidaten im Best-of-N). Jeweils eigener Client in der
+    Registry, HTTP-Pool bleibt derselbe.
+    """
+    settings = _active_settings.get()
+    if settings is None:
+        settings = _settings_from_config({})
+    key, max_connections = settings
+    if temperature is not None:
+        key = key[:2] + (float(temperature),) + key[3:]
+    if max_tokens:
+        key = key[:3] + (min(int(max_tokens), key[3]),) + key[4:]
+    return _client_for((key, max_connections))
+
+
+def _cache_key_fields(chat_model: ChatOpenAI, prompt_value: Any) -> Dict[str, Any]:
+    # api_base gehört mit in den Schlüssel, gleicher Modellname bei anderem
+    # Provider ist nicht dieselbe Antwort
+    return {
+        "model": getattr(chat_model, "model_name", ""),
+        "api_base": getattr(chat_model, "openai_api_base", None) or "",
+        "temperature": getattr(chat_model, "temperature", None),
+        "max_tokens": getattr(chat_model, "max_tokens", None),
+        "prompt": prompt_value.to_string(),
+    }
+
+
+def _record_call(
+    stage: str,
+    chat_model: ChatOpenAI,
+    prompt_value: Any,
+    message: Any,
+    total_s: float,
+    ttft_s: Optional[float],
+) -> str:
+    """Usage aus response metadata erfassen. Ohne Angaben vom Provider geschätzt."""
+    text = getattr(message, "content", "") if message is not None else ""
+    usage = getattr(message, "usage_metadata", None) or {}
+    prompt_tokens = usage.get("input_tokens") or count_tokens(prompt_value.to_string())
+    completion_tokens = usage.get("output_tokens")
+    if completion_tokens is None:
+        completion_tokens = count_tokens(text)
+    record_usage(stage, getattr(chat_model, "model_name", ""), prompt_tokens, completion_tokens, total_s, ttft_s)
+    return text
+
+
+def invoke_prompt(
+    stage: str,
+    prompt: ChatPromptTemplate,
+    inputs: Dict[str, Any],
+    chat_model: ChatOpenAI,
+    stream: bool = True,
+) -> Any:
+    """
+    Rendert Prompt und ruft Modell auf, mit Antwort-Cache davor.
+
+    Entspricht `(prompt | chat_model).invoke(inputs)`. Prompt wird aber
+    vorher gerendert, damit Cache-Schlüssel genau den gesendeten Text enthält.
+    Aufruf läuft gestreamt, nur so lässt sich Time-to-first-token messen.
+    Ergebnis ist trotzdem der komplette Text. Bisheriger Text geht pro Chunk
+    an streaming.emit_stage. stream=False für Teilaufrufe einer Stage
+    (Reader-Chunks, Kandidaten), deren Text nicht das Stage-Ergebnis ist.
+    """
+    prompt_value = prompt.invoke(inputs)
+    stream = stream and streaming_active()
+
+    def _call() -> Any:
+        start = perf_counter()
+        ttft_s = None
+        message = None
+        for chunk in chat_model.stream(prompt_value):
+            if ttft_s is None and chunk.content:
+                ttft_s = perf_counter() - start
+            message = chunk if message is None else message + chunk
+            if stream and chunk.content:
+                emit_stage(stage, message.content)
+        return _record_call(stage, chat_model, prompt_value, message, perf_counter() - start, ttft_s)
+
+    return cached_completion(stage, _cache_key_fields(chat_model, prompt_value), _call)
+
+
+async def ainvoke_prompt(
+    stage: str,
+    prompt: ChatPromptTemplate,
+    inputs: Dict[str, Any],
+    chat_model: ChatOpenAI,
+    stream: bool = True,
+) -> Any:
+    """Wie invoke_prompt, aber über astream. Blockiert keinen Event-Loop-Thread."""
+    prompt_value = await prompt.ainvoke(inputs)
+    stream = stream and streaming_active()
+
+    async def _call() -> Any:
+        start = perf_counter()
+        ttft_s = None
+        message = None
+        async for chunk in chat_model.astream(prompt_value):
+            if ttft_s is None and chunk.content:
+                ttft_s = perf_counter() - start
+            message = chunk if message is None else message + chunk
+            if stream and chunk.content:
+                emit_stage(stage, message.content)
+        return _record_call(stage, chat_model, prompt_value, message, perf_counter() - start, ttft_s)
 
+    return await acached_completion(stage, _cache_key_fields(chat_model, prompt_value), _call)
 
-llm: Optional[ChatOpenAI] = None
 
-if _llm_instance is None:
-    configure({})
-    llm = _llm_instance
+# Import-Zeit-Client, nur noch für ältere Aufrufer. Agents nutzen get_llm().
+llm: Optional[ChatOpenAI] = get_llm()
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+
+# Persistenter Antwort-Cache für LLM-Aufrufe. Compare-Tab, eval_runner und
+# DSPy-Teleprompting schicken immer wieder identische Prompts. Schlüssel ist
+# ein Hash über Modell, Temperatur, max_tokens und gerenderten Prompt.
+
+_DEFAULT_DIR = os.getenv("LLM_CACHE_DIR", os.path.join("local_cache", "llm"))
+_DEFAULT_TTL_S = int(os.getenv("LLM_CACHE_TTL_S", str(7 * 24 * 3600)))
+_DEFAULT_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "256"))
+_DEFAULT_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1").lower() in {"1", "true", "yes", "on"}
+# Antworten mit Temperatur > 0 sind Stichproben. Replay würde z.B. Best-of-N
+# immer dieselben Kandidaten liefern. Nur cachen, wenn ausdrücklich gewünscht
+# (Eval-Läufe, die reproduzierbar sein sollen).
+_DEFAULT_SAMPLED = os.getenv("LLM_CACHE_SAMPLED", "0").lower() in {"1", "true", "yes", "on"}
+
+# Nur alle N Schreibvorgänge Verzeichnis scannen. Scan kostet bei vielen
+# Einträgen spürbar, Größe muss aber nicht exakt eingehalten werden.
+_EVICT_EVERY = 50
+
+PIPELINE_STAGES: Tuple[str, ...] = ("reader", "summarizer", "critic", "reviser", "integrator")
+
+
+class ResponseCache:
+    """
+    Content-addressed Cache auf der Platte.
+
+    Ein Eintrag pro Datei, verteilt auf Unterordner nach den ersten zwei
+    Hex-Zeichen. Schreiben atomar über temporäre Datei + os.replace, damit
+    parallele Läufe keine halben Einträge lesen. Treffer setzen mtime neu,
+    Eviction entfernt zuerst abgelaufene Einträge, dann die ältesten (LRU).
+    """
+
+    def __init__(self, directory: str, ttl_s: int, max_bytes: int):
+        self.directory = directory
+        self.ttl_s = max(0, int(ttl_s))
+        self.max_bytes = max(0, int(max_bytes))
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    @staticmethod
+    def key(**fields: Any) -> str:
+        payload = json.dumps(fields, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _expired(self, created: float, now: float) -> bool:
+        return bool(self.ttl_s) and (now - created) > self.ttl_s
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        now = time.time()
+        if self._expired(float(entry.get("created", 0.0)), now):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        response = entry.get("response")
+        return response if isinstance(response, str) else None
+
+    def put(self, key: str, response: str, **meta: Any) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entry = {"created": time.time(), "response": response, **meta}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._writes += 1
+            due = self._writes % _EVICT_EVERY == 1
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Entfernt abgelaufene Einträge und kürzt Cache auf max_bytes."""
+        now = time.time()
+        entries = []
+        total = 0
+        try:
+            shards = list(os.scandir(self.directory))
+        except OSError:
+            return
+        for shard in shards:
+            if not shard.is_dir():
+                continue
+            try:
+                files = list(os.scandir(shard.path))
+            except OSError:
+                continue
+            for entry in files:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                # mtime = letzter Zugriff, Alter über TTL reicht als Näherung
+                if self._expired(stat.st_mtime, now):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+class CacheStats:
+    """Treffer/Fehlschläge pro Stage für einen Pipeline-Lauf."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Dict[str, int]] = {}
+
+    def record(self, stage: str, hit: bool) -> None:
+        with self._lock:
+            counts = self.stages.setdefault(stage, {"hits": 0, "misses": 0})
+            counts["hits" if hit else "misses"] += 1
+
+    def as_row(self, stages: Tuple[str, ...] = PIPELINE_STAGES) -> Dict[str, int]:
+        """
+        Flache Spalten für log_row.
+
+        Feste Stage-Liste, damit CSV-Header zwischen Läufen gleich bleibt.
+        Zusätzliche Stages (z.B. Teleprompting) landen nur in den Summen.
+        """
+        with self._lock:
+            row = {
+                "cache_hits": sum(c["hits"] for c in self.stages.values()),
+                "cache_misses": sum(c["misses"] for c in self.stages.values()),
+            }
+            for stage in stages:
+                counts = self.stages.get(stage, {})
+                row[f"{stage}_cache_hits"] = counts.get("hits", 0)
+                row[f"{stage}_cache_misses"] = counts.get("misses", 0)
+        return row
+
+
+class _RunState:
+    def __init__(self, cache: Optional[ResponseCache], stats: CacheStats, sampled: bool = _DEFAULT_SAMPLED):
+        self.cache = cache
+        self.stats = stats
+        self.sampled = sampled
+
+
+_caches: Dict[Tuple[str, int, int], ResponseCache] = {}
+_caches_lock = threading.Lock()
+_active_run: contextvars.ContextVar[Optional[_RunState]] = contextvars.ContextVar("llm_cache_run", default=None)
+
+
+def get_cache(
+    directory: str = _DEFAULT_DIR,
+    ttl_s: int = _DEFAULT_TTL_S,
+    max_mb: int = _DEFAULT_MAX_MB,
+) -> ResponseCache:
+    """Eine Instanz pro Konfiguration, damit Schreibzähler geteilt wird."""
+    key = (directory, int(ttl_s), int(max_mb))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ResponseCache(directory, ttl_s, int(max_mb) * 1024 * 1024)
+            _caches[key] = cache
+        return cache
+
+
+def _cache_from_config(config: Dict[str, Any]) -> Optional[ResponseCache]:
+    enabled = config.get("llm_cache", _DEFAULT_ENABLED)
+    if not enabled:
+        return None
+    return get_cache(
+        directory=config.get("llm_cache_dir") or _DEFAULT_DIR,
+        ttl_s=int(config.get("llm_cache_ttl_s", _DEFAULT_TTL_S)),
+        max_mb=int(config.get("llm_cache_max_mb", _DEFAULT_MAX_MB)),
+    )
+
+
+@contextmanager
+def track(config: Optional[Dict[str, Any]] = None) -> Iterator[CacheStats]:
+    """
+    Aktiviert Cache-Einstellungen aus config für aktuellen Lauf.
+
+    Läuft über contextvars. Worker-Threads, die mit copy_context() gestartet
+    werden, sehen dieselben Stats. So zählen auch Timeout-Threads von
+    LangGraph mit.
+    """
+    config = config or {}
+    state = _RunState(
+        _cache_from_config(config),
+        CacheStats(),
+        sampled=bool(config.get("llm_cache_sampled", _DEFAULT_SAMPLED)),
+    )
+    token = _active_run.set(state)
+    try:
+        yield state.stats
+    finally:
+        _active_run.reset(token)
+
+
+@contextmanager
+def disabled() -> Iterator[None]:
+    """Schaltet Cache temporär ab, z.B. während DSPy-Compile Traces sammelt."""
+    current = _active_run.get()
+    stats = current.stats if current is not None else CacheStats()
+    sampled = current.sampled if current is not None else _DEFAULT_SAMPLED
+    token = _active_run.set(_RunState(None, stats, sampled))
+    try:
+        yield
+    finally:
+        _active_run.reset(token)
+
+
+def _current(
+    key_fields: Dict[str, Any], cache_sampled: bool = False
+) -> Tuple[Optional[ResponseCache], Optional[CacheStats]]:
+    state = _active_run.get()
+    if state is None:
+        cache, stats, sampled = (get_cache() if _DEFAULT_ENABLED else None), None, _DEFAULT_SAMPLED
+    else:
+        cache, stats, sampled = state.cache, state.stats, state.sampled
+    if cache is not None and not (sampled or cache_sampled) and _is_sampled(key_fields):
+        return None, stats
+    return cache, stats
+
+
+def _is_sampled(key_fields: Dict[str, Any]) -> bool:
+    try:
+        return float(key_fields.get("temperature") or 0.0) > 0.0
+    except (TypeError, ValueError):
+        return False
+
+
+def _lookup(stage: str, cache: ResponseCache, stats: Optional[CacheStats], key: str) -> Optional[str]:
+    cached = cache.get(key)
+    if stats is not None:
+        stats.record(stage, cached is not None)
+    return cached
+
+
+def _store(stage: str, cache: ResponseCache, key: str, key_fields: Dict[str, Any], value: Any) -> None:
+    if isinstance(value, str) and value.strip() and value != "__TIMEOUT__":
+        cache.put(key, value, stage=stage, model=key_fields.get("model", ""))
+
+
+def cached_completion(
+    stage: str,
+    key_fields: Dict[str, Any],
+    compute: Callable[[], Any],
+    cache_sampled: bool = False,
+) -> Any:
+    """
+    Liefert gecachte Antwort oder ruft compute() auf und speichert Ergebnis.
+
+    Ohne aktiven track()-Block gilt Standard aus Umgebungsvariablen. Leere
+    Antworten und Timeout-Sentinels werden nie gespeichert. Bei Temperatur
+    > 0 wird nur mit llm_cache_sampled bzw. LLM_CACHE_SAMPLED gecacht, oder
+    mit cache_sampled=True für Ergebnisse, die fest bleiben sollen.
+    """
+    cache, stats = _current(key_fields, cache_sampled)
+    if cache is None:
+        return compute()
+    key = cache.key(**key_fields)
+    cached = _lookup(stage, cache, stats, key)
+    if cached is not None:
+        return cached
+    value = compute()
+    _store(stage, cache, key, key_fields, value)
+    return value
+
+
+async def acached_completion(
+    stage: str,
+    key_fields: Dict[str, Any],
+    compute: Callable[[], Awaitable[Any]],
+    cache_sampled: bool = False,
+) -> Any:
+    """
+    Async-Variante von cached_completion.
+
+    Cache-Dateien sind klein, Lesen/Schreiben bleibt synchron. Nur der
+    LLM-Aufruf selbst wird awaited.
+    """
+    cache, stats = _current(key_fields, cache_sampled)
+    if cache is None:
+        return await compute()
+    key = cache.key(**key_fields)
+    cached = _lookup(stage, cache, stats, key)
+    if cached is not None:
+        return cached
+    value = await compute()
+    _store(stage, cache, key, key_fields, value)
+    return value
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+from documents import EXTRACTOR_VERSION, PDF_ERROR_PREFIX, extract_pdf_pages, extract_pdf_text
+from llm_cache import ResponseCache, get_cache
+from utils import NORMALIZER_VERSION, build_analysis_context
+
+# Persistenter Cache für Vorverarbeitung. Streamlit führt bei jeder Widget-
+# Änderung read_uploaded_files und build_analysis_context für alle Tabs neu
+# aus, pdfplumber braucht für ein 50-Seiten-PDF mehrere Sekunden. Schlüssel
+# ist Inhalts-Hash plus Version von Extraktor bzw. Normalisierung. Ändert
+# sich eins davon, Version hochzählen, alte Einträge werden nie mehr
+# getroffen und fallen über LRU raus. Gleiche Ablage wie LLM-Cache.
+
+_DEFAULT_DIR = os.getenv("PREPROCESS_CACHE_DIR", os.path.join("local_cache", "preprocess"))
+_DEFAULT_MAX_MB = int(os.getenv("PREPROCESS_CACHE_MAX_MB", "512"))
+_DEFAULT_ENABLED = os.getenv("PREPROCESS_CACHE_ENABLED", "1").lower() in {"1", "true", "yes", "on"}
+
+# Config-Felder, die build_analysis_context beeinflussen. Neue Felder hier
+# eintragen, sonst liefert Cache alten Kontext.
+_CONTEXT_CONFIG_KEYS = ("context_budget_tokens",)
+
+
+def _cache(config: Optional[Dict[str, Any]] = None) -> Optional[ResponseCache]:
+    config_dict = config or {}
+    if not config_dict.get("preprocess_cache", _DEFAULT_ENABLED):
+        return None
+    # Kein TTL, Einträge veralten nur über Versionen
+    return get_cache(
+        directory=config_dict.get("preprocess_cache_dir") or _DEFAULT_DIR,
+        ttl_s=0,
+        max_mb=int(config_dict.get("preprocess_cache_max_mb", _DEFAULT_MAX_MB)),
+    )
+
+
+def _content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def extract_text(
+    data: bytes,
+    name: str = "",
+    config: Optional[Dict[str, Any]] = None,
+    is_pdf: Optional[bool] = None,
+) -> str:
+    """
+    Text aus PDF- oder Textdatei-Inhalt, PDFs über Cache.
+
+    Fehlertexte ("[PDF error] ...") werden nicht gespeichert, sonst bleibt
+    kaputte Extraktion nach Bugfix oder neuem Paket hängen.
+    """
+    if is_pdf is None:
+        is_pdf = name.lower().endswith(".pdf")
+    if not is_pdf:
+        return data.decode("utf-8", errors="ignore")
+    cache = _cache(config)
+    if cache is None:
+        return extract_pdf_text(data)
+    key = ResponseCache.key(kind="pdf_text", sha256=_content_hash(data), extractor=EXTRACTOR_VERSION)
+    text = cache.get(key)
+    if text is not None:
+        return text
+    text, stats = extract_pdf_pages(data)
+    if not text.startswith(PDF_ERROR_PREFIX):
+        # Extraktionszeiten mitspeichern, zeigt bei Bedarf langsame Seiten
+        cache.put(key, text, kind="pdf_text", source=os.path.basename(name), extraction=stats)
+    return text
+
+
+def load_document(path: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """Wie documents.load_document, aber PDFs über Cache."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return extract_text(data, path, config)
+
+
+def analysis_context(raw_text: str, config: Optional[Dict[str, Any]] = None) -> str:
+    """build_analysis_context über Cache."""
+    config_dict = config or {}
+    cache = _cache(config_dict)
+    if cache is None or not raw_text:
+        return build_analysis_context(raw_text, config_dict)
+    key = ResponseCache.key(
+        kind="analysis_context",
+        sha256=_content_hash(raw_text.encode("utf-8", errors="ignore")),
+        normalizer=NORMALIZER_VERSION,
+        config={k: config_dict.get(k) for k in _CONTEXT_CONFIG_KEYS},
+    )
+    context = cache.get(key)
+    if context is not None:
+        return context
+    context = build_analysis_context(raw_text, config_dict)
+    cache.put(key, context, kind="analysis_context")
+    return context
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import BM25, section_units, tokenize
+
+# Lokaler Chunk-Index pro Paper. Retriever-Node baut ihn, spätere Nodes
+# (Critic, auch in Critic-Schleifen) holen gezielt Belegstellen statt ganzen
+# Text. Index liegt im Speicher, LRU pro Dokument-Hash. Wiederholte Läufe auf
+# gleichem Paper (Compare-Tab, eval_runner, Batch) bauen ihn nicht neu.
+
+DEFAULT_CHUNK_CHARS = 800
+DEFAULT_TOP_K = 4
+_MAX_INDEXES = 32
+
+# Zeilen wie "Title: ..." oder "Practical Takeaways:" sind keine prüfbaren Aussagen
+_LABEL_ONLY_PATTERN = re.compile(r"^[A-Za-z /]+:\s*$")
+
+
+def doc_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8", errors="ignore")).hexdigest()[:16]
+
+
+class ChunkIndex:
+    """BM25 über Abschnitts-Chunks eines Papers."""
+
+    def __init__(self, doc_id: str, chunks: List[str]):
+        self.doc_id = doc_id
+        self.chunks = chunks
+        self._bm25 = BM25([tokenize(chunk) for chunk in chunks])
+
+    def search(self, query: str, top_k: int = DEFAULT_TOP_K) -> List[Tuple[int, float]]:
+        """(Chunk-Index, Score) der besten Treffer, nur Score > 0."""
+        scores = self._bm25.scores(tokenize(query))
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [(i, scores[i]) for i in ranked[:top_k] if scores[i] > 0]
+
+
+_indexes: "OrderedDict[Tuple[str, int], ChunkIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(text: str, chunk_chars: int = DEFAULT_CHUNK_CHARS) -> ChunkIndex:
+    """Index für text aus Cache oder neu gebaut."""
+    key = (doc_hash(text), int(chunk_chars))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    # Bauen außerhalb vom Lock, parallele Läufe auf verschiedenen Papers blockieren sich nicht
+    index = ChunkIndex(key[0], section_units(text, max(200, int(chunk_chars))))
+    with _indexes_lock:
+        index = _indexes.setdefault(key, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > _MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def clear_indexes() -> None:
+    with _indexes_lock:
+        _indexes.clear()
+
+
+def retrieval_settings(config: Optional[Dict[str, Any]] = None) -> Tuple[int, int]:
+    """Gibt (retrieval_chunk_chars, retrieval_top_k) aus config zurück."""
+    config_dict = config or {}
+    chunk_chars = int(config_dict.get("retrieval_chunk_chars") or DEFAULT_CHUNK_CHARS)
+    top_k = int(config_dict.get("retrieval_top_k") or DEFAULT_TOP_K)
+    return chunk_chars, max(1, top_k)
+
+
+def _claims(summary: str) -> List[str]:
+    claims = []
+    for line in (summary or "").splitlines():
+        line = line.strip().lstrip("-*• ").strip()
+        if len(line) < 12 or _LABEL_ONLY_PATTERN.match(line):
+            continue
+        claims.append(line)
+    return claims
+
+
+def evidence_for(index: ChunkIndex, summary: str, top_k: int = DEFAULT_TOP_K) -> str:
+    """
+    Belegstellen für Aussagen in summary.
+
+    Jede Zeile der Zusammenfassung ist eine Anfrage. Pro Chunk zählt der beste
+    Score über alle Anfragen, sonst gewinnen lange Chunks, die zu allem ein
+    bisschen passen. Zahlen sind eigene Tokens, "F1=87.3" findet also genau
+    die Tabelle mit 87.3. Ausgabe in Reihenfolge vom Paper.
+    """
+    best: Dict[int, float] = {}
+    for claim in _claims(summary):
+        for chunk_id, score in index.search(claim, top_k):
+            best[chunk_id] = max(score, best.get(chunk_id, 0.0))
+    selected = sorted(best, key=lambda i: best[i], reverse=True)[:top_k]
+    return "\n\n".join(f"[{i + 1}] {index.chunks[i]}" for i in sorted(selected))
+
+
+def critic_evidence(config: Optional[Dict[str, Any]], analysis_context: str, summary: str) -> str:
+    """Evidence-Block für Critic, leer wenn config["critic_evidence"] aus ist."""
+    if not (config or {}).get("critic_evidence") or not analysis_context:
+        return ""
+    chunk_chars, top_k = retrieval_settings(config)
+    return evidence_for(get_index(analysis_context, chunk_chars), summary, top_k)
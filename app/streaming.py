@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# Teilausgaben während eines Laufs, z.B. für die UI. Gleiches Muster wie
+# usage.track: Callback pro Lauf über contextvars, Worker mit copy_context
+# melden mit. Callback bekommt (Feld, bisheriger Text, fertig). Feld ist
+# notes, summary, critic oder meta wie im Ergebnis der Pipelines.
+# Tokens kommen aus invoke_prompt (gestreamt), fertige Stage-Ausgaben aus
+# den Pipelines, auch bei Cache-Treffern und wiederverwendeten Stages.
+
+OnPartial = Callable[[str, str, bool], None]
+
+# Welche Stage welches Ergebnisfeld schreibt. Reviser liefert nur Patch,
+# die fertige Zusammenfassung meldet die Pipeline.
+STAGE_FIELDS = {"reader": "notes", "summarizer": "summary", "critic": "critic", "integrator": "meta"}
+PARTIAL_FIELDS = tuple(STAGE_FIELDS.values())
+
+_active_callback: contextvars.ContextVar[Optional[OnPartial]] = contextvars.ContextVar("on_partial", default=None)
+
+
+@contextmanager
+def listen(on_partial: Optional[OnPartial]) -> Iterator[None]:
+    """Callback für Dauer des Laufs setzen. None ändert nichts."""
+    if on_partial is None:
+        yield
+        return
+    token = _active_callback.set(on_partial)
+    try:
+        yield
+    finally:
+        _active_callback.reset(token)
+
+
+def active() -> bool:
+    return _active_callback.get() is not None
+
+
+def emit(field: str, text: str, done: bool = False) -> None:
+    """
+    Teilausgabe melden. Ohne aktiven listen()-Block passiert nichts.
+
+    Fehler im Callback (z.B. UI schon weg) brechen Lauf nicht ab.
+    """
+    callback = _active_callback.get()
+    if callback is None or field not in PARTIAL_FIELDS:
+        return
+    try:
+        callback(field, text or "", done)
+    except Exception:
+        pass
+
+
+def emit_stage(stage: str, text: str, done: bool = False) -> None:
+    field = STAGE_FIELDS.get(stage)
+    if field is not None:
+        emit(field, text, done)
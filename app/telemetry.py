@@ -1,6 +1,26 @@
 from __future__ import annotations
 
-import os, csv
+import atexit
+import csv
+import json
+import math
+import os
+import queue
+import threading
+import sqlite3
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 
 _DEFAULT_FIELDS: list[str] = [
     "engine", # "langchain" | "langgraph" | "dspy"
@@ -20,6 +40,18 @@ _WANDB_PROJECT = os.getenv("WANDB_PROJECT") or "multi_agent_orchestration"
 _WANDB_ENTITY = os.getenv("WANDB_ENTITY")
 _wandb_run = None
 
+# Backend: "csv" (Standard, eine Datei pro path) oder "sqlite" (eine
+# Datenbank mit Indizes, Dashboard liest nur angezeigte Zeilen)
+_BACKEND = os.getenv("TELEMETRY_BACKEND", "csv").strip().lower()
+_DB_PATH = os.getenv("TELEMETRY_DB", "telemetry.db")
+_CSV_PATH = "telemetry.csv"
+
+STAGE_COLUMNS: Tuple[str, ...] = ("reader_s", "summarizer_s", "critic_s", "integrator_s")
+
+# Writer sammelt bis zu _BATCH_MAX Zeilen oder wartet _FLUSH_INTERVAL_S
+_FLUSH_INTERVAL_S = float(os.getenv("TELEMETRY_FLUSH_S", "0.5"))
+_BATCH_MAX = 256
+
 def _get_wandb():
     global _wandb_run
     if not _WANDB_ENABLED:
@@ -41,64 +73,500 @@ def _get_wandb():
         return None
 
 
-def _ensure_fields(row: dict) -> list[str]:
-    """Add extra keys from row to default columns."""
-    fields = list(_DEFAULT_FIELDS)
-    for k in row.keys():
-        if k not in fields:
-            fields.append(k)
-    return fields
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """
+    Prozessübergreifende Sperre über Lock-Datei neben der CSV.
 
-def log_row(row: dict, path: str = "telemetry.csv"):
+    fcntl auf Unix, msvcrt auf Windows. Ohne beides nur Thread-Sperre im
+    Writer, reicht für einen Prozess.
     """
-    Write telemetry row to CSV.
+    lock_path = f"{path}.lock"
+    directory = os.path.dirname(os.path.abspath(lock_path))
+    os.makedirs(directory, exist_ok=True)
+    with open(lock_path, "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
 
+class _CsvTarget:
     """
-    row = dict(row or {})
-    fields = _ensure_fields(row)
+    Schema und zuletzt gesehene Dateigröße einer CSV-Datei.
 
-    exists = os.path.exists(path)
-    if exists:
-        try:
-            with open(path, "r", encoding="utf-8", newline="") as f:
-                r = csv.reader(f)
-                first = next(r, None)
-                if first:
-                    old_fields = list(first)
-                    for k in fields:
-                        if k not in old_fields:
-                            old_fields.append(k)
-                    fields = old_fields
-        except Exception:
-            pass
-
-    write_header = not exists
-    if exists:
-        try:
-            with open(path, "r", encoding="utf-8", newline="") as f:
-                rd = csv.reader(f)
-                first = next(rd, None)
-                write_header = (not first) or (first != fields)
-        except Exception:
-            write_header = True
-
-    if exists and write_header:
-        base, ext = os.path.splitext(path)
-        rotated = f"{base}.bak"
+    Header wird nur neu gelesen, wenn Datei seit unserem letzten Schreiben
+    anders groß ist, also ein anderer Prozess geschrieben hat.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fields: List[str] = []
+        self.known_size: Optional[int] = None
+
+    def _read_header(self) -> List[str]:
         try:
-            os.replace(path, rotated)
-            exists = False
-        except Exception:
-            pass
-
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
-        if not exists:
-            w.writeheader()
-        w.writerow(row)
-    run = _get_wandb()
-    if run:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                return list(next(csv.reader(f), None) or [])
+        except OSError:
+            return []
+
+    def _size(self) -> Optional[int]:
         try:
-            run.log(row)
-        except Exception:
-            pass
+            return os.path.getsize(self.path)
+        except OSError:
+            return None
+
+    def write(self, rows: List[dict]) -> None:
+        with _file_lock(self.path):
+            size = self._size()
+            if size != self.known_size:
+                self.fields = self._read_header() if size else []
+            on_disk = list(self.fields) if size else []
+            wanted = list(on_disk) if on_disk else list(_DEFAULT_FIELDS)
+            for row in rows:
+                for key in row.keys():
+                    if key not in wanted:
+                        wanted.append(key)
+
+            if on_disk and wanted != on_disk:
+                # Schema gewachsen: Datei einmal mit Vereinigungs-Header neu
+                # schreiben. Alte Zeilen bleiben, neue Spalten leer. Kein .bak.
+                self._rewrite(wanted)
+
+            self.fields = wanted
+            with open(self.path, "a", newline="", encoding="utf-8") as f:
+                w = csv.DictWriter(f, fieldnames=self.fields, extrasaction="ignore")
+                if not on_disk:
+                    w.writeheader()
+                w.writerows(rows)
+            self.known_size = self._size()
+
+    def _rewrite(self, fields: List[str]) -> None:
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(self.path, "r", encoding="utf-8", newline="") as src, \
+                open(tmp_path, "w", encoding="utf-8", newline="") as dst:
+            reader = csv.DictReader(src)
+            writer = csv.DictWriter(dst, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for old_row in reader:
+                writer.writerow(old_row)
+        os.replace(tmp_path, self.path)
+
+
+class _SqliteTarget:
+    """
+    Telemetrie in SQLite.
+
+    Häufig gefilterte Spalten als echte Spalten mit Index, komplette Zeile
+    zusätzlich als JSON. Neue Felder brauchen so keine Migration. WAL erlaubt
+    Lesen im Dashboard, während Writer schreibt, auch aus anderen Prozessen.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # Verbindung gehört dem Writer-Thread, wird nur dort benutzt
+        if self._conn is None:
+            self._conn = _connect(self.db_path)
+            _ensure_schema(self._conn)
+        return self._conn
+
+    def write(self, rows: List[dict]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO runs (timestamp, engine, model, latency_s, reader_s, summarizer_s, "
+                "critic_s, integrator_s, row_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        str(row.get("timestamp") or ""),
+                        str(row.get("engine") or ""),
+                        str(row.get("model") or ""),
+                        _as_float(row.get("latency_s")),
+                        *(_as_float(row.get(c)) for c in STAGE_COLUMNS),
+                        json.dumps(row, ensure_ascii=False, default=str),
+                    )
+                    for row in rows
+                ],
+            )
+
+
+def _as_float(value: object) -> Optional[float]:
+    try:
+        return float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "timestamp TEXT, engine TEXT, model TEXT, latency_s REAL, "
+            "reader_s REAL, summarizer_s REAL, critic_s REAL, integrator_s REAL, "
+            "row_json TEXT NOT NULL)"
+        )
+        # (engine, latency_s) deckt auch Filter nur nach engine ab
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_engine_latency ON runs (engine, latency_s)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_model ON runs (model)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_timestamp ON runs (timestamp)")
+
+
+class _TelemetrySink:
+    """
+    Hintergrund-Writer für Telemetrie.
+
+    log_row legt Zeile nur in Queue. Ein Daemon-Thread schreibt gesammelt
+    (eine Sperre, ein open pro Batch und Datei) und loggt nach W&B. Pipelines
+    warten also nie auf Platte oder Netzwerk.
+    """
+
+    def __init__(self):
+        # Einträge: (path, row) oder threading.Event als Flush-Marker
+        self._queue: "queue.Queue[Union[Tuple[str, dict], threading.Event]]" = queue.Queue()
+        self._targets: Dict[str, Union[_CsvTarget, _SqliteTarget]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+                self._thread.start()
+
+    def put(self, row: dict, path: str) -> None:
+        self._ensure_started()
+        self._queue.put((path, row))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis alle bisher eingereihten Zeilen geschrieben sind."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def _drain(self) -> Tuple[List[Tuple[str, dict]], List[threading.Event]]:
+        batch: List[Tuple[str, dict]] = []
+        markers: List[threading.Event] = []
+        item = self._queue.get()
+        deadline = time.monotonic() + _FLUSH_INTERVAL_S
+        while True:
+            if isinstance(item, threading.Event):
+                # Flush angefordert: nicht weiter sammeln, sofort schreiben
+                markers.append(item)
+                break
+            batch.append(item)
+            if len(batch) >= _BATCH_MAX:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+        return batch, markers
+
+    def _run(self) -> None:
+        while True:
+            batch, markers = self._drain()
+            by_path: Dict[str, List[dict]] = {}
+            for path, row in batch:
+                by_path.setdefault(path, []).append(row)
+            for path, rows in by_path.items():
+                target = self._targets.get(path)
+                if target is None:
+                    target = _SqliteTarget(path) if _is_sqlite(path) else _CsvTarget(path)
+                    self._targets[path] = target
+                try:
+                    target.write(rows)
+                except Exception:
+                    # Telemetrie darf Läufe nie stören, Batch verwerfen
+                    pass
+            run = _get_wandb() if batch else None
+            if run:
+                for _, row in batch:
+                    try:
+                        run.log(row)
+                    except Exception:
+                        pass
+            for marker in markers:
+                marker.set()
+
+
+_sink = _TelemetrySink()
+
+
+def backend() -> str:
+    return "sqlite" if _BACKEND == "sqlite" else "csv"
+
+
+def _is_sqlite(path: str) -> bool:
+    return path.endswith((".db", ".sqlite", ".sqlite3"))
+
+
+def _resolve_path(path: Optional[str]) -> str:
+    if path:
+        return path
+    return _DB_PATH if backend() == "sqlite" else _CSV_PATH
+
+
+def log_row(row: dict, path: Optional[str] = None):
+    """
+    Queue telemetry row for the background writer.
+
+    Returns immediately. Call flush() before reading. Without path the
+    configured backend decides (telemetry.csv or TELEMETRY_DB).
+    """
+    _sink.put(dict(row or {}), _resolve_path(path))
+
+
+def flush(timeout: Optional[float] = 10.0) -> bool:
+    """Block until queued rows are on disk. True if done within timeout."""
+    return _sink.flush(timeout)
+
+
+atexit.register(flush)
+
+
+# Abfragen für Dashboard. SQLite liest über Indizes nur benötigte Zeilen,
+# CSV-Fallback streamt die Datei einmal, ohne sie ganz im Speicher zu halten.
+
+@contextmanager
+def _open_db(db_path: str) -> Iterator[Optional[sqlite3.Connection]]:
+    if not os.path.exists(db_path):
+        yield None
+        return
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        _ensure_schema(conn)
+        yield conn
+    finally:
+        conn.close()
+
+
+def _iter_csv(path: str) -> Iterator[dict]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def has_data(path: Optional[str] = None) -> bool:
+    return os.path.exists(_resolve_path(path)) and count_rows(path) > 0
+
+
+def count_rows(path: Optional[str] = None) -> int:
+    path = _resolve_path(path)
+    if _is_sqlite(path):
+        with _open_db(path) as conn:
+            if conn is None:
+                return 0
+            return int(conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0])
+    return sum(1 for _ in _iter_csv(path))
+
+
+def recent_rows(limit: int = 10, path: Optional[str] = None) -> List[dict]:
+    """Letzte limit Zeilen, älteste zuerst."""
+    path = _resolve_path(path)
+    if _is_sqlite(path):
+        with _open_db(path) as conn:
+            if conn is None:
+                return []
+            cursor = conn.execute("SELECT row_json FROM runs ORDER BY id DESC LIMIT ?", (int(limit),))
+            return [json.loads(r[0]) for r in reversed(cursor.fetchall())]
+    return list(deque(_iter_csv(path), maxlen=int(limit)))
+
+
+def _nearest_rank(count: int, percentile: float) -> int:
+    return max(0, min(count - 1, math.ceil(percentile * count) - 1))
+
+
+def latency_percentiles(
+    percentiles: Tuple[float, ...] = (0.5, 0.95),
+    path: Optional[str] = None,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Latenz-Perzentile pro Engine, z.B. {"langgraph": {"count": 12, "p50": .., "p95": ..}}.
+
+    Nearest-Rank. In SQLite ein Index-Lookup pro Engine und Perzentil über
+    (engine, latency_s), keine Sortierung der ganzen Tabelle.
+    """
+    path = _resolve_path(path)
+    result: Dict[str, Dict[str, float]] = {}
+    if _is_sqlite(path):
+        with _open_db(path) as conn:
+            if conn is None:
+                return result
+            counts = conn.execute(
+                "SELECT engine, COUNT(latency_s) FROM runs WHERE latency_s IS NOT NULL GROUP BY engine"
+            ).fetchall()
+            for engine, count in counts:
+                stats: Dict[str, float] = {"count": int(count)}
+                for p in percentiles:
+                    value = conn.execute(
+                        "SELECT latency_s FROM runs WHERE engine = ? AND latency_s IS NOT NULL "
+                        "ORDER BY latency_s LIMIT 1 OFFSET ?",
+                        (engine, _nearest_rank(count, p)),
+                    ).fetchone()
+                    stats[f"p{round(p * 100)}"] = float(value[0]) if value else 0.0
+                result[engine] = stats
+        return result
+
+    by_engine: Dict[str, List[float]] = {}
+    for row in _iter_csv(path):
+        latency = _as_float(row.get("latency_s"))
+        if latency is not None:
+            by_engine.setdefault(row.get("engine") or "", []).append(latency)
+    return _percentiles_by_engine(by_engine, percentiles)
+
+
+def _percentiles_by_engine(
+    by_engine: Dict[str, List[float]],
+    percentiles: Tuple[float, ...],
+) -> Dict[str, Dict[str, float]]:
+    result: Dict[str, Dict[str, float]] = {}
+    for engine, values in by_engine.items():
+        values.sort()
+        stats: Dict[str, float] = {"count": len(values)}
+        for p in percentiles:
+            stats[f"p{round(p * 100)}"] = values[_nearest_rank(len(values), p)]
+        result[engine] = stats
+    return result
+
+
+def stage_breakdown(last_n: Optional[int] = 1000, path: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Mittlere Stage-Zeiten pro Engine über die letzten last_n Läufe."""
+    path = _resolve_path(path)
+    result: Dict[str, Dict[str, float]] = {}
+    if _is_sqlite(path):
+        averages = ", ".join(f"AVG({c})" for c in STAGE_COLUMNS)
+        where = ""
+        params: Tuple = ()
+        if last_n:
+            where = "WHERE id > (SELECT COALESCE(MAX(id), 0) FROM runs) - ?"
+            params = (int(last_n),)
+        with _open_db(path) as conn:
+            if conn is None:
+                return result
+            for engine, *values in conn.execute(
+                f"SELECT engine, {averages} FROM runs {where} GROUP BY engine", params
+            ):
+                result[engine] = {c: round(v or 0.0, 3) for c, v in zip(STAGE_COLUMNS, values)}
+        return result
+
+    rows = _iter_csv(path) if not last_n else deque(_iter_csv(path), maxlen=int(last_n))
+    return _stage_means(rows)
+
+
+def _stage_means(rows: Iterable[dict]) -> Dict[str, Dict[str, float]]:
+    result: Dict[str, Dict[str, float]] = {}
+    sums: Dict[str, List[float]] = {}
+    counts: Dict[str, List[int]] = {}
+    for row in rows:
+        engine = row.get("engine") or ""
+        engine_sums = sums.setdefault(engine, [0.0] * len(STAGE_COLUMNS))
+        engine_counts = counts.setdefault(engine, [0] * len(STAGE_COLUMNS))
+        for i, column in enumerate(STAGE_COLUMNS):
+            value = _as_float(row.get(column))
+            if value is not None:
+                engine_sums[i] += value
+                engine_counts[i] += 1
+    for engine, engine_sums in sums.items():
+        result[engine] = {
+            c: round(total / n, 3) if n else 0.0
+            for c, total, n in zip(STAGE_COLUMNS, engine_sums, counts[engine])
+        }
+    return result
+
+
+def dashboard(
+    recent: int = 30,
+    last_n: Optional[int] = 1000,
+    percentiles: Tuple[float, ...] = (0.5, 0.95),
+    path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Alles fürs Dashboard auf einmal.
+
+    Gibt count, recent (letzte recent Zeilen, älteste zuerst), latency (wie
+    latency_percentiles) und stages (wie stage_breakdown über last_n)
+    zurück. CSV wird dabei genau einmal gelesen, statt einmal pro Abfrage.
+    Bei SQLite einzelne Abfragen über Indizes.
+    """
+    path = _resolve_path(path)
+    if _is_sqlite(path):
+        return {
+            "count": count_rows(path),
+            "recent": recent_rows(recent, path),
+            "latency": latency_percentiles(percentiles, path),
+            "stages": stage_breakdown(last_n, path),
+        }
+    return _csv_dashboard(path, recent, last_n, percentiles)
+
+
+def _csv_dashboard(
+    path: str,
+    recent: int,
+    last_n: Optional[int],
+    percentiles: Tuple[float, ...],
+) -> Dict[str, Any]:
+    """
+    Ein Durchlauf mit csv.reader. Dicts nur für die letzten Zeilen.
+
+    Latenzen brauchen alle Zeilen, daher nur zwei Spalten pro Zeile parsen.
+    Für recent und stages reicht ein deque der letzten max(recent, last_n),
+    ohne last_n bleiben alle Zeilen.
+    """
+    result: Dict[str, Any] = {"count": 0, "recent": [], "latency": {}, "stages": {}}
+    if not os.path.exists(path):
+        return result
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return result
+        engine_index = header.index("engine") if "engine" in header else None
+        latency_index = header.index("latency_s") if "latency_s" in header else None
+        tail: deque = deque(maxlen=max(int(recent), int(last_n)) if last_n else None)
+        by_engine: Dict[str, List[float]] = {}
+        count = 0
+        for row in reader:
+            count += 1
+            tail.append(row)
+            if latency_index is not None and latency_index < len(row):
+                latency = _as_float(row[latency_index])
+                if latency is not None:
+                    engine = row[engine_index] if engine_index is not None and engine_index < len(row) else ""
+                    by_engine.setdefault(engine, []).append(latency)
+    rows = [dict(zip(header, row)) for row in tail]
+    result["count"] = count
+    result["recent"] = rows[-int(recent):] if recent else []
+    result["latency"] = _percentiles_by_engine(by_engine, percentiles)
+    result["stages"] = _stage_means(rows[-int(last_n):] if last_n else rows)
+    return result
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from llm_cache import PIPELINE_STAGES
+
+# Token- und Kostenzählung pro LLM-Aufruf. Gleiches Muster wie CacheStats in
+# llm_cache: Stats pro Lauf über contextvars, Worker mit copy_context zählen
+# mit. Preise in USD pro 1M Tokens, überschreibbar per config["price_table"]
+# oder LLM_PRICE_TABLE (JSON-String oder Pfad zu JSON-Datei).
+
+DEFAULT_PRICES: Dict[str, Dict[str, float]] = {
+    "gpt-4.1": {"input": 2.00, "output": 8.00},
+    "gpt-4.1-mini": {"input": 0.40, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "output": 0.40},
+    "gpt-4o": {"input": 2.50, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "output": 0.60},
+}
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def count_tokens(text: str) -> int:
+    """Tokenzahl mit tiktoken, sonst grobe Schätzung (~4 Zeichen pro Token)."""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        try:
+            return len(_ENCODING.encode(text, disallowed_special=()))
+        except Exception:
+            pass
+    return max(1, len(text) // 4)
+
+
+def _env_price_table() -> Dict[str, Dict[str, float]]:
+    raw = os.getenv("LLM_PRICE_TABLE", "").strip()
+    if not raw:
+        return {}
+    try:
+        if os.path.exists(raw):
+            with open(raw, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return json.loads(raw)
+    except (OSError, ValueError):
+        return {}
+
+
+def price_table(config: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, float]]:
+    return {**DEFAULT_PRICES, **_env_price_table(), **((config or {}).get("price_table") or {})}
+
+
+def _price_for(model: str, prices: Dict[str, Dict[str, float]]) -> Optional[Dict[str, float]]:
+    # "openai/gpt-4.1" (LiteLLM) und "gpt-4.1-2025-04-14" (API) auf Tabelle abbilden
+    name = (model or "").split("/")[-1]
+    if name in prices:
+        return prices[name]
+    candidates = [key for key in prices if name.startswith(key)]
+    return prices[max(candidates, key=len)] if candidates else None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, prices: Dict[str, Dict[str, float]]) -> float:
+    price = _price_for(model, prices)
+    if not price:
+        return 0.0
+    return (prompt_tokens * float(price.get("input", 0.0)) + completion_tokens * float(price.get("output", 0.0))) / 1_000_000
+
+
+class UsageStats:
+    """Tokens, Zeiten und Kosten pro Stage für einen Pipeline-Lauf."""
+
+    def __init__(self, prices: Optional[Dict[str, Dict[str, float]]] = None):
+        self._lock = threading.Lock()
+        self.prices = prices if prices is not None else price_table()
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    def record(
+        self,
+        stage: str,
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        total_s: float,
+        ttft_s: Optional[float] = None,
+    ) -> None:
+        cost = estimate_cost(model, prompt_tokens, completion_tokens, self.prices)
+        with self._lock:
+            entry = self.stages.setdefault(stage, {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                "llm_s": 0.0, "ttft": [], "cost_usd": 0.0,
+            })
+            entry["calls"] += 1
+            entry["prompt_tokens"] += int(prompt_tokens or 0)
+            entry["completion_tokens"] += int(completion_tokens or 0)
+            entry["llm_s"] += float(total_s or 0.0)
+            entry["cost_usd"] += cost
+            if ttft_s is not None:
+                entry["ttft"].append(float(ttft_s))
+
+    def stage_totals(self, stage: str) -> Dict[str, Any]:
+        """Bisherige Summen einer Stage. Differenz zweier Aufrufe ergibt Werte pro Schleife."""
+        with self._lock:
+            entry = self.stages.get(stage, {})
+            return {
+                "calls": entry.get("calls", 0),
+                "prompt_tokens": entry.get("prompt_tokens", 0),
+                "completion_tokens": entry.get("completion_tokens", 0),
+                "llm_s": entry.get("llm_s", 0.0),
+            }
+
+    def as_row(self, stages: Tuple[str, ...] = PIPELINE_STAGES) -> Dict[str, Any]:
+        """
+        Flache Spalten für log_row.
+
+        Feste Stage-Liste wie bei CacheStats. ttft_s ist Mittel über Aufrufe
+        mit Streaming, leer (0.0) wenn keiner gemessen wurde (z.B. DSPy).
+        """
+        with self._lock:
+            entries = list(self.stages.values())
+            row: Dict[str, Any] = {
+                "llm_calls": sum(e["calls"] for e in entries),
+                "prompt_tokens": sum(e["prompt_tokens"] for e in entries),
+                "completion_tokens": sum(e["completion_tokens"] for e in entries),
+                "cost_usd": round(sum(e["cost_usd"] for e in entries), 6),
+            }
+            for stage in stages:
+                entry = self.stages.get(stage, {})
+                ttfts: List[float] = entry.get("ttft", [])
+                row[f"{stage}_prompt_tokens"] = entry.get("prompt_tokens", 0)
+                row[f"{stage}_completion_tokens"] = entry.get("completion_tokens", 0)
+                row[f"{stage}_llm_s"] = round(entry.get("llm_s", 0.0), 3)
+                row[f"{stage}_ttft_s"] = round(sum(ttfts) / len(ttfts), 3) if ttfts else 0.0
+                row[f"{stage}_cost_usd"] = round(entry.get("cost_usd", 0.0), 6)
+        return row
+
+
+_active_usage: contextvars.ContextVar[Optional[UsageStats]] = contextvars.ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def track(config: Optional[Dict[str, Any]] = None) -> Iterator[UsageStats]:
+    """Sammelt Usage aller LLM-Aufrufe im aktuellen Kontext."""
+    stats = UsageStats(price_table(config))
+    token = _active_usage.set(stats)
+    try:
+        yield stats
+    finally:
+        _active_usage.reset(token)
+
+
+def active() -> Optional[UsageStats]:
+    """UsageStats vom aktuellen track()-Block, None außerhalb."""
+    return _active_usage.get()
+
+
+def record(
+    stage: str,
+    model: str,
+    prompt_tokens: int,
+    completion_tokens: int,
+    total_s: float,
+    ttft_s: Optional[float] = None,
+) -> None:
+    """Aufruf ohne aktiven track()-Block wird ignoriert."""
+    stats = _active_usage.get()
+    if stats is not None:
+        stats.record(stage, model, prompt_tokens, completion_tokens, total_s, ttft_s)
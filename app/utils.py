@@ -1,6 +1,45 @@
 from __future__ import annotations
+import math
 import re
-from typing import Dict, List, Tuple, Optional
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple, Optional
+
+from usage import count_tokens
+
+# Hochzählen, wenn sich Ausgabe von build_analysis_context ändert (preprocess_cache)
+NORMALIZER_VERSION = 1
+
+# Vorverarbeitung. Alle Muster einmal kompiliert. build_analysis_context
+# läuft über _preprocess: ein Durchgang normalisiert, Metadaten-Filter nur auf
+# den ersten 200 Zeilen, Rest vom Text wird nicht mehr zerlegt. Ergebnis ist
+# identisch zur früheren Kette _normalize_text -> strip_meta_head (mit
+# zweitem _normalize_text) -> strip_references_tail, siehe
+# scripts/benchmarks/normalization.py.
+
+# Kandidaten für getrennte Wörter: "-", Leerraum mit Zeilenumbruch, dann
+# Wortzeichen. Beginnt mit Literal, Regex-Engine springt also direkt zu "-"
+# statt an jeder Stelle (\w) zu probieren. Wortzeichen davor prüft
+# _join_hyphen_breaks selbst.
+_HYPHEN_BREAK = re.compile(r"-\s*\n\s*(?=\w)")
+_WORD_CHAR = re.compile(r"\w")
+_SPACE_RUN = re.compile(r"  +")
+_BLANK_RUN = re.compile(r"\n\n\n+")
+
+_META_HEAD_LINES = 200
+_METADATA_KEYWORDS_PATTERN = r"(?:university|institute|faculty|department|school of|affiliation|corresponding author|preprint|arxiv|doi|copyright|acknowledg(e)?ments?)"
+_ABSTRACT_LINE = re.compile(r"(abstract|ABSTRACT)")
+# E-Mails/ORCIDs/URLs, Metadaten-Keywords, Konferenzen: alles nur "kommt vor",
+# also eine Alternation statt drei Suchen pro Zeile
+_META_LINE = re.compile(
+    r"@|orcid\.org|https?://"
+    r"|" + _METADATA_KEYWORDS_PATTERN +
+    r"|(?:proceedings of|iclr|neurips|icml|acl|emnlp)\b",
+    re.I,
+)
+# Autorenname: "First Last" oder "First M. Last"
+_AUTHOR_LINE = re.compile(r"^[A-Z][a-z]+(?: [A-Z]\.)?(?: [A-Z][a-z]+)+(?:, [A-Z][a-z]+.*)*$")
+_REFERENCES_HEADING = re.compile(r"\n\s*(references|bibliography)\s*\n", re.I)
+
 
 def _normalize_text(raw_text: str) -> str:
     """
@@ -16,19 +55,76 @@ def _normalize_text(raw_text: str) -> str:
     if not raw_text:
         return ""
     
-    normalized_text = raw_text
-    normalized_text = re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", normalized_text)
-    normalized_text = re.sub(r"(?<!\n)\n(?!\n)", "\n", normalized_text)
-    normalized_text = re.sub(r"[ \t]+", " ", normalized_text)
+    normalized_text = _join_hyphen_breaks(raw_text)
+    # Tabs zu Leerzeichen, dann Läufe kürzen. Gleich wie [ \t]+ -> " ", aber
+    # einzelne Leerzeichen (fast alle) fasst die Regex gar nicht erst an.
+    normalized_text = _SPACE_RUN.sub(" ", normalized_text.replace("\t", " "))
     normalized_text = "\n".join([line.rstrip() for line in normalized_text.splitlines()])
-    normalized_text = re.sub(r"\n{3,}", "\n\n", normalized_text)
+    normalized_text = _BLANK_RUN.sub("\n\n", normalized_text)
     
     return normalized_text.strip()
 
 
+def _join_hyphen_breaks(text: str) -> str:
+    """
+    Wie re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", text), nur schneller.
+
+    Gleiche Semantik auch bei Ketten: Bei "a-\nb-\nc" verbraucht der erste
+    Treffer das "b", zweite Trennung bleibt stehen. Daher Treffer
+    überspringen, deren Wortzeichen davor schon zum vorigen Treffer gehört.
+    """
+    pieces: List[str] = []
+    last = 0
+    consumed = -1
+    for match in _HYPHEN_BREAK.finditer(text):
+        start = match.start()
+        if start == 0 or start - 1 == consumed or not _WORD_CHAR.match(text, start - 1):
+            continue
+        pieces.append(text[last:start])
+        last = match.end()
+        consumed = last
+    if not pieces:
+        return text
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+
 # Remove metadata and boilerplate
 
-_METADATA_KEYWORDS_PATTERN = r"(?:university|institute|faculty|department|school of|affiliation|corresponding author|preprint|arxiv|doi|copyright|acknowledg(e)?ments?)"
+def _is_meta_line(stripped_line: str) -> bool:
+    if _META_LINE.search(stripped_line):
+        return True
+    # GROSSBUCHSTABEN zu lang meist Header oder Zugehörigkeiten
+    if stripped_line.isupper() and len(stripped_line) > 6:
+        return True
+    return bool(_AUTHOR_LINE.match(stripped_line))
+
+
+def _filter_meta_lines(lines: List[str]) -> List[str]:
+    cleaned_lines: List[str] = []
+    for line in lines:
+        stripped_line = line.strip()
+        if not stripped_line:
+            continue
+        # Abstract behalten, aber normalisieren
+        if _ABSTRACT_LINE.fullmatch(stripped_line):
+            cleaned_lines.append("Abstract")
+            continue
+        if _is_meta_line(stripped_line):
+            continue
+        # Hat alle Filter überstanden, wahrscheinlich echter Inhalt
+        cleaned_lines.append(line)
+    return cleaned_lines
+
+
+def _split_head(text: str, line_count: int) -> Tuple[List[str], Optional[str]]:
+    """Erste line_count Zeilen als Liste, Rest als ein String (oder None)."""
+    pos = -1
+    for _ in range(line_count):
+        pos = text.find("\n", pos + 1)
+        if pos < 0:
+            return text.splitlines(), None
+    return text[:pos].splitlines(), text[pos + 1:]
 
 
 def strip_meta_head(raw_text: str) -> str:
@@ -47,45 +143,9 @@ def strip_meta_head(raw_text: str) -> str:
         return ""
     
     text_lines = raw_text.splitlines()
-    cleaned_lines: List[str] = []
-    
-    # Erste 200 Zeilen prüfen, Metadaten meist oben. Danach kommt Inhalt vom Paper.
-    for line_index, line in enumerate(text_lines[:200]):
-        stripped_line = line.strip()
-        
-        if not stripped_line:
-            continue
-        
-        # Abstract behalten, aber normalisieren
-        if re.fullmatch(r"(abstract|ABSTRACT)", stripped_line):
-            cleaned_lines.append("Abstract")
-            continue
-        
-        # E-Mails, ORCIDs, URLs
-        if re.search(r"@|orcid\.org|https?://", stripped_line, re.I):
-            continue
-        
-        # Keywords wie "university", "department" usw.
-        if re.search(_METADATA_KEYWORDS_PATTERN, stripped_line, re.I):
-            continue
-        
-        # GROSSBUCHSTABEN zu lang meist Header oder Zugehörigkeiten
-        if stripped_line.isupper() and len(stripped_line) > 6:
-            continue
-        
-        # Autorenname: "First Last" oder "First M. Last"
-        if re.match(r"^[A-Z][a-z]+(?: [A-Z]\.)?(?: [A-Z][a-z]+)+(?:, [A-Z][a-z]+.*)*$", stripped_line):
-            continue
-        
-        # Konferenz auch manchmal in Headern
-        if re.search(r"(proceedings of|iclr|neurips|icml|acl|emnlp)\b", stripped_line, re.I):
-            continue
-        
-        # Hat alle Filter überstanden, wahrscheinlich echter Inhalt
-        cleaned_lines.append(line)
-    
+    cleaned_lines = _filter_meta_lines(text_lines[:_META_HEAD_LINES])
     # Alles nach Zeile 200 ist meist Inhalt, alles behalten
-    cleaned_lines.extend(text_lines[200:])
+    cleaned_lines.extend(text_lines[_META_HEAD_LINES:])
     
     return _normalize_text("\n".join(cleaned_lines))
 
@@ -94,7 +154,7 @@ def strip_references_tail(raw_text: str) -> str:
     if not raw_text:
         return ""
     
-    references_match = re.search(r"\n\s*(references|bibliography)\s*\n", raw_text, re.I)
+    references_match = _REFERENCES_HEADING.search(raw_text)
     
     if references_match:
         characters_after_match = len(raw_text) - references_match.start()
@@ -104,6 +164,28 @@ def strip_references_tail(raw_text: str) -> str:
     return raw_text
 
 
+def _preprocess(raw_text: str) -> str:
+    """
+    Normalisieren und Metadaten entfernen in einem Durchgang.
+
+    Gleiches Ergebnis wie strip_meta_head(_normalize_text(raw_text)), aber
+    zweites _normalize_text fällt fast ganz weg. Text ist nach erstem
+    Durchgang schon normal. Filtern entfernt nur Zeilen, erzeugt also
+    keine neuen Leerzeichen- oder Leerzeilen-Läufe. Übrig bleibt nur
+    Bindestrich-Korrektur: Filter kann getrennte Wörter neu zusammenbringen,
+    und Ketten wie "a-\nb-\nc" braucht zwei Durchgänge. Zeilen nach 200
+    werden nicht mehr zerlegt und neu zusammengefügt.
+    """
+    normalized_text = _normalize_text(raw_text)
+    if not normalized_text:
+        return ""
+    head_lines, tail = _split_head(normalized_text, _META_HEAD_LINES)
+    cleaned_lines = _filter_meta_lines(head_lines)
+    if tail is not None:
+        cleaned_lines.append(tail)
+    return _join_hyphen_breaks("\n".join(cleaned_lines)).strip()
+
+
 # Public API
 
 def build_analysis_context(raw_text: str, config: dict) -> str:
@@ -111,21 +193,302 @@ def build_analysis_context(raw_text: str, config: dict) -> str:
     Bereitet Text vor für Analyse.
 
     Normalisiert PDF-Formatierung. Entfernt Metadaten und Referenzen.
+    Mit config["context_budget_tokens"] > 0 werden danach nur die
+    relevantesten Abschnitte bis zum Budget behalten (siehe budget_context).
     """
-    cleaned_text = _normalize_text(raw_text or "")
-    cleaned_text = strip_meta_head(cleaned_text)
+    cleaned_text = _preprocess(raw_text or "")
     cleaned_text = strip_references_tail(cleaned_text)
+    budget_tokens = int((config or {}).get("context_budget_tokens") or 0)
+    if budget_tokens > 0:
+        cleaned_text = budget_context(cleaned_text, budget_tokens)
     return cleaned_text
 
 
+# Abschnitte und Chunks
+
+_SECTION_HEADING_PATTERN = re.compile(
+    r"^(?:"
+    r"(?:\d+(?:\.\d+)*|[A-Z])\s+[A-Z][A-Za-z0-9 ,&()/'-]{2,80}"
+    r"|(?i:abstract|introduction|background|related work|methods?|methodology|experiments?"
+    r"|results|evaluation|discussion|conclusions?|limitations|appendix)"
+    r")$"
+)
+
+
+def _is_section_heading(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped or len(stripped) > 90 or stripped[-1] in ".:,;-":
+        return False
+    if not _SECTION_HEADING_PATTERN.match(stripped):
+        return False
+    # "K KK KKG" o.ä. aus Abbildungen ist keine Überschrift
+    return any(ch.islower() for ch in stripped)
+
+
+def split_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Teilt Text an Abschnittsüberschriften.
+
+    Gibt (Überschrift, Text) Paare zurück. Alles vor erster Überschrift
+    landet in Abschnitt mit leerer Überschrift. Dort stehen meist Titel und
+    Abstract. Überschriften wie "3.1 Reasoning Process" oder "Conclusion"
+    erkennen wir per Regex. Bei PDFs nicht perfekt, reicht aber für Chunking.
+    """
+    if not text:
+        return []
+    sections: List[Tuple[str, str]] = []
+    heading = ""
+    body_lines: List[str] = []
+    for line in text.splitlines():
+        if _is_section_heading(line):
+            if heading or any(l.strip() for l in body_lines):
+                sections.append((heading, "\n".join(body_lines).strip()))
+            heading = line.strip()
+            body_lines = []
+        else:
+            body_lines.append(line)
+    if heading or any(l.strip() for l in body_lines):
+        sections.append((heading, "\n".join(body_lines).strip()))
+    return sections
+
+
+def _split_oversized(section_text: str, max_chars: int) -> List[str]:
+    """
+    Zu lange Abschnitte in Absätze teilen.
+
+    PDF-Text hat oft kaum Leerzeilen, dann an letztem Zeilenumbruch vor
+    max_chars schneiden. Nur ohne Zeilenumbruch hart schneiden.
+    """
+    units: List[str] = []
+    for paragraph in section_text.split("\n\n"):
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            units.append(paragraph[:cut])
+            paragraph = paragraph[cut:].lstrip("\n")
+        if paragraph.strip():
+            units.append(paragraph)
+    return units
+
+
+def chunk_sections(text: str, max_chars: int = 12000) -> List[str]:
+    """
+    Packt Abschnitte in Chunks bis max_chars.
+
+    Abschnittsgrenzen bleiben erhalten, solange ein Abschnitt in einen Chunk
+    passt. Reihenfolge bleibt gleich, erster Chunk enthält also Titel.
+    """
+    if not text:
+        return []
+    max_chars = max(1000, int(max_chars))
+    chunks: List[str] = []
+    current = ""
+    for heading, body in split_sections(text):
+        section_text = f"{heading}\n{body}".strip() if heading else body
+        if not section_text:
+            continue
+        units = [section_text] if len(section_text) <= max_chars else _split_oversized(section_text, max_chars)
+        for part in units:
+            candidate = f"{current}\n\n{part}" if current else part
+            if len(candidate) > max_chars and current:
+                chunks.append(current)
+                current = part
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+# Token-Budget für Kontext
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:[.-][a-z0-9]+)*")
+
+# Was der Reader ausfüllen muss: Objective, Methods, Datasets, Results, Limitations
+_CONTEXT_QUERY = (
+    "objective aim goal propose contribution problem "
+    "method approach model architecture framework dataset corpus training "
+    "results accuracy f1 bleu rouge score outperforms improvement baseline table evaluation "
+    "limitations conclusion"
+)
+_SIGNAL_WEIGHT = {"YES": 1.0, "MAYBE": 0.5, "NO": 0.0}
+_GAP_MARKER = "[...]"
+
+
+def tokenize(text: str) -> List[str]:
+    """Einfache Wort-Tokens für lexikalisches Ranking (kleingeschrieben)."""
+    return _WORD_PATTERN.findall((text or "").lower())
+
+
+class BM25:
+    """
+    BM25 über schon tokenisierte Dokumente.
+
+    Dokumenthäufigkeiten und Termzähler einmal vorberechnet, danach sind
+    Anfragen billig. Für ein Paper mit ein paar hundert Abschnitten reicht
+    das, kein invertierter Index nötig.
+    """
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(doc) for doc in documents]
+        self.lengths = [len(doc) for doc in documents]
+        self.avg_len = (sum(self.lengths) / len(documents) if documents else 0.0) or 1.0
+        self.doc_freq: Counter = Counter()
+        for term_freq in self.term_freqs:
+            self.doc_freq.update(term_freq.keys())
+
+    def idf(self, term: str) -> float:
+        n_docs = len(self.term_freqs)
+        df = self.doc_freq.get(term, 0)
+        return math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: List[str]) -> List[float]:
+        query_idf = {term: self.idf(term) for term in set(query)}
+        results: List[float] = []
+        for term_freq, length in zip(self.term_freqs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_len)
+            score = 0.0
+            for term, idf in query_idf.items():
+                tf = term_freq.get(term, 0)
+                if tf:
+                    score += idf * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+def bm25_scores(documents: List[List[str]], query: List[str]) -> List[float]:
+    """BM25-Score jedes Dokuments für query, ohne Index aufzuheben."""
+    return BM25(documents).scores(query) if documents else []
+
+
+def section_units(text: str, max_unit_chars: int) -> List[str]:
+    """Abschnitte als Text, zu lange in Absätze bis max_unit_chars geteilt."""
+    units: List[str] = []
+    for heading, body in split_sections(text):
+        section_text = f"{heading}\n{body}".strip() if heading else body
+        if not section_text:
+            continue
+        if len(section_text) <= max_unit_chars:
+            units.append(section_text)
+        else:
+            units.extend(_split_oversized(section_text, max_unit_chars))
+    return units
+
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    """Text auf höchstens max_tokens kürzen (mindestens ein Token bleibt)."""
+    max_tokens = max(1, max_tokens)
+    cut = text[: max_tokens * 4]
+    while len(cut) > 1 and count_tokens(cut) > max_tokens:
+        cut = cut[: int(len(cut) * max_tokens / count_tokens(cut) * 0.95)]
+    return cut
+
+
+def budget_context(text: str, budget_tokens: int) -> str:
+    """
+    Kürzt Kontext auf budget_tokens mit den relevantesten Abschnitten.
+
+    Abschnitte (zu lange in Absätze geteilt) werden per BM25 gegen typische
+    Reader-Felder bewertet, plus Bonus für Zahlen/Tabellen aus
+    detect_quantitative_signal. Erster Abschnitt (Titel, Abstract) bleibt
+    immer drin und wird zuerst eingeplant, notfalls gekürzt. Dann gierig
+    nach Score packen, solange Budget reicht.
+    Ausgabe in Original-Reihenfolge, Lücken mit "[...]" markiert, damit
+    Reader weiß, dass etwas fehlt. Passt Text schon, bleibt er unverändert.
+    """
+    if not text or budget_tokens <= 0 or count_tokens(text) <= budget_tokens:
+        return text
+    # Einheiten etwa ein Viertel vom Budget (~4 Zeichen pro Token), damit mehrere reinpassen
+    units = section_units(text, max(800, budget_tokens))
+    if not units:
+        return text
+    unit_tokens = [count_tokens(u) for u in units]
+    relevance = bm25_scores([tokenize(u) for u in units], tokenize(_CONTEXT_QUERY))
+    top = max(relevance) or 1.0
+    scores = [
+        rel / top + 0.5 * _SIGNAL_WEIGHT.get(str(detect_quantitative_signal(unit)["signal"]), 0.0)
+        for rel, unit in zip(relevance, units)
+    ]
+
+    marker_tokens = count_tokens(_GAP_MARKER) + 1
+    head = units[0]
+    if unit_tokens[0] + marker_tokens > budget_tokens:
+        # Titel/Abstract allein zu groß: auf halbes Budget kürzen, Rest
+        # bleibt für relevante spätere Abschnitte
+        units[0] = _truncate_tokens(head, budget_tokens // 2 - marker_tokens)
+        unit_tokens[0] = count_tokens(units[0])
+    selected = {0}
+    used = unit_tokens[0] + marker_tokens
+    for index in sorted(range(1, len(units)), key=lambda i: scores[i], reverse=True):
+        cost = unit_tokens[index] + marker_tokens
+        if used + cost <= budget_tokens:
+            selected.add(index)
+            used += cost
+    if selected == {0} and units[0] != head:
+        # Nichts sonst passt: ganzes Budget für gekürzten Anfang
+        units[0] = _truncate_tokens(head, budget_tokens - marker_tokens)
+
+    parts: List[str] = []
+    previous = -1
+    for index in sorted(selected):
+        if index != previous + 1:
+            parts.append(_GAP_MARKER)
+        parts.append(units[index])
+        previous = index
+    if previous != len(units) - 1:
+        parts.append(_GAP_MARKER)
+    return "\n\n".join(parts)
+
+
+# Chunked Reader: Einstellungen aus config, von allen drei Pipelines genutzt
+DEFAULT_READER_CHUNK_CHARS = 12000
+DEFAULT_READER_PARALLELISM = 4
+
+
+def reader_chunk_settings(config: Optional[dict] = None) -> Tuple[int, int]:
+    """Gibt (reader_chunk_chars, reader_parallelism) aus config zurück."""
+    config_dict = config or {}
+    chunk_chars = int(config_dict.get("reader_chunk_chars") or DEFAULT_READER_CHUNK_CHARS)
+    parallelism = int(config_dict.get("reader_parallelism") or DEFAULT_READER_PARALLELISM)
+    return chunk_chars, max(1, parallelism)
+
+
+def use_chunked_reader(text: str, config: Optional[dict] = None) -> bool:
+    """
+    reader_mode aus config: "single" (Standard), "chunked" oder "auto".
+
+    "auto" nimmt Chunking nur, wenn Text nicht in einen Chunk passt.
+    """
+    config_dict = config or {}
+    mode = str(config_dict.get("reader_mode") or "single").lower()
+    if mode == "chunked":
+        return True
+    if mode == "auto":
+        chunk_chars, _ = reader_chunk_settings(config_dict)
+        return len(text or "") > chunk_chars
+    return False
+
+
 _METRIC_KEYWORDS = [
     "table", "%", "p=", "p<", "±", "≈",
     "accuracy", "f1", "rouge", "bleu", "em", "auc"
 ]
 
+# Alle Schlüsselwörter als eine Alternation, ein Scan statt einer Suche pro Wort
+_KEYWORD_PATTERN = re.compile("|".join(re.escape(kw) for kw in _METRIC_KEYWORDS))
+# Muster erfasst: 87.3, 0.912, 12.4±0.3, 87.3%, p=0.03 usw.
+_NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)?(?:\s*[±≈]\s*\d+)?(?:\s*%|(?:\s*(?:p=|p<)\s*\d*[.,]?\d+))?", re.I)
+_NON_DIGIT = re.compile(r"[^\d]")
+_SAMPLE_CONTEXT_PATTERN = re.compile(r"(accuracy|f1|rouge|bleu|em|auc|precision|recall|score|table)", re.I)
+
+_NO_SIGNAL_LABEL = "NO (no quantitative signal detected)"
+
 
 def _is_plausible_metric_number(number_text: str) -> bool:
-    cleaned = re.sub(r"[^\d]", "", number_text or "")
+    cleaned = _NON_DIGIT.sub("", number_text or "")
     if not cleaned:
         return False
     if len(cleaned) == 4 and 1800 <= int(cleaned) <= 2100:
@@ -133,6 +496,32 @@ def _is_plausible_metric_number(number_text: str) -> bool:
     return True
 
 
+def _keyword_hits(text: str) -> List[str]:
+    lowered = text.lower()
+    return [kw for kw in _METRIC_KEYWORDS if kw in lowered]
+
+
+def _quantitative_signal(text: str) -> str:
+    if not text or not text.strip():
+        return "NO"
+    for match in _NUMBER_PATTERN.finditer(text):
+        if _is_plausible_metric_number(match.group(0)):
+            return "YES"
+    return "MAYBE" if _KEYWORD_PATTERN.search(text.lower()) else "NO"
+
+
+def detect_quantitative_signals(texts: Iterable[str]) -> List[str]:
+    """
+    Signal ("YES"/"MAYBE"/"NO") für viele Zeilen oder Dokumente.
+
+    Gleiches Ergebnis wie detect_quantitative_signal(text)["signal"], aber
+    ohne Label, Treffer und Beispiele. Bricht beim ersten plausiblen Wert ab,
+    Schlüsselwörter nur für Texte ohne Zahlen, alle in einer Alternation.
+    Für count_numeric_results und Auswertungen über viele Notes.
+    """
+    return [_quantitative_signal(text) for text in texts]
+
+
 def detect_quantitative_signal(text: str) -> Dict[str, object]:
     """
     Erkennt, ob Text quantitative Metriken enthält.
@@ -144,24 +533,16 @@ def detect_quantitative_signal(text: str) -> Dict[str, object]:
     
     Gibt YES/MAYBE/NO zurück. MAYBE bedeutet Schlüsselwörter aber keine Zahlen.
     Vielleicht Tabelle nicht geparst. Oder Metriken erwähnt, aber nicht quantifiziert.
+    Nur Signal gebraucht? detect_quantitative_signals ist billiger.
     """
     if not text or not text.strip():
-        return {"signal": "NO", "label": "NO (no quantitative signal detected)", "keyword_hits": [], "number_samples": []}
+        return {"signal": "NO", "label": _NO_SIGNAL_LABEL, "keyword_hits": [], "number_samples": []}
     
-    lowered = text.lower()
-    keyword_hits: List[str] = []
-    for kw in _METRIC_KEYWORDS:
-        if kw == "%":
-            if "%" in text:
-                keyword_hits.append("%")
-        elif re.search(re.escape(kw), lowered):
-            keyword_hits.append(kw)
+    keyword_hits = _keyword_hits(text)
     
     # Jetzt nach tatsächlichen Zahlen suchen, die Metriken sein könnten
-    # Muster erfasst: 87.3, 0.912, 12.4±0.3, 87.3%, p=0.03 usw.
     number_samples: List[str] = []
-    number_pattern = re.compile(r"\d+(?:[.,]\d+)?(?:\s*[±≈]\s*\d+)?(?:\s*%|(?:\s*(?:p=|p<)\s*\d*[.,]?\d+))?", re.I)
-    for match in number_pattern.finditer(text):
+    for match in _NUMBER_PATTERN.finditer(text):
         snippet_start = max(0, match.start() - 20)
         snippet_end = min(len(text), match.end() + 20)
         snippet = text[snippet_start:snippet_end].strip()
@@ -173,7 +554,7 @@ def detect_quantitative_signal(text: str) -> Dict[str, object]:
     
     context_hits = 0
     for sample in number_samples:
-        if re.search(r"(accuracy|f1|rouge|bleu|em|auc|precision|recall|score|table)", sample, re.I):
+        if _SAMPLE_CONTEXT_PATTERN.search(sample):
             context_hits += 1
     
     if number_samples or context_hits:
@@ -183,7 +564,7 @@ def detect_quantitative_signal(text: str) -> Dict[str, object]:
         label = "MAYBE (tables/metric keywords detected)"
         signal = "MAYBE"
     else:
-        label = "NO (no quantitative signal detected)"
+        label = _NO_SIGNAL_LABEL
         signal = "NO"
     
     return {
@@ -194,10 +575,13 @@ def detect_quantitative_signal(text: str) -> Dict[str, object]:
     }
 
 
+_RESULTS_BLOCK_PATTERN = re.compile(r"Results:\s*(.*?)(?:\n[A-Z][A-Za-z/ ]+:|\Z)", flags=re.S)
+
+
 def _extract_results_block(notes_text: str) -> str:
     if not notes_text:
         return ""
-    match = re.search(r"Results:\s*(.*?)(?:\n[A-Z][A-Za-z/ ]+:|\Z)", notes_text, flags=re.S)
+    match = _RESULTS_BLOCK_PATTERN.search(notes_text)
     if match:
         return match.group(1).strip()
     return notes_text
@@ -217,14 +601,8 @@ def count_numeric_results(notes_text: str) -> int:
     results_block = _extract_results_block(notes_text)
     if not results_block:
         return 0
-    count = 0
-    for line in results_block.splitlines():
-        if not line.strip():
-            continue
-        info = detect_quantitative_signal(line)
-        if info.get("signal") == "YES":
-            count += 1
-    return count
+    lines = [line for line in results_block.splitlines() if line.strip()]
+    return sum(1 for signal in detect_quantitative_signals(lines) if signal == "YES")
 
 
 def extract_confidence_line(meta_text: str) -> str:
@@ -3,9 +3,23 @@ from __future__ import annotations
 from typing import Dict, Any, List, Optional, Tuple
 from time import perf_counter
 from datetime import datetime
+import asyncio
+import concurrent.futures as cf
+import contextvars
+import hashlib
 import json, os, re
 
-from utils import count_numeric_results, extract_confidence_line
+from agents.verifier import precheck, verifier_row
+from llm_cache import cached_completion, disabled as cache_disabled, track
+from streaming import OnPartial, active as streaming_active, emit, emit_stage, listen
+from usage import count_tokens, record as record_usage, track as track_usage
+from utils import (
+    chunk_sections,
+    count_numeric_results,
+    extract_confidence_line,
+    reader_chunk_settings,
+    use_chunked_reader,
+)
 
 # Use CSV telemetry
 try:
@@ -20,6 +34,18 @@ try:
 except Exception:
     HAVE_DSPY = False
 
+# UsageTracker gibt es erst ab DSPy 2.6, davor schätzen wir Tokens
+try:
+    from dspy.utils.usage_tracker import track_usage as dspy_track_usage
+except Exception:
+    dspy_track_usage = None
+
+# Token-Streaming über streamify mit StreamListener, neuere DSPy-Versionen
+try:
+    from dspy.streaming import StreamListener, StreamResponse, streamify as dspy_streamify
+except Exception:
+    dspy_streamify = None
+
 try:
     import litellm
     HAVE_LITELLM = True
@@ -52,9 +78,16 @@ def _lean_fallback(msg: str) -> Dict[str, Any]:
 
 
 if not DSPY_READY:
-    def run_pipeline(input_text: str, cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def run_pipeline(
+        input_text: str, cfg: Optional[Dict[str, Any]] = None, on_partial: Optional[OnPartial] = None
+    ) -> Dict[str, Any]:
         why = "missing 'dspy-ai'" if not HAVE_DSPY else "missing 'litellm'"
         return _lean_fallback(f"install dspy-ai and litellm to enable DSPy ({why}).")
+
+    async def run_pipeline_async(
+        input_text: str, cfg: Optional[Dict[str, Any]] = None, on_partial: Optional[OnPartial] = None
+    ) -> Dict[str, Any]:
+        return run_pipeline(input_text, cfg)
 else:
     # DSPy configuration
     def _configure_dspy(cfg: Optional[Dict[str, Any]] = None):
@@ -66,7 +99,10 @@ else:
         LiteLLM-Integration erlaubt, gleiche API-Keys und Base-URLs zu nutzen.
         
         Wird einmal pro Lauf der Pipeline aufgerufen, wie bei LangChain configure().
-        DSPy speichert LM in globalen Einstellungen.
+        Früher über dspy.settings.configure. Das darf in neueren DSPy-Versionen
+        nur der Thread, der zuerst konfiguriert hat. Async-Wrapper und
+        Streamlit laufen aber in wechselnden Threads. Daher geben wir LM zurück,
+        run_pipeline setzt es per dspy.settings.context nur für diesen Lauf.
         """
         cfg = cfg or {}
         model = cfg.get("model", "gpt-4.1")
@@ -82,7 +118,19 @@ else:
             temperature=temperature,
             max_tokens=max_tokens,
         )
-        dspy.settings.configure(lm=lm)
+        return lm
+
+    def _parallel_map(fn: Any, items: List[Any], parallelism: int, thread_name_prefix: str) -> List[Any]:
+        """Ordnungserhaltendes map auf begrenztem Thread-Pool."""
+        if not items:
+            return []
+        workers = max(1, min(int(parallelism), len(items)))
+        if workers == 1:
+            return [fn(item) for item in items]
+        with cf.ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as executor:
+            # copy_context: DSPy-Settings-Overrides und Cache-Zähler gelten auch im Thread
+            futures = [executor.submit(contextvars.copy_context().run, fn, item) for item in items]
+            return [f.result() for f in futures]
 
     def _sanitize(s: str) -> str:
         """
@@ -99,6 +147,109 @@ else:
         s = re.sub(r"\n{3,}", "\n\n", s)
         return s.strip()
 
+    def _demo_fields(demo: Any) -> Any:
+        if hasattr(demo, "toDict"):
+            return demo.toDict()
+        return str(demo)
+
+    def _cached_predict(stage: str, predictor: Any, output_field: str, stream: bool = True, **inputs: Any) -> str:
+        """
+        Predict-Aufruf über gemeinsamen Antwort-Cache.
+
+        DSPy rendert Prompt selbst über Adapter. Signature-Anweisungen, Felder,
+        Demos und Inputs bestimmen ihn aber vollständig, also nehmen wir diese
+        als Prompt-Teil vom Schlüssel. Optimierter Summarizer mit Demos hat
+        damit automatisch andere Schlüssel als Basis-Version.
+
+        stream=False für Teilaufrufe (Reader-Chunks), wie bei invoke_prompt.
+        """
+        lm = dspy.settings.lm
+        lm_kwargs = getattr(lm, "kwargs", {}) or {}
+        signature = predictor.signature
+        key_fields = {
+            "model": getattr(lm, "model", ""),
+            "api_base": lm_kwargs.get("api_base") or "",
+            "temperature": lm_kwargs.get("temperature"),
+            "max_tokens": lm_kwargs.get("max_tokens"),
+            "prompt": {
+                "engine": "dspy",
+                "instructions": signature.instructions,
+                "fields": list(signature.fields),
+                "demos": [_demo_fields(d) for d in (predictor.demos or [])],
+                "inputs": inputs,
+            },
+        }
+        return cached_completion(
+            stage,
+            key_fields,
+            lambda: _predict_with_usage(stage, lm, predictor, output_field, inputs, stream),
+        )
+
+    def _predict_with_usage(
+        stage: str, lm: Any, predictor: Any, output_field: str, inputs: Dict[str, Any], stream: bool = True
+    ) -> str:
+        """
+        Predict-Aufruf mit Token-Zählung.
+
+        LiteLLM liefert usage pro Aufruf, DSPy sammelt sie im UsageTracker.
+        Fehlt sie (DummyLM, alte DSPy-Version, manche lokale Endpoints),
+        schätzen wir aus Anweisungen, Inputs und Ausgabe. TTFT gibt es nur
+        gestreamt, siehe _stream_predict.
+        """
+        prompt_tokens = completion_tokens = 0
+        start = perf_counter()
+        ttft_s = None
+
+        def _call() -> Any:
+            nonlocal ttft_s
+            if dspy_streamify is not None and stream and streaming_active():
+                prediction, ttft_s = _stream_predict(stage, predictor, output_field, inputs, start)
+                return prediction
+            return predictor(**inputs)
+
+        if dspy_track_usage is not None:
+            with dspy_track_usage() as tracker:
+                output = getattr(_call(), output_field)
+            for usage in tracker.get_total_tokens().values():
+                prompt_tokens += int(usage.get("prompt_tokens") or 0)
+                completion_tokens += int(usage.get("completion_tokens") or 0)
+        else:
+            output = getattr(_call(), output_field)
+        total_s = perf_counter() - start
+        # Gestreamt meldet LiteLLM teils nur completion_tokens, daher einzeln schätzen
+        if not prompt_tokens:
+            prompt_text = "\n".join([predictor.signature.instructions or "", *(str(v) for v in inputs.values())])
+            prompt_tokens = count_tokens(prompt_text)
+        if not completion_tokens:
+            completion_tokens = count_tokens(str(output or ""))
+        record_usage(stage, getattr(lm, "model", ""), prompt_tokens, completion_tokens, total_s, ttft_s)
+        return output
+
+    def _stream_predict(
+        stage: str, predictor: Any, output_field: str, inputs: Dict[str, Any], start: float
+    ) -> Tuple[Any, Optional[float]]:
+        """
+        Predict über dspy.streamify. Tokens des Ausgabefelds gehen an streaming.
+
+        StreamListener schneidet Feld-Marker des Adapters ab, es kommt nur
+        Text von output_field an. Gibt (Prediction, TTFT) zurück.
+        """
+        program = dspy_streamify(
+            predictor,
+            stream_listeners=[StreamListener(signature_field_name=output_field)],
+            async_streaming=False,
+        )
+        text, prediction, ttft_s = "", None, None
+        for item in program(**inputs):
+            if isinstance(item, StreamResponse):
+                if ttft_s is None and item.chunk:
+                    ttft_s = perf_counter() - start
+                text += item.chunk
+                emit_stage(stage, text)
+            elif isinstance(item, dspy.Prediction):
+                prediction = item
+        return prediction, ttft_s
+
     # Signatures
     class ReadNotes(dspy.Signature):
         """Extract structured scientific notes from TEXT. Work ONLY with the provided TEXT.
@@ -124,6 +275,22 @@ else:
         TEXT: str = dspy.InputField(desc="The scientific paper text to extract notes from")
         NOTES: str = dspy.OutputField(desc="Structured scientific notes following the schema above, no JSON, no extra prose")
 
+    # Chunked Reader: gleiches Schema, Anweisung nur auf Ausschnitt bezogen
+    ReadChunkNotes = ReadNotes.with_instructions(
+        "TEXT is one excerpt of a longer paper. Write partial notes for this excerpt only; "
+        "fields not covered by the excerpt are 'not reported'.\n" + ReadNotes.instructions
+    )
+
+    class MergeNotes(dspy.Signature):
+        """Merge PARTIAL_NOTES, extracted in order from consecutive excerpts of one paper, into one set of notes
+        using the same schema. Work ONLY with PARTIAL_NOTES. Do NOT invent facts or numbers.
+        Title: take it from the earliest excerpt that reports one.
+        A field is 'not reported' only if every excerpt says 'not reported'.
+        Results: keep every quantitative outcome from all excerpts, drop exact duplicates. Write exactly
+        'No quantitative metrics reported in provided text.' only if no excerpt lists a metric."""
+        PARTIAL_NOTES: str = dspy.InputField(desc="Partial notes per excerpt, in document order")
+        NOTES: str = dspy.OutputField(desc="Merged structured scientific notes, no JSON, no extra prose")
+
     class Summarize(dspy.Signature):
         """Produce a concise scientific summary from NOTES.
         Cover in this order: Objective -> Method (what/how) -> Results (numbers if present; otherwise write exactly 'No quantitative metrics reported in provided text.')
@@ -174,13 +341,34 @@ else:
         bereinigt JSON-Formatierung, die das LLM hinzufügen könnte. Manche
         Modelle wickeln Ausgabe in {} ein.
         """
-        def __init__(self):
+        def __init__(self, cfg: Optional[Dict[str, Any]] = None):
             super().__init__()
+            self.cfg = cfg or {}
             self.gen = dspy.Predict(ReadNotes)
+            self.chunk_gen = dspy.Predict(ReadChunkNotes)
+            self.merge = dspy.Predict(MergeNotes)
 
         def forward(self, text: str):
-            out = self.gen(TEXT=text)
-            return dspy.Prediction(NOTES=_sanitize(out.NOTES))
+            if use_chunked_reader(text, self.cfg):
+                chunk_chars, parallelism = reader_chunk_settings(self.cfg)
+                chunks = chunk_sections(text or "", chunk_chars)
+                if len(chunks) > 1:
+                    return dspy.Prediction(NOTES=self._read_chunked(chunks, parallelism))
+            notes = _cached_predict("reader", self.gen, "NOTES", TEXT=text)
+            return dspy.Prediction(NOTES=_sanitize(notes))
+
+        def _read_chunked(self, chunks: List[str], parallelism: int) -> str:
+            """Map über Chunks in Threads, dann Merge. Wie agents.reader.run_chunked."""
+            def _read_chunk(chunk: str) -> str:
+                return _sanitize(_cached_predict("reader", self.chunk_gen, "NOTES", stream=False, TEXT=chunk))
+
+            partial_notes = _parallel_map(_read_chunk, chunks, parallelism, "dspy-reader-chunk")
+            merged_input = "\n\n".join(
+                f"--- Excerpt {i} of {len(chunks)} ---\n{notes}"
+                for i, notes in enumerate(partial_notes, 1)
+            )
+            merged = _cached_predict("reader", self.merge, "NOTES", PARTIAL_NOTES=merged_input)
+            return _sanitize(merged)
 
     class SummarizerM(dspy.Module):
         """
@@ -198,8 +386,8 @@ else:
             input_notes = NOTES if NOTES is not None else notes
             if input_notes is None:
                 raise ValueError("Either 'notes' or 'NOTES' must be provided")
-            out = self.gen(NOTES=input_notes)
-            return dspy.Prediction(SUMMARY=_sanitize(out.SUMMARY))
+            summary = _cached_predict("summarizer", self.gen, "SUMMARY", NOTES=input_notes)
+            return dspy.Prediction(SUMMARY=_sanitize(summary))
 
     class CriticM(dspy.Module):
         """Critic module that critiques summaries using declarative signatures."""
@@ -208,8 +396,8 @@ else:
             self.gen = dspy.Predict(Critique)
 
         def forward(self, notes: str, summary: str):
-            out = self.gen(NOTES=notes, SUMMARY=summary)
-            return dspy.Prediction(CRITIC=_sanitize(out.CRITIC))
+            critic = _cached_predict("critic", self.gen, "CRITIC", NOTES=notes, SUMMARY=summary)
+            return dspy.Prediction(CRITIC=_sanitize(critic))
 
     class IntegratorM(dspy.Module):
         """Integrator module that creates meta-summaries using declarative signatures."""
@@ -218,16 +406,17 @@ else:
             self.gen = dspy.Predict(Integrate)
 
         def forward(self, notes: str, summary: str, critic: str):
-            out = self.gen(NOTES=notes, SUMMARY=summary, CRITIC=critic)
-            return dspy.Prediction(META=_sanitize(out.META))
+            meta = _cached_predict("integrator", self.gen, "META", NOTES=notes, SUMMARY=summary, CRITIC=critic)
+            return dspy.Prediction(META=_sanitize(meta))
 
     # Pipeline für alle Module
     # Ähnlich wie LangChain sequenzieller Ansatz, aber Module sind deklarativ
     # (Signatures) statt (Prompt-Strings)
     class PaperPipeline(dspy.Module):
-        def __init__(self):
+        def __init__(self, cfg: Optional[Dict[str, Any]] = None):
             super().__init__()
-            self.reader = ReaderM()
+            self.cfg = cfg or {}
+            self.reader = ReaderM(cfg)
             self.summarizer = SummarizerM()
             self.critic = CriticM()
             self.integrator = IntegratorM()
@@ -236,12 +425,21 @@ else:
             # Zeit messen
             t0 = perf_counter()
             notes = self.reader(input_text).NOTES
+            emit("notes", notes, done=True)
             t1 = perf_counter()
             summary = self.summarizer(NOTES=notes).SUMMARY
+            emit("summary", summary, done=True)
             t2 = perf_counter()
-            critic = self.critic(notes, summary).CRITIC
+            # Lokaler Verifier kann LLM-Critic ersetzen, siehe agents.verifier
+            verdict, skip_llm = precheck(self.cfg, "dspy", notes, summary)
+            if skip_llm:
+                critic = verdict["critic"]
+            else:
+                critic = self.critic(notes, summary).CRITIC
+            emit("critic", critic, done=True)
             t3 = perf_counter()
             meta = self.integrator(notes, summary, critic).META
+            emit("meta", meta, done=True)
             t4 = perf_counter()
 
             return dspy.Prediction(
@@ -251,6 +449,15 @@ else:
                 critic_s=round(t3 - t2, 2),
                 integrator_s=round(t4 - t3, 2),
                 total_s=round(t4 - t0, 2),
+                trace=["reader", "summarizer"]
+                + (["verifier"] if verdict is not None else [])
+                + ([] if skip_llm else ["critic"])
+                + ["integrator"],
+                verifier=verifier_row(
+                    int(verdict is not None),
+                    int(verdict is not None and not verdict["passed"]),
+                    int(skip_llm),
+                ),
             )
 
     # Optionale Teleprompting
@@ -284,6 +491,118 @@ else:
                     continue
         return examples
 
+    # Kompilierte Summarizer auf Platte. Teleprompting (Reader über Dev-Set,
+    # Bootstrap, zweimal Scoren) kostet ein Vielfaches eines Laufs, Ergebnis
+    # hängt aber nur von Dev-Set, Modell, Signatures und Parametern ab.
+    # Bei Änderung an Signatures, Metrik oder Bootstrap-Ablauf hochzählen.
+    SIGNATURE_VERSION = 1
+    _PROGRAM_DIR = os.getenv("DSPY_PROGRAM_DIR", os.path.join("local_cache", "dspy_programs"))
+    _BOOTSTRAP_PARAMS = {"max_bootstrapped_demos": 3, "max_labeled_demos": 3}
+
+    def _signature_fingerprint() -> Dict[str, Any]:
+        # Instructions mit im Schlüssel. Wer Prompt-Text ändert und Version
+        # vergisst, bekommt trotzdem kein veraltetes Programm.
+        return {
+            "version": SIGNATURE_VERSION,
+            "signatures": {
+                sig.__name__: [sig.instructions, list(sig.fields)]
+                for sig in (ReadNotes, ReadChunkNotes, MergeNotes, Summarize)
+            },
+        }
+
+    def _program_key(cfg: Dict[str, Any], dev_path: str) -> Optional[str]:
+        try:
+            with open(dev_path, "rb") as f:
+                dev_hash = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+        lm = dspy.settings.lm
+        lm_kwargs = getattr(lm, "kwargs", {}) or {}
+        chunk_chars, _ = reader_chunk_settings(cfg)
+        payload = {
+            "dev_set": dev_hash,
+            "model": getattr(lm, "model", ""),
+            "api_base": lm_kwargs.get("api_base") or "",
+            "temperature": lm_kwargs.get("temperature"),
+            "max_tokens": lm_kwargs.get("max_tokens"),
+            # Reader-Modus bestimmt Notizen im Trainset
+            "reader_mode": cfg.get("reader_mode", "single"),
+            "reader_chunk_chars": chunk_chars,
+            "bootstrap": _BOOTSTRAP_PARAMS,
+            "signatures": _signature_fingerprint(),
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()[:32]
+
+    def _program_paths(cfg: Dict[str, Any], key: str) -> Tuple[str, str]:
+        directory = cfg.get("dspy_program_dir") or _PROGRAM_DIR
+        return os.path.join(directory, f"{key}.json"), os.path.join(directory, f"{key}.meta.json")
+
+    def _load_compiled(pipeline: "PaperPipeline", program_path: str, meta_path: str) -> Optional[Dict[str, Any]]:
+        """Lädt gespeicherten Summarizer. None, wenn nichts da oder kaputt."""
+        if not (os.path.exists(program_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            summarizer = SummarizerM()
+            summarizer.load(program_path)
+        except Exception:
+            return None
+        pipeline.summarizer = summarizer
+        return info
+
+    def _save_compiled(module: Any, info: Dict[str, Any], program_path: str, meta_path: str) -> None:
+        # Erst Programm, dann Sidecar. Ohne Sidecar gilt Eintrag als nicht
+        # vorhanden, halbe Einträge nach Absturz werden also neu kompiliert.
+        tmp_suffix = f".{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(program_path) or ".", exist_ok=True)
+            tmp_program = program_path[:-len(".json")] + tmp_suffix + ".json"
+            module.save(tmp_program)
+            os.replace(tmp_program, program_path)
+            tmp_meta = meta_path + tmp_suffix
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump({**info, "created": datetime.now().isoformat()}, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_meta, meta_path)
+        except Exception:
+            # Speichern ist Optimierung, Lauf soll daran nicht scheitern
+            pass
+
+    def _dspy_parallelism(cfg: Dict[str, Any]) -> int:
+        try:
+            return max(1, int(cfg.get("dspy_parallelism", 4)))
+        except (TypeError, ValueError):
+            return 4
+
+    def _dev_notes(reader: Any, text: str, cfg: Dict[str, Any]) -> str:
+        """
+        Reader-Notizen für ein Dev-Beispiel, gecacht über Text-Hash.
+
+        Ein Eintrag für die ganzen Notizen statt einzelner Predict-Aufrufe.
+        Auch gechunkter Reader (viele Aufrufe + Merge) ist so ein Lookup.
+        Notizen sind feste Trainingseingabe, daher auch bei Temperatur > 0
+        gecacht (cache_sampled).
+        """
+        lm = dspy.settings.lm
+        lm_kwargs = getattr(lm, "kwargs", {}) or {}
+        chunk_chars, _ = reader_chunk_settings(cfg)
+        key_fields = {
+            "model": getattr(lm, "model", ""),
+            "api_base": lm_kwargs.get("api_base") or "",
+            "temperature": lm_kwargs.get("temperature"),
+            "max_tokens": lm_kwargs.get("max_tokens"),
+            "prompt": {
+                "engine": "dspy",
+                "kind": "dev_notes",
+                "text_sha256": hashlib.sha256((text or "").encode("utf-8")).hexdigest(),
+                "reader_mode": cfg.get("reader_mode", "single"),
+                "reader_chunk_chars": chunk_chars,
+                "signatures": _signature_fingerprint()["signatures"],
+            },
+        }
+        return cached_completion("dev_reader", key_fields, lambda: reader(text).NOTES, cache_sampled=True)
+
     def _teleprompt_if_requested(pipeline: PaperPipeline, cfg: Dict[str, Any]):
         """
         Optimiert Pipeline mit BootstrapFewShot.
@@ -297,10 +616,22 @@ else:
         max_bootstrapped_demos=3 Grenze ist daher Kompromiss. Mehr Demos =
         bessere Optimierung, aber exponentiell langsamer. Wir probierten
         5 und 10. Die Gewinne waren das lange Warten nicht wert daher 3.
+        
+        Kompilierter Summarizer wird gespeichert (dspy_program_cache, Standard
+        an). Spätere Läufe mit gleichem Dev-Set, Modell und Signatures laden
+        ihn nur noch, Scores kommen aus der Sidecar-Datei.
         """
         if not cfg.get("dspy_teleprompt"):
             return
         dev_path = cfg.get("dspy_dev_path", "dev-set/dev.jsonl")
+        use_program_cache = cfg.get("dspy_program_cache", True)
+        program_key = _program_key(cfg, dev_path) if use_program_cache else None
+        if program_key:
+            program_path, meta_path = _program_paths(cfg, program_key)
+            cached_info = _load_compiled(pipeline, program_path, meta_path)
+            if cached_info is not None:
+                summary_line = f"{cached_info.get('summary', '')} Loaded compiled program from cache."
+                return {**cached_info, "summary": summary_line.strip(), "cached": True}
         dev = _load_devset(dev_path)
         if not dev:
             return
@@ -320,18 +651,24 @@ else:
 
         tp = dspy.teleprompt.BootstrapFewShot(
             metric=_metric,
-            max_bootstrapped_demos=3, # mit 3 eher klein wegen Geschwindigkeit
-            max_labeled_demos=3, # hier auch
+            # je 3, eher klein wegen Geschwindigkeit
+            **_BOOTSTRAP_PARAMS,
         )
         trainset = []
         note_gold_pairs: List[Tuple[str, str]] = []
         target_lengths: set[str] = set()
         prompt_focuses: set[str] = set()
-        for entry in dev:
-            text = entry["text"]
+        parallelism = _dspy_parallelism(cfg)
+        # Reader ausführen, für Notizen. Das sieht Summarizer tatsächlich.
+        # Parallel und über Text-Hash gecacht, Dev-Set ändert sich selten.
+        dev_notes = _parallel_map(
+            lambda entry: _dev_notes(pipeline.reader, entry["text"], cfg),
+            dev,
+            parallelism,
+            "dspy-dev-reader",
+        )
+        for entry, notes in zip(dev, dev_notes):
             gold = entry["target_summary"]
-            # Reader ausführen, für Notizen. Das sieht Summarizer tatsächlich
-            notes = pipeline.reader(text).NOTES
             trainset.append(dspy.Example(NOTES=notes, SUMMARY=gold).with_inputs("NOTES"))
             note_gold_pairs.append((notes, gold))
             # Metadaten für Reporting, was Dev-Set abdeckt
@@ -344,16 +681,20 @@ else:
         # Score-Funktion, um Modul zu bewerten. Testen auf demselben Dev-Set,
         # auf dem wir trainieren. Ziel: bessere Prompts finden, nicht Generalisierung zu messen.
         def _score_module(module):
-            scores = []
-            for notes, gold in note_gold_pairs:
-                pred = module(NOTES=notes)
-                scores.append(_metric(gold, pred))
+            scores = _parallel_map(
+                lambda pair: _metric(pair[1], module(NOTES=pair[0])),
+                note_gold_pairs,
+                parallelism,
+                "dspy-dev-score",
+            )
             return sum(scores) / len(scores) if scores else 0.0
 
         # Score vor Optimierung
         base_score = _score_module(pipeline.summarizer)
-        # Hier findet DSPy bessere Prompt-Beispiele
-        optimized_summarizer = tp.compile(pipeline.summarizer, trainset=trainset)
+        # Hier findet DSPy bessere Prompt-Beispiele. Cache dabei aus: Bootstrap
+        # sammelt Demos aus Predict-Traces, Cache-Treffer würden keine Traces erzeugen.
+        with cache_disabled():
+            optimized_summarizer = tp.compile(pipeline.summarizer, trainset=trainset)
         pipeline.summarizer = optimized_summarizer
 
         # Score nach Optimierung: sehen, ob wir verbessert haben
@@ -366,7 +707,7 @@ else:
             f"{len(trainset)} dev examples; lengths={sorted(target_lengths)}; focus={sorted(prompt_focuses)}."
         )
 
-        return {
+        info = {
             "gain": round(gain, 3),
             "base_score": round(base_score, 3),
             "optimized_score": round(optimized_score, 3),
@@ -376,19 +717,32 @@ else:
             "target_lengths": sorted(target_lengths),
             "prompt_focus": sorted(prompt_focuses),
         }
+        if program_key:
+            _save_compiled(optimized_summarizer, info, program_path, meta_path)
+        return {**info, "cached": False}
 
 
     # Public API
-    def run_pipeline(input_text: str, cfg: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def run_pipeline(
+        input_text: str, cfg: Optional[Dict[str, Any]] = None, on_partial: Optional[OnPartial] = None
+    ) -> Dict[str, Any]:
+        """on_partial(Feld, Text, fertig) bekommt Teilausgaben, siehe streaming."""
         cfg = cfg or {}
-        _configure_dspy(cfg)
-
-        pipe = PaperPipeline()
-        teleprompt_info = _teleprompt_if_requested(pipe, cfg)
-
-        t0 = perf_counter()
-        out = pipe(input_text=input_text)
-        t1 = perf_counter()
+        with dspy.settings.context(lm=_configure_dspy(cfg)):
+            return _run_with_lm(input_text, cfg, on_partial)
+
+    def _run_with_lm(input_text: str, cfg: Dict[str, Any], on_partial: Optional[OnPartial] = None) -> Dict[str, Any]:
+        pipe = PaperPipeline(cfg)
+        # Eigener track()-Block, damit Dev-Set-Aufrufe nicht in Stage-Zählern
+        # vom eigentlichen Lauf landen
+        with track(cfg):
+            teleprompt_info = _teleprompt_if_requested(pipe, cfg)
+
+        # Streaming erst hier, Dev-Set-Aufrufe gehören nicht in die UI
+        with listen(on_partial), track(cfg) as cache_stats, track_usage(cfg) as usage_stats:
+            t0 = perf_counter()
+            out = pipe(input_text=input_text)
+            t1 = perf_counter()
         metrics_count = count_numeric_results(out.NOTES)
         confidence_line = extract_confidence_line(out.META)
 
@@ -413,9 +767,12 @@ else:
             "input_chars": len(input_text or ""),
             "graph_dot": None,
             "dspy_available": True,
-            "execution_trace": ["reader", "summarizer", "critic", "integrator"],
+            "execution_trace": out.trace,
             "extracted_metrics_count": metrics_count,
             "confidence": confidence_line,
+            **cache_stats.as_row(),
+            **usage_stats.as_row(),
+            **out.verifier,
         }
         if teleprompt_info:
             result.update({
@@ -427,6 +784,7 @@ else:
                 "teleprompt_target_lengths": teleprompt_info["target_lengths"],
                 "teleprompt_prompt_focus": teleprompt_info["prompt_focus"],
                 "teleprompt_summary": teleprompt_info["summary"],
+                "teleprompt_cached": teleprompt_info.get("cached", False),
             })
             result["meta"] = result["meta"] + "\n\n" + teleprompt_info["summary"]
 
@@ -448,8 +806,24 @@ else:
                     "integrator_s": result["integrator_s"],
                     "extracted_metrics_count": metrics_count,
                     "confidence": confidence_line,
+                    **cache_stats.as_row(),
+                    **usage_stats.as_row(),
+                    **out.verifier,
                 })
             except Exception:
                 pass
 
         return result
+
+
+    async def run_pipeline_async(
+        input_text: str, cfg: Optional[Dict[str, Any]] = None, on_partial: Optional[OnPartial] = None
+    ) -> Dict[str, Any]:
+        """
+        Async-Wrapper für DSPy.
+
+        DSPy-Module hier sind synchron, daher Lauf in Worker-Thread. Event-Loop
+        bleibt frei für andere Papers. to_thread kopiert contextvars, Cache-
+        und DSPy-Kontext gelten also auch im Thread.
+        """
+        return await asyncio.to_thread(run_pipeline, input_text, cfg, on_partial)
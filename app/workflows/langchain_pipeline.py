@@ -5,20 +5,33 @@ from datetime import datetime
 from time import perf_counter
 from typing import Any, Dict, Optional
 
-from agents.critic import run as run_critic
-from agents.integrator import run as run_integrator
-from agents.reader import run as run_reader
-from agents.summarizer import run as run_summarizer
+from agents.critic import arun as arun_critic, run as run_critic
+from agents.integrator import arun as arun_integrator, run as run_integrator
+from agents.reader import (
+    arun_with_config as arun_reader_with_config,
+    run_with_config as run_reader_with_config,
+)
+from agents.summarizer import arun as arun_summarizer, run as run_summarizer
+from agents.verifier import precheck, verifier_row
 from llm import configure
+from llm_cache import CacheStats, track
+from retrieval import critic_evidence
+from streaming import OnPartial, emit, listen
 from telemetry import log_row
+from usage import UsageStats, track as track_usage
 from utils import (
     build_analysis_context,
     count_numeric_results,
     extract_confidence_line,
 )
+from workflows.shared_stages import reused_label, reused_row, shared_output
 
 
-def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+def run_pipeline(
+    input_text: str,
+    config: Optional[Dict[str, Any]] = None,
+    on_partial: Optional[OnPartial] = None,
+) -> Dict[str, Any]:
     """
     LangChain Pipeline sequenziell.
     
@@ -28,10 +41,22 @@ def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Di
     Das ist absichtlich einfach. Retry-Logik oder Fallbacks nach würden es schwerer machen
     zu sehen, was LangGraph hinzufügt. execution_trace dient nur
     Debuggen und für Telemetrie.
+
+    on_partial(Feld, Text, fertig) bekommt Tokens und fertige Ausgaben jeder
+    Stage, siehe streaming.
     """
     config_dict = config or {}
     configure(config_dict)
-    
+    with listen(on_partial), track(config_dict) as cache_stats, track_usage(config_dict) as usage_stats:
+        return _run_sequential(input_text, config_dict, cache_stats, usage_stats)
+
+
+def _run_sequential(
+    input_text: str,
+    config_dict: Dict[str, Any],
+    cache_stats: CacheStats,
+    usage_stats: UsageStats,
+) -> Dict[str, Any]:
     execution_trace = ["retriever"]
     analysis_context = build_analysis_context(input_text, config_dict)
     
@@ -42,41 +67,201 @@ def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Di
             "No valid text detected. Try disabling truncation or re-uploading the PDF."
         )
     
+    # Geteilte Stages aus Vergleichsläufen (shared_stages) statt neu berechnen
+    reused_stages = []
+    shared_notes = shared_output(config_dict, "notes")
+    shared_summary = shared_output(config_dict, "summary")
+    
     start_time_reader = perf_counter()
-    execution_trace.append("reader")
-    structured_notes = run_reader(analysis_context)
+    if shared_notes is not None:
+        execution_trace.append(reused_label("reader"))
+        reused_stages.append("reader")
+        structured_notes = shared_notes
+    else:
+        execution_trace.append("reader")
+        structured_notes = run_reader_with_config(analysis_context, config_dict)
+    emit("notes", structured_notes, done=True)
     end_time_reader = perf_counter()
     reader_duration = round(end_time_reader - start_time_reader, 2)
-    metrics_count = count_numeric_results(structured_notes)
     
     start_time_summarizer = perf_counter()
-    execution_trace.append("summarizer")
-    summary = run_summarizer(structured_notes)
+    if shared_summary is not None:
+        execution_trace.append(reused_label("summarizer"))
+        reused_stages.append("summarizer")
+        summary = shared_summary
+    else:
+        execution_trace.append("summarizer")
+        summary = run_summarizer(structured_notes)
+    emit("summary", summary, done=True)
     end_time_summarizer = perf_counter()
     summarizer_duration = round(end_time_summarizer - start_time_summarizer, 2)
     
     start_time_critic = perf_counter()
-    execution_trace.append("critic")
-    critic_result = run_critic(notes=structured_notes, summary=summary)
-    critic_text = critic_result.get("critic") or critic_result.get("critique") or ""
+    verdict, skip_llm = precheck(config_dict, "langchain", structured_notes, summary)
+    if verdict is not None:
+        execution_trace.append("verifier")
+    if skip_llm:
+        critic_text = verdict["critic"]
+    else:
+        execution_trace.append("critic")
+        evidence = critic_evidence(config_dict, analysis_context, summary)
+        critic_result = run_critic(notes=structured_notes, summary=summary, evidence=evidence)
+        critic_text = critic_result.get("critic") or critic_result.get("critique") or ""
+    emit("critic", critic_text, done=True)
     end_time_critic = perf_counter()
     critic_duration = round(end_time_critic - start_time_critic, 2)
     
     start_time_integrator = perf_counter()
     execution_trace.append("integrator")
     meta_summary = run_integrator(notes=structured_notes, summary=summary, critic=critic_text)
+    emit("meta", meta_summary, done=True)
     end_time_integrator = perf_counter()
     integrator_duration = round(end_time_integrator - start_time_integrator, 2)
-    confidence_line = extract_confidence_line(meta_summary)
     
-    total_duration = round(end_time_integrator - start_time_reader, 2)
+    return _finish_run(
+        config_dict,
+        analysis_context,
+        structured_notes,
+        summary,
+        critic_text,
+        meta_summary,
+        {
+            "reader_s": reader_duration,
+            "summarizer_s": summarizer_duration,
+            "critic_s": critic_duration,
+            "integrator_s": integrator_duration,
+        },
+        execution_trace,
+        round(end_time_integrator - start_time_reader, 2),
+        cache_stats,
+        usage_stats,
+        reused_stages,
+        _verifier_stats(verdict, skip_llm),
+    )
+
+
+async def run_pipeline_async(
+    input_text: str,
+    config: Optional[Dict[str, Any]] = None,
+    on_partial: Optional[OnPartial] = None,
+) -> Dict[str, Any]:
+    """
+    Async-Variante von run_pipeline.
+
+    Gleicher Ablauf, aber Agents über ainvoke. Ein Event-Loop kann so viele
+    Papers gleichzeitig offen halten, statt einen Thread pro Paper zu blockieren.
+    Ergebnis und Telemetrie identisch zur synchronen Version.
+    """
+    config_dict = config or {}
+    configure(config_dict)
+    with listen(on_partial), track(config_dict) as cache_stats, track_usage(config_dict) as usage_stats:
+        return await _arun_sequential(input_text, config_dict, cache_stats, usage_stats)
+
+
+async def _arun_sequential(
+    input_text: str,
+    config_dict: Dict[str, Any],
+    cache_stats: CacheStats,
+    usage_stats: UsageStats,
+) -> Dict[str, Any]:
+    execution_trace = ["retriever"]
+    analysis_context = build_analysis_context(input_text, config_dict)
+    if not analysis_context or len(analysis_context.strip()) < 100:
+        return _create_error_response(
+            "No valid text detected. Try disabling truncation or re-uploading the PDF."
+        )
+    
+    reused_stages = []
+    shared_notes = shared_output(config_dict, "notes")
+    shared_summary = shared_output(config_dict, "summary")
+    
+    start_time_reader = perf_counter()
+    if shared_notes is not None:
+        execution_trace.append(reused_label("reader"))
+        reused_stages.append("reader")
+        structured_notes = shared_notes
+    else:
+        execution_trace.append("reader")
+        structured_notes = await arun_reader_with_config(analysis_context, config_dict)
+    emit("notes", structured_notes, done=True)
+    end_time_reader = perf_counter()
+    
+    if shared_summary is not None:
+        execution_trace.append(reused_label("summarizer"))
+        reused_stages.append("summarizer")
+        summary = shared_summary
+    else:
+        execution_trace.append("summarizer")
+        summary = await arun_summarizer(structured_notes)
+    emit("summary", summary, done=True)
+    end_time_summarizer = perf_counter()
+    
+    verdict, skip_llm = precheck(config_dict, "langchain", structured_notes, summary)
+    if verdict is not None:
+        execution_trace.append("verifier")
+    if skip_llm:
+        critic_text = verdict["critic"]
+    else:
+        execution_trace.append("critic")
+        evidence = critic_evidence(config_dict, analysis_context, summary)
+        critic_result = await arun_critic(notes=structured_notes, summary=summary, evidence=evidence)
+        critic_text = critic_result.get("critic") or critic_result.get("critique") or ""
+    emit("critic", critic_text, done=True)
+    end_time_critic = perf_counter()
+    
+    execution_trace.append("integrator")
+    meta_summary = await arun_integrator(notes=structured_notes, summary=summary, critic=critic_text)
+    emit("meta", meta_summary, done=True)
+    end_time_integrator = perf_counter()
+    
+    return _finish_run(
+        config_dict,
+        analysis_context,
+        structured_notes,
+        summary,
+        critic_text,
+        meta_summary,
+        {
+            "reader_s": round(end_time_reader - start_time_reader, 2),
+            "summarizer_s": round(end_time_summarizer - end_time_reader, 2),
+            "critic_s": round(end_time_critic - end_time_summarizer, 2),
+            "integrator_s": round(end_time_integrator - end_time_critic, 2),
+        },
+        execution_trace,
+        round(end_time_integrator - start_time_reader, 2),
+        cache_stats,
+        usage_stats,
+        reused_stages,
+        _verifier_stats(verdict, skip_llm),
+    )
+
+
+def _verifier_stats(verdict: Optional[Dict[str, Any]], skip_llm: bool) -> Dict[str, int]:
+    # Linear, also höchstens ein Verifier-Lauf pro Paper
+    if verdict is None:
+        return verifier_row(0, 0, 0)
+    return verifier_row(1, 0 if verdict["passed"] else 1, 1 if skip_llm else 0)
+
+
+def _finish_run(
+    config_dict: Dict[str, Any],
+    analysis_context: str,
+    structured_notes: str,
+    summary: str,
+    critic_text: str,
+    meta_summary: str,
+    timing_statistics: Dict[str, float],
+    execution_trace: list,
+    total_duration: float,
+    cache_stats: CacheStats,
+    usage_stats: UsageStats,
+    reused_stages: list,
+    verifier_stats: Dict[str, int],
+) -> Dict[str, Any]:
+    """Telemetrie schreiben und Ergebnis bauen. Gemeinsam für sync und async."""
+    metrics_count = count_numeric_results(structured_notes)
+    confidence_line = extract_confidence_line(meta_summary)
     input_chars = len(analysis_context)
-    timing_statistics = {
-        "reader_s": reader_duration,
-        "summarizer_s": summarizer_duration,
-        "critic_s": critic_duration,
-        "integrator_s": integrator_duration,
-    }
     
     # In CSV loggen für Analyse. Wir erfassen alles: Zeiten, Längen, Metrik-Anzahl.
     # Hilft zu sehen welcher Schritt langsam ist, welche Papers Ergebnisse
@@ -96,6 +281,10 @@ def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Di
             **timing_statistics,
             "extracted_metrics_count": metrics_count,
             "confidence": confidence_line,
+            **cache_stats.as_row(),
+            **usage_stats.as_row(),
+            **reused_row(reused_stages),
+            **verifier_stats,
         })
     
     return {
@@ -109,6 +298,10 @@ def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Di
         "execution_trace": execution_trace,
         "extracted_metrics_count": metrics_count,
         "confidence": confidence_line or "",
+        **cache_stats.as_row(),
+        **usage_stats.as_row(),
+        **reused_row(reused_stages),
+        **verifier_stats,
     }
 
 
@@ -120,9 +313,10 @@ def _create_error_response(error_message: str) -> Dict[str, Any]:
     Antwort mit gleicher Struktur wie ein erfolgreicher Lauf.
     Aber mit leeren Strings und Fehlermeldung im meta-Feld. 
     UI zeigt Fehler ohne Sonderbehandlung. Telemetrie trotzdem
-    geloggt.
+    geloggt. Feld error markiert Antwort für batch_runner als Fehler.
     """
     return {
+        "error": error_message,
         "structured": "[Input empty or too short]",
         "summary": "",
         "critic": "",
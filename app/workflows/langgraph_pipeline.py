@@ -1,31 +1,69 @@
 
 from __future__ import annotations
 
+import asyncio
 import concurrent.futures as cf
+import contextvars
+import hashlib
+import json
+import os
 import re
+import sqlite3
+import threading
+from contextlib import asynccontextmanager
 from datetime import datetime
 from time import perf_counter
-from typing import Any, Callable, Dict, Optional, TypedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypedDict
 
+from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph import END, StateGraph
 
-from agents.critic import run as run_critic
-from agents.integrator import run as run_integrator
-from agents.reader import run as run_reader
-from agents.summarizer import run as run_summarizer
+# Optional: Checkpoints in SQLite (pip install langgraph-checkpoint-sqlite).
+# Ohne Paket liegen Checkpoints nur im Speicher des Prozesses.
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+except ImportError:
+    SqliteSaver = None
+    AsyncSqliteSaver = None
+
+from agents.critic import arun as arun_critic, improvements as critic_improvements, run as run_critic
+from agents.integrator import arun as arun_integrator, run as run_integrator
+from agents.reader import (
+    arun_with_config as arun_reader_with_config,
+    run_with_config as run_reader_with_config,
+)
+from agents.summarizer import (
+    DEFAULT_REVISION_MAX_TOKENS,
+    arevise,
+    arun as arun_summarizer,
+    arun_candidates,
+    candidate_temperatures,
+    revise,
+    run as run_summarizer,
+    run_candidates,
+)
+from agents.verifier import precheck, rank_candidates, verifier_row
 from llm import configure
+from llm_cache import CacheStats, track
+from retrieval import critic_evidence, doc_hash, get_index, retrieval_settings
+from streaming import PARTIAL_FIELDS, OnPartial, emit, listen
 from telemetry import log_row
+from usage import UsageStats, active as active_usage, track as track_usage
 from utils import (
     build_analysis_context,
     count_numeric_results,
     extract_confidence_line,
 )
+from workflows.shared_stages import reused_label, reused_row, shared_output
 
 
 class PipelineState(TypedDict):
     """State of LangGraph workflow."""
     input_text: str
     analysis_context: str
+    input_chars: int
+    doc_id: str
     notes: str
     summary: str
     critic: str
@@ -33,22 +71,82 @@ class PipelineState(TypedDict):
     reader_s: float
     summarizer_s: float
     critic_s: float
+    reviser_s: float
     integrator_s: float
     critic_score: float
     critic_loops: int
+    next_route: str
+    loop_stats: list[Dict[str, Any]]
+    summary_candidates: list[Dict[str, Any]]
     execution_trace: list[str]
     routing_trace: list[str]
     confidence: str
+    stage_timeouts: Dict[str, int]
+    reused_stages: list[str]
+    verifier_runs: int
+    verifier_failures: int
+    critic_llm_skipped: int
     _timeout: int
     _config: Dict[str, Any]
 
 
+class _NodeState(dict):
+    """
+    State-Sicht einer Node. Merkt sich, welche Schlüssel sie schreibt.
+
+    Nodes ändern State wie gewohnt per state[key] = ..., an LangGraph geht
+    aber nur Teil-Update mit geänderten Schlüsseln. Früher gab jede Node
+    ganzen State zurück, LangGraph schrieb jeden Kanal (auch Papertext)
+    in jedem Schritt neu. Listen und Dicts im State daher nie in-place
+    ändern, sondern neu zuweisen, sonst fehlt Änderung im Update.
+    """
+
+    def __init__(self, state: Dict[str, Any]):
+        super().__init__(state)
+        self.changed: set = set()
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        self.changed.add(key)
+
+    def updates(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self.changed}
+
+
+def _partial_node(node: Callable) -> Callable:
+    """
+    Wickelt Node so, dass sie nur geänderte Schlüssel zurückgibt.
+
+    Geänderte Ergebnisfelder (notes, summary, critic, meta) gehen zusätzlich
+    als fertig an streaming. Deckt auch Cache-Treffer, geteilte Stages,
+    Verifier und Reviser ab, die selbst keine Tokens streamen.
+    """
+    if asyncio.iscoroutinefunction(node):
+        async def _async_wrapper(state: PipelineState) -> Dict[str, Any]:
+            view = _NodeState(state)
+            await node(view)
+            return _emit_updates(view)
+        _async_wrapper.__name__ = node.__name__
+        return _async_wrapper
+
+    def _wrapper(state: PipelineState) -> Dict[str, Any]:
+        view = _NodeState(state)
+        node(view)
+        return _emit_updates(view)
+    _wrapper.__name__ = node.__name__
+    return _wrapper
+
+
+def _emit_updates(view: _NodeState) -> Dict[str, Any]:
+    updates = view.updates()
+    for field in PARTIAL_FIELDS:
+        if field in updates:
+            emit(field, updates[field], done=True)
+    return updates
+
+
 def _append_trace(state: PipelineState, label: str) -> None:
-    trace = state.get("execution_trace")
-    if not isinstance(trace, list):
-        trace = []
-        state["execution_trace"] = trace
-    trace.append(label)
+    state["execution_trace"] = [*(state.get("execution_trace") or []), label]
 
 
 def _append_route(state: PipelineState, route: str) -> None:
@@ -59,36 +157,126 @@ def _append_route(state: PipelineState, route: str) -> None:
     verstehen, warum Graph einen bestimmten Pfad nahm. routing_trace ist
     getrennt von execution_trace. Eine Node kann mehrmals ausgeführt werden.
     """
-    routes = state.get("routing_trace")
-    if not isinstance(routes, list):
-        routes = []
-        state["routing_trace"] = routes
-    routes.append(route)
+    state["routing_trace"] = [*(state.get("routing_trace") or []), route]
+
+
+TIMEOUT_SENTINEL = "__TIMEOUT__"
+
+
+class StageTimeoutError(TimeoutError):
+    """Stage-Timeout bei aktiven Checkpoints. Wiederholung setzt vor dieser Stage fort."""
+
+
+# Ein langlebiger Pool für alle Stage-Aufrufe statt neuer Pool pro Node.
+# Größe begrenzt, wie viele abgebrochene (noch laufende) Aufrufe parallel
+# hängen dürfen, bevor neue Stages warten müssen.
+_STAGE_WORKERS = int(os.getenv("LANGGRAPH_STAGE_WORKERS", "16"))
+_stage_executor: Optional[cf.ThreadPoolExecutor] = None
+_stage_executor_lock = threading.Lock()
+
+
+def _get_stage_executor() -> cf.ThreadPoolExecutor:
+    global _stage_executor
+    with _stage_executor_lock:
+        if _stage_executor is None:
+            _stage_executor = cf.ThreadPoolExecutor(
+                max_workers=max(1, _STAGE_WORKERS),
+                thread_name_prefix="langgraph-stage",
+            )
+        return _stage_executor
 
 
 def _execute_with_timeout(
     function: Callable,
     timeout_seconds: int,
-    timeout_default_value: str = "__TIMEOUT__"
+    timeout_default_value: str = TIMEOUT_SENTINEL
 ) -> Any:
     """
     Führt Funktion mit timeout protection aus.
     
-    Aufrufe zum LLM bleiben teilweise hängen. ThreadPoolExecutor bricht nach
-    timeout_seconds ab. So blockiert kein langsamer API-Aufruf gesamte Pipeline.
+    Aufrufe zum LLM bleiben teilweise hängen. Nach timeout_seconds geben wir
+    Sentinel zurück. So blockiert kein langsamer API-Aufruf gesamte Pipeline.
+    
+    Früher mit `with ThreadPoolExecutor(...)`: Beim Verlassen wartete
+    shutdown() auf hängenden Worker, Timeout griff also nicht wirklich.
+    Jetzt geteilter Pool ohne shutdown. Bei Timeout wird Future abgebrochen,
+    falls noch nicht gestartet, sonst aufgegeben. HTTP-Aufruf selbst endet
+    über Client-Timeout (config "timeout"). Kommt Antwort später doch, landet
+    sie im Antwort-Cache und nächster Lauf profitiert.
     
-    Zuerst probiert mit signal-basierten Timeouts. Funktionieren nicht
-    gut mit Threads. ThreadPoolExecutor ermöglicht sauberes Abbrechen.
     "__TIMEOUT__" String ist etwas umständlich, aber eindeutig. Man kann ihn
     leicht erkennen. Wir könnten None zurückgeben, dann müssten wir überall
     auf None prüfen.
     """
-    with cf.ThreadPoolExecutor(max_workers=1) as executor:
-        future = executor.submit(function)
-        try:
-            return future.result(timeout=max(1, int(timeout_seconds)))
-        except cf.TimeoutError:
-            return timeout_default_value
+    # Kontext kopieren, sonst sieht Worker-Thread keinen aktiven Cache-Lauf
+    context = contextvars.copy_context()
+    future = _get_stage_executor().submit(context.run, function)
+    try:
+        return future.result(timeout=max(1, int(timeout_seconds)))
+    except cf.TimeoutError:
+        future.cancel()
+        return timeout_default_value
+
+
+async def _aexecute_with_timeout(
+    coroutine: Awaitable[Any],
+    timeout_seconds: int,
+    timeout_default_value: str = TIMEOUT_SENTINEL
+) -> Any:
+    """
+    Async-Gegenstück zu _execute_with_timeout.
+
+    asyncio.wait_for bricht Task bei Timeout wirklich ab. Cancellation geht
+    bis in httpx, offener HTTP-Request wird geschlossen statt aufgegeben.
+    """
+    try:
+        return await asyncio.wait_for(coroutine, timeout=max(1, int(timeout_seconds)))
+    except asyncio.TimeoutError:
+        return timeout_default_value
+
+
+def _record_timeout(state: PipelineState, stage: str, output: Any) -> None:
+    """
+    Zählt Timeouts pro Stage für Telemetrie.
+
+    Mit Checkpoints stattdessen Fehler. Sentinel würde sonst als fertiges
+    Ergebnis gespeichert und Wiederholung ginge dahinter weiter. So wird
+    Node nicht gespeichert und nächster Lauf beginnt genau bei ihr.
+    """
+    if output != TIMEOUT_SENTINEL:
+        return
+    if checkpoint_backend(state.get("_config")) != "off":
+        raise StageTimeoutError(f"LangGraph stage '{stage}' timed out after {state.get('_timeout')}s")
+    timeouts = dict(state.get("stage_timeouts") or {})
+    timeouts[stage] = timeouts.get(stage, 0) + 1
+    state["stage_timeouts"] = timeouts
+
+
+def _timeout_row(state: Dict[str, Any]) -> Dict[str, int]:
+    timeouts = state.get("stage_timeouts") or {}
+    row = {"timeouts": sum(timeouts.values())}
+    for stage in ("reader", "summarizer", "critic", "reviser", "integrator"):
+        row[f"{stage}_timeouts"] = timeouts.get(stage, 0)
+    return row
+
+
+def _reuse_shared(state: PipelineState, stage: str, shared_key: str) -> Optional[str]:
+    """
+    Geteilte Ausgabe aus config["shared_stages"] übernehmen, falls vorhanden.
+
+    Nur beim ersten Durchlauf einer Stage. Routet Critic zurück zum
+    Summarizer, soll der wirklich neu schreiben und nicht dieselbe geteilte
+    Zusammenfassung wieder bekommen.
+    """
+    reused = state.get("reused_stages") or []
+    if stage in reused:
+        return None
+    value = shared_output(state.get("_config"), shared_key)
+    if value is None:
+        return None
+    state["reused_stages"] = [*reused, stage]
+    _append_trace(state, reused_label(stage))
+    return value
 
 
 def _execute_retriever_node(state: PipelineState) -> PipelineState:
@@ -98,6 +286,11 @@ def _execute_retriever_node(state: PipelineState) -> PipelineState:
     raw_input = state.get("input_text", "") or ""
     analysis_context = build_analysis_context(raw_input, config)
     state["analysis_context"] = analysis_context
+    state["input_chars"] = len(analysis_context or raw_input)
+    if config.get("critic_evidence") and analysis_context:
+        # Index einmal pro Paper, Critic-Schleifen und spätere Läufe nutzen Cache
+        chunk_chars, _ = retrieval_settings(config)
+        state["doc_id"] = get_index(analysis_context, chunk_chars).doc_id
     return state
 
 
@@ -114,16 +307,37 @@ def _execute_reader_node(state: PipelineState) -> PipelineState:
     vorverarbeitet. Metadaten wurden entfernt. Das liefert bessere Ergebnisse.
     Falls analysis_context nicht gesetzt ist, nutzen wir rohen Input als Fallback.
     """
+    shared_notes = _reuse_shared(state, "reader", "notes")
+    if shared_notes is not None:
+        state["notes"] = shared_notes
+        state["reader_s"] = 0.0
+        _drop_reader_inputs(state)
+        return state
     _append_trace(state, "reader")
     start_time = perf_counter()
     timeout_seconds = state.get("_timeout", 45)
     input_for_reader = state.get("analysis_context") or state.get("input_text") or ""
-    notes_output = _execute_with_timeout(lambda: run_reader(input_for_reader), timeout_seconds)
+    config = state.get("_config", {}) or {}
+    notes_output = _execute_with_timeout(lambda: run_reader_with_config(input_for_reader, config), timeout_seconds)
+    _record_timeout(state, "reader", notes_output)
     state["notes"] = notes_output
     state["reader_s"] = round(perf_counter() - start_time, 2)
+    _drop_reader_inputs(state)
     return state
 
 
+def _drop_reader_inputs(state: PipelineState) -> None:
+    """
+    Papertext nach dem Reader aus State nehmen.
+
+    Spätere Nodes arbeiten nur mit Notizen. analysis_context bleibt nur, wenn
+    Critic Belegstellen sucht (critic_evidence).
+    """
+    state["input_text"] = ""
+    if not (state.get("_config") or {}).get("critic_evidence"):
+        state["analysis_context"] = ""
+
+
 def _execute_summarizer_node(state: PipelineState) -> PipelineState:
     """
     Kann mehrmals laufen, wenn Critic hierher zurückroutet. Bei jedem
@@ -131,15 +345,109 @@ def _execute_summarizer_node(state: PipelineState) -> PipelineState:
     produzieren. LLMs nicht deterministisch, außer temperature=0.
     Zeitmessung erfasst jede Ausführung separat. So sehen wir, wie oft es lief.
     """
+    shared_summary = _reuse_shared(state, "summarizer", "summary")
+    if shared_summary is not None:
+        state["summary"] = shared_summary
+        state["summarizer_s"] = 0.0
+        return state
     _append_trace(state, "summarizer")
     start_time = perf_counter()
+    usage_before = _stage_usage("summarizer")
     timeout_seconds = state.get("_timeout", 45)
     summary_output = _execute_with_timeout(lambda: run_summarizer(state["notes"]), timeout_seconds)
+    _record_timeout(state, "summarizer", summary_output)
     state["summary"] = summary_output
     state["summarizer_s"] = round(perf_counter() - start_time, 2)
+    if state.get("critic_loops", 0):
+        _record_revision(state, "full", "summarizer", start_time, usage_before, None)
     return state
 
 
+def _candidate_count(config: Optional[Dict[str, Any]]) -> int:
+    """config["summary_candidates"], 1 heißt Best-of-N aus."""
+    return max(1, int((config or {}).get("summary_candidates") or 1))
+
+
+def _candidate_setup(state: PipelineState) -> list:
+    cfg = state.get("_config", {}) or {}
+    return candidate_temperatures(cfg.get("temperature") or 0.0, _candidate_count(cfg))
+
+
+def _select_candidate(state: PipelineState, temperatures: list, output: Any, start_time: float) -> None:
+    """Besten Kandidaten lokal wählen, Bewertung aller Kandidaten für Telemetrie."""
+    state["summarizer_s"] = round(perf_counter() - start_time, 2)
+    if output == TIMEOUT_SENTINEL:
+        state["summary"] = output
+        return
+    ranked = rank_candidates(state["notes"], output)
+    for rank in ranked:
+        rank["temperature"] = temperatures[rank["index"]]
+        rank["selected"] = rank is ranked[0]
+    state["summary"] = output[ranked[0]["index"]]
+    state["summary_candidates"] = sorted(ranked, key=lambda rank: rank["index"])
+
+
+def _execute_candidates_node(state: PipelineState) -> PipelineState:
+    """
+    Best-of-N statt Summarizer (config["summary_candidates"] > 1).
+
+    N Zusammenfassungen parallel mit gestaffelter Temperatur, Auswahl lokal
+    über Verifier-Regeln und Wort-F1 gegen NOTES. Danach genau ein Critic-
+    Lauf, keine Schleifen. Wartezeit etwa ein Summarizer- plus ein Critic-
+    Aufruf statt bis zu drei Runden nacheinander.
+    """
+    shared_summary = _reuse_shared(state, "summarizer", "summary")
+    if shared_summary is not None:
+        state["summary"] = shared_summary
+        state["summarizer_s"] = 0.0
+        return state
+    _append_trace(state, "summarizer")
+    start_time = perf_counter()
+    temperatures = _candidate_setup(state)
+    output = _execute_with_timeout(lambda: run_candidates(state["notes"], temperatures), state.get("_timeout", 45))
+    _record_timeout(state, "summarizer", output)
+    _select_candidate(state, temperatures, output, start_time)
+    return state
+
+
+async def _aexecute_candidates_node(state: PipelineState) -> PipelineState:
+    shared_summary = _reuse_shared(state, "summarizer", "summary")
+    if shared_summary is not None:
+        state["summary"] = shared_summary
+        state["summarizer_s"] = 0.0
+        return state
+    _append_trace(state, "summarizer")
+    start_time = perf_counter()
+    temperatures = _candidate_setup(state)
+    output = await _aexecute_with_timeout(arun_candidates(state["notes"], temperatures), state.get("_timeout", 45))
+    _record_timeout(state, "summarizer", output)
+    _select_candidate(state, temperatures, output, start_time)
+    return state
+
+
+def _local_critic(state: PipelineState) -> bool:
+    """
+    Lokaler Verifier vor dem Critic (config["local_verifier"]).
+
+    True, wenn das Urteil des Verifiers reicht und der LLM-Critic entfällt.
+    Dann steht Verifier-Text in state["critic"], Routing und Integrator
+    arbeiten damit wie mit normaler Critic-Ausgabe. Zähler landen in
+    Telemetrie, auch über Critic-Schleifen hinweg.
+    """
+    verdict, skip_llm = precheck(state.get("_config"), "langgraph", state["notes"], state["summary"])
+    if verdict is None:
+        return False
+    _append_trace(state, "verifier")
+    state["verifier_runs"] = state.get("verifier_runs", 0) + 1
+    if not verdict["passed"]:
+        state["verifier_failures"] = state.get("verifier_failures", 0) + 1
+    if not skip_llm:
+        return False
+    state["critic_llm_skipped"] = state.get("critic_llm_skipped", 0) + 1
+    state["critic"] = verdict["critic"]
+    return True
+
+
 def _execute_critic_node(state: PipelineState) -> PipelineState:
     """
     Führt Critic-Agent aus.
@@ -149,29 +457,50 @@ def _execute_critic_node(state: PipelineState) -> PipelineState:
     Es kann auch ein String sein. Wir behandeln beide Fälle. Critic-Text wird von Routing genutzt. Entscheidet dann,
     ob zurückgeloopt oder vorwärts läuft.
     """
-    _append_trace(state, "critic")
     start_time = perf_counter()
-    timeout_seconds = state.get("_timeout", 45)
-    critic_result = _execute_with_timeout(
-        lambda: run_critic(notes=state["notes"], summary=state["summary"]),
-        timeout_seconds
-    )
-    
+    usage_before = _stage_usage("critic")
+    if not _local_critic(state):
+        _append_trace(state, "critic")
+        timeout_seconds = state.get("_timeout", 45)
+        evidence = critic_evidence(state.get("_config"), state.get("analysis_context", ""), state["summary"])
+        critic_result = _execute_with_timeout(
+            lambda: run_critic(notes=state["notes"], summary=state["summary"], evidence=evidence),
+            timeout_seconds
+        )
+        _record_timeout(state, "critic", critic_result)
+        state["critic"] = _critic_text(critic_result)
+    _finish_critic_round(state, start_time, usage_before)
+    return state
+
+
+def _critic_text(critic_result: Any) -> str:
     # Critic gibt Dictionary oder String zurück daher beide behandeln
     if isinstance(critic_result, dict):
-        critic_text = critic_result.get("critic") or critic_result.get("critique") or ""
-    else:
-        critic_text = str(critic_result)
-    
-    state["critic"] = critic_text
-    state["critic_s"] = round(perf_counter() - start_time, 2)
-    return state
+        return critic_result.get("critic") or critic_result.get("critique") or ""
+    return str(critic_result)
+
+
+# "Accuracy: 2" usw. aus dem Critic-Format
+_CRITIC_SCORE_PATTERN = re.compile(
+    r"^\W*(makes sense|accuracy|coverage|details)\W*:\s*([0-9]+(?:\.[0-9]+)?)", re.IGNORECASE | re.MULTILINE
+)
 
 
 def _extract_critic_score(state: PipelineState) -> float:
+    """
+    Critic-Bewertung 0-1.
+
+    Mittel der vier Kriterien, wenn sie im Text stehen. Früher zählte nur
+    die erste Zahl, also "Makes sense". Eine Zusammenfassung mit erfundenen
+    Zahlen (Accuracy 1) lief dann trotzdem durch.
+    """
     text = state.get("critic", "") or ""
+    labelled = {label.lower(): float(value) for label, value in _CRITIC_SCORE_PATTERN.findall(text)}
     match = re.search(r"([0-9]+(?:\.[0-9]+)?)", text)
-    if match:
+    if labelled:
+        # Kriterien sind immer 0-5, auch wenn alle bei 1 liegen
+        score = sum(labelled.values()) / len(labelled) / 5.0
+    elif match:
         score = float(match.group(1))
     else:
         score = 0.5
@@ -182,11 +511,11 @@ def _extract_critic_score(state: PipelineState) -> float:
     return state["critic_score"]
 
 
-def _critic_post_path(state: PipelineState) -> str:
+def _decide_route(state: PipelineState) -> str:
     """
-    Routet basierend auf Critic-Bewertung.
+    Entscheidet nach Critic-Runde, wohin es weitergeht.
     
-    Liegt Bewertung unter 0.5, geht es zurück zum Summarizer. System
+    Liegt Bewertung unter 0.5, geht es zurück zur Überarbeitung. System
     kann schlechte Zusammenfassungen automatisch korrigieren. Begrenzen
     Schleifen, um Endlosschleifen zu vermeiden. Zuerst versuchten wir feste
     3 Retries. Konfigurierbare max_loops passt besser für verschiedene
@@ -197,22 +526,141 @@ def _critic_post_path(state: PipelineState) -> str:
     vielleicht behebbare Probleme. Höher bedeutet mehr Schleifen und höhere
     Kosten. 0.5 schien wie gute Balance. Ggf auch konfigurierbar
     machen
+
+    Läuft in der Critic-Node, nicht im Router. Änderungen am State im
+    Router übernimmt LangGraph nicht. critic_loops blieb dort immer 0,
+    bei dauerhaft schlechter Bewertung lief Graph bis zum Recursion-Limit.
     """
-    _extract_critic_score(state)
     loops = state.get("critic_loops", 0)
     cfg = state.get("_config", {}) or {}
     max_loops = max(0, int(cfg.get("max_critic_loops", 2)))
+    if _candidate_count(cfg) > 1:
+        # Best-of-N hat Auswahl schon getroffen, Critic liefert nur Hinweise für Integrator
+        max_loops = 0
     
-    # Niedrige Bewertung und noch nicht zu oft geloopt? Summarizer bekommt noch eine Chance. 
+    # Niedrige Bewertung und noch nicht zu oft geloopt? Zusammenfassung bekommt noch eine Chance. 
     # Das ist Hauptunterschied zu LangChain wir können schlechte Ausgaben tatsächlich korrigieren.
     if state["critic_score"] < 0.5 and loops < max_loops:
         state["critic_loops"] = loops + 1
-        _append_route(state, "summarizer")
-        return "summarizer"
-    
-    # Gut genug oder genug Versuche. Weiter zum Integrator.
-    _append_route(state, "integrator")
-    return "integrator"
+        # "full" schreibt wie früher komplett neu, Standard ist gezielte Überarbeitung
+        route = "summarizer" if cfg.get("revision_mode") == "full" else "reviser"
+    else:
+        # Gut genug oder genug Versuche. Weiter zum Integrator.
+        route = "integrator"
+    _append_route(state, route)
+    state["next_route"] = route
+    return route
+
+
+def _critic_post_path(state: PipelineState) -> str:
+    """Router nach Critic. Liest nur, Entscheidung fiel in _decide_route."""
+    return state.get("next_route") or "integrator"
+
+
+def _stage_usage(stage: str) -> Optional[Dict[str, Any]]:
+    stats = active_usage()
+    return stats.stage_totals(stage) if stats is not None else None
+
+
+def _usage_delta(stage: str, before: Optional[Dict[str, Any]], prefix: str) -> Dict[str, int]:
+    """Tokens einer Stage seit before, für Werte pro Schleife."""
+    stats = active_usage()
+    if stats is None or before is None:
+        return {f"{prefix}_prompt_tokens": 0, f"{prefix}_completion_tokens": 0}
+    after = stats.stage_totals(stage)
+    return {
+        f"{prefix}_prompt_tokens": after["prompt_tokens"] - before["prompt_tokens"],
+        f"{prefix}_completion_tokens": after["completion_tokens"] - before["completion_tokens"],
+    }
+
+
+def _update_loop(state: PipelineState, fields: Dict[str, Any]) -> None:
+    """
+    Eintrag in loop_stats für aktuelle Runde ergänzen.
+
+    Runde 0 ist erster Critic-Lauf, Runde n die n-te Überarbeitung plus
+    Critic danach. Überarbeitung legt Eintrag an, Critic ergänzt ihn.
+    """
+    loop_stats = list(state.get("loop_stats") or [])
+    loop = state.get("critic_loops", 0)
+    if loop_stats and loop_stats[-1].get("loop") == loop:
+        loop_stats[-1] = {**loop_stats[-1], **fields}
+    else:
+        loop_stats.append({"loop": loop, **fields})
+    state["loop_stats"] = loop_stats
+
+
+def _finish_critic_round(state: PipelineState, start_time: float, usage_before: Optional[Dict[str, Any]]) -> None:
+    elapsed = perf_counter() - start_time
+    # Summe über alle Runden, sonst fehlt Zeit früherer Critic-Läufe in Breakdown
+    state["critic_s"] = round(state.get("critic_s", 0.0) + elapsed, 2)
+    score = _extract_critic_score(state)
+    _update_loop(state, {
+        "critic_s": round(elapsed, 2),
+        **_usage_delta("critic", usage_before, "critic"),
+        "critic_score": score,
+    })
+    _decide_route(state)
+
+
+def _record_revision(
+    state: PipelineState,
+    kind: str,
+    stage: str,
+    start_time: float,
+    usage_before: Optional[Dict[str, Any]],
+    changed_fields: Optional[list],
+) -> None:
+    elapsed = perf_counter() - start_time
+    _update_loop(state, {
+        "revision": kind,
+        "revise_s": round(elapsed, 2),
+        **_usage_delta(stage, usage_before, "revise"),
+        "changed_fields": changed_fields,
+    })
+
+
+def _revision_max_tokens(state: PipelineState) -> int:
+    cfg = state.get("_config", {}) or {}
+    return int(cfg.get("revision_max_tokens") or DEFAULT_REVISION_MAX_TOKENS)
+
+
+def _apply_revision_output(
+    state: PipelineState,
+    output: Any,
+    start_time: float,
+    usage_before: Optional[Dict[str, Any]],
+) -> None:
+    # Timeout: vorige Zusammenfassung behalten, Critic bewertet sie erneut
+    changed: list = []
+    if output != TIMEOUT_SENTINEL:
+        state["summary"], changed = output
+    state["reviser_s"] = round(state.get("reviser_s", 0.0) + perf_counter() - start_time, 2)
+    _record_revision(state, "patch", "reviser", start_time, usage_before, changed)
+
+
+def _execute_reviser_node(state: PipelineState) -> PipelineState:
+    """
+    Überarbeitet Zusammenfassung nach schlechter Critic-Bewertung.
+
+    Früher lief der Summarizer mit exakt gleicher Eingabe erneut und kam oft
+    zu ähnlich schwacher Zusammenfassung. Reviser bekommt vorige Fassung und
+    Improvements vom Critic und liefert nur geänderte Felder, mit kleinem
+    max_tokens (revision_max_tokens). Schleifen werden billiger und
+    konvergieren schneller.
+    """
+    _append_trace(state, "reviser")
+    start_time = perf_counter()
+    usage_before = _stage_usage("reviser")
+    review = critic_improvements(state["critic"])
+    max_tokens = _revision_max_tokens(state)
+    output = _execute_with_timeout(
+        lambda: revise(state["notes"], state["summary"], review, max_tokens),
+        state.get("_timeout", 45),
+    )
+    _record_timeout(state, "reviser", output)
+    _apply_revision_output(state, output, start_time, usage_before)
+    return state
 
 
 def _execute_integrator_node(state: PipelineState) -> PipelineState:
@@ -224,6 +672,91 @@ def _execute_integrator_node(state: PipelineState) -> PipelineState:
         lambda: run_integrator(notes=state["notes"], summary=state["summary"], critic=state["critic"]),
         timeout_seconds
     )
+    _record_timeout(state, "integrator", meta_output)
+    state["meta"] = meta_output
+    state["integrator_s"] = round(perf_counter() - start_time, 2)
+    return state
+
+
+# Async-Nodes für ainvoke. Gleiches Muster wie oben, nur mit await.
+# Retriever ist reine CPU-Arbeit und bleibt synchron.
+
+async def _aexecute_reader_node(state: PipelineState) -> PipelineState:
+    shared_notes = _reuse_shared(state, "reader", "notes")
+    if shared_notes is not None:
+        state["notes"] = shared_notes
+        state["reader_s"] = 0.0
+        _drop_reader_inputs(state)
+        return state
+    _append_trace(state, "reader")
+    start_time = perf_counter()
+    input_for_reader = state.get("analysis_context") or state.get("input_text") or ""
+    config = state.get("_config", {}) or {}
+    notes_output = await _aexecute_with_timeout(
+        arun_reader_with_config(input_for_reader, config), state.get("_timeout", 45)
+    )
+    _record_timeout(state, "reader", notes_output)
+    state["notes"] = notes_output
+    state["reader_s"] = round(perf_counter() - start_time, 2)
+    _drop_reader_inputs(state)
+    return state
+
+
+async def _aexecute_summarizer_node(state: PipelineState) -> PipelineState:
+    shared_summary = _reuse_shared(state, "summarizer", "summary")
+    if shared_summary is not None:
+        state["summary"] = shared_summary
+        state["summarizer_s"] = 0.0
+        return state
+    _append_trace(state, "summarizer")
+    start_time = perf_counter()
+    usage_before = _stage_usage("summarizer")
+    summary_output = await _aexecute_with_timeout(arun_summarizer(state["notes"]), state.get("_timeout", 45))
+    _record_timeout(state, "summarizer", summary_output)
+    state["summary"] = summary_output
+    state["summarizer_s"] = round(perf_counter() - start_time, 2)
+    if state.get("critic_loops", 0):
+        _record_revision(state, "full", "summarizer", start_time, usage_before, None)
+    return state
+
+
+async def _aexecute_critic_node(state: PipelineState) -> PipelineState:
+    start_time = perf_counter()
+    usage_before = _stage_usage("critic")
+    if not _local_critic(state):
+        _append_trace(state, "critic")
+        evidence = critic_evidence(state.get("_config"), state.get("analysis_context", ""), state["summary"])
+        critic_result = await _aexecute_with_timeout(
+            arun_critic(notes=state["notes"], summary=state["summary"], evidence=evidence), state.get("_timeout", 45)
+        )
+        _record_timeout(state, "critic", critic_result)
+        state["critic"] = _critic_text(critic_result)
+    _finish_critic_round(state, start_time, usage_before)
+    return state
+
+
+async def _aexecute_reviser_node(state: PipelineState) -> PipelineState:
+    _append_trace(state, "reviser")
+    start_time = perf_counter()
+    usage_before = _stage_usage("reviser")
+    review = critic_improvements(state["critic"])
+    output = await _aexecute_with_timeout(
+        arevise(state["notes"], state["summary"], review, _revision_max_tokens(state)),
+        state.get("_timeout", 45),
+    )
+    _record_timeout(state, "reviser", output)
+    _apply_revision_output(state, output, start_time, usage_before)
+    return state
+
+
+async def _aexecute_integrator_node(state: PipelineState) -> PipelineState:
+    _append_trace(state, "integrator")
+    start_time = perf_counter()
+    meta_output = await _aexecute_with_timeout(
+        arun_integrator(notes=state["notes"], summary=state["summary"], critic=state["critic"]),
+        state.get("_timeout", 45),
+    )
+    _record_timeout(state, "integrator", meta_output)
     state["meta"] = meta_output
     state["integrator_s"] = round(perf_counter() - start_time, 2)
     return state
@@ -250,11 +783,13 @@ digraph G {
   reader     [label="Reader - Notes"];
   summarizer [label="Summarizer"];
   critic_node [label="Critic - Review"];
+  reviser    [label="Reviser - Targeted Edit"];
   integrator [label="Integrator - Meta Summary"];
   output     [label="Output (notes, summary, critic, meta)"];
 
   input -> retriever -> reader -> summarizer -> critic_node;
-  critic_node -> summarizer [label="rework (low critic)", style="dotted"];
+  critic_node -> reviser [label="rework (low critic)", style="dotted"];
+  reviser -> critic_node [style="dotted"];
   critic_node -> integrator [label="ok"];
   integrator -> output;
 }
@@ -264,12 +799,16 @@ digraph G {
     summarizer_time = state.get("summarizer_s", 0.0)
     critic_time = state.get("critic_s", 0.0)
     integrator_time = state.get("integrator_s", 0.0)
+    reviser_time = state.get("reviser_s", 0.0)
     critic_score = state.get("critic_score", 0.0)
     loops = state.get("critic_loops", 0)
+    # revision_mode "full" routet wie früher zurück zum Summarizer
+    rework_target = "summarizer" if (state.get("_config") or {}).get("revision_mode") == "full" else "reviser"
 
     reader_label = f"Reader - Notes\\n{reader_time:.2f}s"
     summarizer_label = f"Summarizer - Summary\\n{summarizer_time:.2f}s"
     critic_label = f"Critic - Review\\nScore: {critic_score:.2f}\\n{critic_time:.2f}s"
+    reviser_label = f"Reviser - Targeted Edit\\n{reviser_time:.2f}s"
     integrator_label = f"Integrator - Meta Summary\\n{integrator_time:.2f}s"
 
     return f"""
@@ -283,23 +822,26 @@ digraph G {{
   reader     [label="{reader_label}", fillcolor="#dbeafe"];
   summarizer [label="{summarizer_label}", fillcolor="#dbeafe"];
   critic_node [label="{critic_label}", fillcolor="#dbeafe"];
+  reviser    [label="{reviser_label}", fillcolor="#dbeafe"];
   integrator [label="{integrator_label}", fillcolor="#dbeafe"];
   output     [label="Output\\n(all results)", fillcolor="#e0e7ff", color="#667eea"];
 
   input -> retriever -> reader -> summarizer -> critic_node;
-  critic_node -> summarizer [label="rework (score < 0.5, loops: {loops})", style="dotted"];
+  critic_node -> {rework_target} [label="rework (score < 0.5, loops: {loops})", style="dotted"];
+  reviser -> critic_node [style="dotted"];
   critic_node -> integrator [label="ok (score >= 0.5)"];
   integrator -> output;
 }}
 """.strip()
 
 
-def _build_langgraph_workflow() -> Any:
+def _build_langgraph_workflow(async_nodes: bool = False, fan_out: bool = False) -> Any:
     """
     LangGraph Workflow.
     
     Ablauf: retriever -> reader -> summarizer -> critic -> (conditional) -> integrator
-    Conditional Node erlaubt Sprung zum Summarizer bei niedriger Qualität.
+    Conditional Node erlaubt Sprung zum Reviser (oder Summarizer, revision_mode
+    "full") bei niedriger Qualität. Reviser geht zurück zum Critic.
     Das ist Hauptunterschied zu LangChain: expliziter State und bedingtes
     Routing. Wir dachten über parallele Zweige nach, z.B. Translator oder
     Keyword-Nodes. Aber reichen für Anforderungen.
@@ -307,47 +849,261 @@ def _build_langgraph_workflow() -> Any:
     Graph-Struktur ist recht einfach. Linearer Ablauf mit einer Bedingung.
     Wir dachten über weitere Nodes nach. Würde auch Vergleich mit LangChain
     erschweren. Cnditional Routing ist Hauptfunktion, die wir zeigen wollen.
+
+    fan_out=True: Summarizer-Node erzeugt N Kandidaten parallel und wählt
+    lokal, Critic routet dann immer zum Integrator.
     """
     graph = StateGraph(PipelineState)
-    # Alle Nodes: jede ist eine Funktion, die State nimmt und aktualisierten State zurückgibt
-    graph.add_node("retriever", _execute_retriever_node)
-    graph.add_node("reader", _execute_reader_node)
-    graph.add_node("summarizer", _execute_summarizer_node)
-    graph.add_node("critic_node", _execute_critic_node)
-    graph.add_node("integrator", _execute_integrator_node)
+    # Alle Nodes: jede ist eine Funktion, die State nimmt und aktualisierten State zurückgibt.
+    # async_nodes=True für ainvoke: gleiche Topologie, Agents über ainvoke.
+    # _partial_node: an LangGraph gehen nur geänderte Schlüssel
+    graph.add_node("retriever", _partial_node(_execute_retriever_node))
+    graph.add_node("reader", _partial_node(_aexecute_reader_node if async_nodes else _execute_reader_node))
+    if fan_out:
+        graph.add_node("summarizer", _partial_node(_aexecute_candidates_node if async_nodes else _execute_candidates_node))
+    else:
+        graph.add_node("summarizer", _partial_node(_aexecute_summarizer_node if async_nodes else _execute_summarizer_node))
+    graph.add_node("critic_node", _partial_node(_aexecute_critic_node if async_nodes else _execute_critic_node))
+    graph.add_node("reviser", _partial_node(_aexecute_reviser_node if async_nodes else _execute_reviser_node))
+    graph.add_node("integrator", _partial_node(_aexecute_integrator_node if async_nodes else _execute_integrator_node))
     
     # lineare Kanten, dann eine Bedingung
     graph.set_entry_point("retriever")
     graph.add_edge("retriever", "reader")
     graph.add_edge("reader", "summarizer")
     graph.add_edge("summarizer", "critic_node")
+    graph.add_edge("reviser", "critic_node")
     # Das ist interessanter Teil: Critic kann zurück zum Summarizer oder zum Integrator routen
     graph.add_conditional_edges("critic_node", _critic_post_path)
     graph.add_edge("integrator", END)
     return graph.compile()
 
 
-def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+# Kompilierte Graphen pro Variante. Topologie hängt nur von sync/async und
+# Best-of-N ab. Schleifenlimits, Timeouts usw. stehen im State (_config).
+GraphVariant = Tuple[bool, bool]
+_compiled_workflows: Dict[GraphVariant, Any] = {}
+_compiled_workflows_lock = threading.Lock()
+
+
+def _graph_variant(config_dict: Dict[str, Any], async_nodes: bool = False) -> GraphVariant:
+    return (async_nodes, _candidate_count(config_dict) > 1)
+
+
+def _get_workflow(variant: GraphVariant) -> Any:
     """
-    Führt LangGraph Pipeline aus.
-    
-    Workflow-Graph wird gebaut, richten initialen State ein und rufen ihn auf. LangGraph übernimmt die Ausführung: führt Nodes in Reihenfolge aus, folgt conditional Nodes und verwaltet
-    State. Wir müssen nur initialen State bereitstellen, Rest passiert automatisch.
-    
-     _timeout und _config im State sind "privat", gehören nicht
-    zu eigentlichen Daten von Pipeline. Sie dienen nur der Konfiguration.
+    Kompilierter Graph aus Cache, beim ersten Aufruf gebaut.
+
+    Früher bei jedem Lauf neu gebaut und kompiliert, obwohl sich Topologie
+    nie ändert. Kompilierter Graph hält keinen Laufzustand, parallele Läufe
+    (Batch, Compare-Tab) können ihn teilen.
     """
-    config_dict = config or {}
-    configure(config_dict)
-    timeout_seconds = int(config_dict.get("timeout", 45))
-    start_total = perf_counter()
-    
-    workflow = _build_langgraph_workflow()
+    with _compiled_workflows_lock:
+        workflow = _compiled_workflows.get(variant)
+        if workflow is None:
+            async_nodes, fan_out = variant
+            workflow = _build_langgraph_workflow(async_nodes=async_nodes, fan_out=fan_out)
+            _compiled_workflows[variant] = workflow
+        return workflow
+
+
+# Checkpoints. Standarddatei, falls config["langgraph_checkpoint"] nur True/"sqlite" ist.
+CHECKPOINT_DB = os.getenv("LANGGRAPH_CHECKPOINT_DB", os.path.join("local_cache", "langgraph_checkpoints.sqlite"))
+# Ändern Ergebnis nicht, gehören daher nicht in thread_id. Wiederholung mit
+# längerem Timeout soll weiter fortsetzen können.
+_CHECKPOINT_IGNORED_KEYS = {"api_key", "csv_telemetry", "debug", "langgraph_checkpoint", "timeout"}
+CHECKPOINT_LABEL = " (checkpoint)"
+
+_memory_saver = MemorySaver()
+_sqlite_savers: Dict[str, Any] = {}
+_sqlite_savers_lock = threading.Lock()
+
+
+def checkpoint_backend(config: Optional[Dict[str, Any]]) -> str:
+    """
+    "off", "memory" oder Pfad der SQLite-Datei, aus config["langgraph_checkpoint"].
+
+    True oder "sqlite" nimmt CHECKPOINT_DB, jeder andere String ist Pfad.
+    Ohne langgraph-checkpoint-sqlite wird daraus "memory": Wiederholung im
+    selben Prozess klappt dann, Neustart beginnt von vorn.
+    """
+    setting = str((config or {}).get("langgraph_checkpoint") or "").strip()
+    if setting.lower() in {"", "0", "false", "no", "off"}:
+        return "off"
+    if setting.lower() == "memory" or SqliteSaver is None:
+        return "memory"
+    if setting.lower() in {"1", "true", "yes", "on", "sqlite"}:
+        return CHECKPOINT_DB
+    return setting
+
+
+def _ensure_parent(path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+
+def _checkpointer(backend: str) -> Any:
+    """Sync-Checkpointer, eine SQLite-Verbindung pro Datei für alle Läufe."""
+    if backend == "memory":
+        return _memory_saver
+    with _sqlite_savers_lock:
+        saver = _sqlite_savers.get(backend)
+        if saver is None:
+            _ensure_parent(backend)
+            saver = SqliteSaver(sqlite3.connect(backend, check_same_thread=False))
+            _sqlite_savers[backend] = saver
+        return saver
+
+
+@asynccontextmanager
+async def _acheckpointer(backend: str) -> AsyncIterator[Any]:
+    """Async-Checkpointer. aiosqlite-Verbindung hängt am Event-Loop, daher pro Lauf."""
+    if backend == "memory":
+        yield _memory_saver
+        return
+    _ensure_parent(backend)
+    async with AsyncSqliteSaver.from_conn_string(backend) as saver:
+        yield saver
+
+
+# Ältere langgraph-checkpoint-sqlite (2.0.x) haben kein delete_thread
+_DELETE_THREAD_SQL = ("DELETE FROM checkpoints WHERE thread_id = ?", "DELETE FROM writes WHERE thread_id = ?")
+
+
+def _delete_thread(saver: Any, thread_id: str) -> None:
+    try:
+        saver.delete_thread(thread_id)
+    except NotImplementedError:
+        with saver.cursor() as cur:
+            for statement in _DELETE_THREAD_SQL:
+                cur.execute(statement, (thread_id,))
+
+
+async def _adelete_thread(saver: Any, thread_id: str) -> None:
+    try:
+        await saver.adelete_thread(thread_id)
+    except NotImplementedError:
+        async with saver.lock:
+            for statement in _DELETE_THREAD_SQL:
+                await saver.conn.execute(statement, (thread_id,))
+            await saver.conn.commit()
+
+
+def _checkpoint_config(input_text: str, config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    LangGraph-Config mit thread_id aus Dokument-Hash und Config-Hash.
+
+    Gleiches Paper mit gleicher Config landet im gleichen Thread, Wiederholung
+    findet also Checkpoints des abgebrochenen Laufs.
+    """
+    relevant = {k: v for k, v in config_dict.items() if k not in _CHECKPOINT_IGNORED_KEYS}
+    payload = json.dumps(relevant, sort_keys=True, default=str)
+    config_hash = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+    return {"configurable": {"thread_id": f"{doc_hash(input_text)}:{config_hash}"}}
+
+
+def _state_config(config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # API-Key nicht in State (und Checkpoint-Datei), Nodes brauchen ihn nicht
+    return {k: v for k, v in config_dict.items() if k != "api_key"}
+
+
+def _last_completed_node(snapshot: Any) -> Optional[str]:
+    """
+    Letzte gespeicherte Node eines abgebrochenen Laufs, sonst None.
+
+    Abgebrochen heißt: Graph hat noch nächste Node (snapshot.next). Fertige
+    Läufe und Abbruch schon im ersten Schritt starten neu.
+    """
+    if not snapshot or not snapshot.next:
+        return None
+    writes = (snapshot.metadata or {}).get("writes") or {}
+    nodes = [node for node in writes if not node.startswith("__")]
+    return nodes[-1] if nodes else None
+
+
+def _resume_update(config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # Aktuelle Timeouts/Config übernehmen, z.B. längerer Timeout beim zweiten Versuch
+    return {"_timeout": int(config_dict.get("timeout", 45)), "_config": _state_config(config_dict)}
+
+
+def _mark_restored(final_state: Dict[str, Any], restored: List[str], backend: str) -> Dict[str, Any]:
+    """
+    Schritte aus dem Checkpoint in Trace kennzeichnen.
+
+    execution_trace wird nur angehängt, die ersten len(restored) Einträge
+    stammen also aus dem abgebrochenen Lauf und liefen diesmal nicht.
+    """
+    trace = list(final_state.get("execution_trace") or [])
+    count = len(restored)
+    final_state["execution_trace"] = [f"{label}{CHECKPOINT_LABEL}" for label in trace[:count]] + trace[count:]
+    final_state["checkpoint_stages"] = list(dict.fromkeys(restored))
+    final_state["checkpoint_backend"] = backend
+    return final_state
+
+
+def _invoke(workflow: Any, input_text: str, config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Graph ausführen, mit Checkpoints falls konfiguriert.
+
+    Kompilierter Graph aus Cache bleibt ohne Checkpointer, pro Lauf eine
+    Kopie mit Checkpointer (copy ist billig, kein erneutes Kompilieren).
+    Gibt es im Thread einen abgebrochenen Lauf, geht es nach dessen letzter
+    fertiger Node weiter. Nach Erfolg wird Thread gelöscht, Datei wächst nicht.
+    """
+    backend = checkpoint_backend(config_dict)
+    if backend == "off":
+        return workflow.invoke(_initial_state(input_text, config_dict))
+    saver = _checkpointer(backend)
+    workflow = workflow.copy(update={"checkpointer": saver})
+    run_config = _checkpoint_config(input_text, config_dict)
+    snapshot = workflow.get_state(run_config)
+    last_node = _last_completed_node(snapshot)
+    if last_node:
+        restored = list(snapshot.values.get("execution_trace") or [])
+        workflow.update_state(run_config, _resume_update(config_dict), as_node=last_node)
+        final_state = workflow.invoke(None, run_config)
+    else:
+        restored = []
+        final_state = workflow.invoke(_initial_state(input_text, config_dict), run_config)
+    _delete_thread(saver, run_config["configurable"]["thread_id"])
+    return _mark_restored(final_state, restored, backend)
+
+
+async def _ainvoke(workflow: Any, input_text: str, config_dict: Dict[str, Any]) -> Dict[str, Any]:
+    """Async-Gegenstück zu _invoke."""
+    backend = checkpoint_backend(config_dict)
+    if backend == "off":
+        return await workflow.ainvoke(_initial_state(input_text, config_dict))
+    async with _acheckpointer(backend) as saver:
+        workflow = workflow.copy(update={"checkpointer": saver})
+        run_config = _checkpoint_config(input_text, config_dict)
+        snapshot = await workflow.aget_state(run_config)
+        last_node = _last_completed_node(snapshot)
+        if last_node:
+            restored = list(snapshot.values.get("execution_trace") or [])
+            await workflow.aupdate_state(run_config, _resume_update(config_dict), as_node=last_node)
+            final_state = await workflow.ainvoke(None, run_config)
+        else:
+            restored = []
+            final_state = await workflow.ainvoke(_initial_state(input_text, config_dict), run_config)
+        await _adelete_thread(saver, run_config["configurable"]["thread_id"])
+    return _mark_restored(final_state, restored, backend)
+
+
+def _checkpoint_row(final_state: Dict[str, Any]) -> Dict[str, Any]:
+    """Telemetrie-Spalten. Immer gesetzt, damit CSV-Header stabil bleibt."""
+    stages = final_state.get("checkpoint_stages") or []
+    return {"checkpoint_resumed": int(bool(stages)), "checkpoint_stages": ",".join(stages)}
+
+
+def _initial_state(input_text: str, config_dict: Dict[str, Any]) -> Dict[str, Any]:
     # State initialisieren alle Felder starten leer/null. Nodes füllen sie
     # während der Ausführung. _timeout und _config sind Metadaten, keine Daten.
-    initial_state = {
+    return {
         "input_text": input_text or "",
         "analysis_context": "",
+        "input_chars": 0,
+        "doc_id": "",
         "notes": "",
         "summary": "",
         "critic": "",
@@ -356,20 +1112,100 @@ def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Di
         "summarizer_s": 0.0,
         "critic_s": 0.0,
         "integrator_s": 0.0,
+        "reviser_s": 0.0,
         "critic_score": 0.0,
         "critic_loops": 0,
+        "next_route": "",
+        "loop_stats": [],
+        "summary_candidates": [],
         "execution_trace": [],
         "routing_trace": [],
         "confidence": "",
-        "_timeout": timeout_seconds,
-        "_config": config_dict,
+        "stage_timeouts": {},
+        "reused_stages": [],
+        "verifier_runs": 0,
+        "verifier_failures": 0,
+        "critic_llm_skipped": 0,
+        "_timeout": int(config_dict.get("timeout", 45)),
+        "_config": _state_config(config_dict),
     }
+
+
+def run_pipeline(
+    input_text: str,
+    config: Optional[Dict[str, Any]] = None,
+    on_partial: Optional[OnPartial] = None,
+) -> Dict[str, Any]:
+    """
+    Führt LangGraph Pipeline aus.
+    
+    Kompilierten Graph holen, initialen State einrichten und aufrufen. LangGraph übernimmt die Ausführung: führt Nodes in Reihenfolge aus, folgt conditional Nodes und verwaltet
+    State. Wir müssen nur initialen State bereitstellen, Rest passiert automatisch.
+    
+     _timeout und _config im State sind "privat", gehören nicht
+    zu eigentlichen Daten von Pipeline. Sie dienen nur der Konfiguration.
+
+    config["langgraph_checkpoint"] speichert State nach jeder Node. Bricht
+    Lauf ab (Fehler, Stage-Timeout), setzt gleicher Aufruf mit gleichem
+    Paper nach letzter fertiger Node fort. Siehe _invoke.
+
+    on_partial(Feld, Text, fertig) bekommt Teilausgaben während des Laufs,
+    siehe streaming.
+    """
+    config_dict = config or {}
+    configure(config_dict)
+    start_total = perf_counter()
+    
+    workflow = _get_workflow(_graph_variant(config_dict))
     
     # LangGraph führt Graph aus
     # Folgt Kanten, führt Nodes aus, behandelt Bedingungen, verwaltet Schleifen
-    final_state = workflow.invoke(initial_state)
+    with listen(on_partial), track(config_dict) as cache_stats, track_usage(config_dict) as usage_stats:
+        final_state = _invoke(workflow, input_text, config_dict)
+    total_duration = round(perf_counter() - start_total, 2)
+    return _finish_run(final_state, input_text, config_dict, total_duration, cache_stats, usage_stats)
+
+
+async def run_pipeline_async(
+    input_text: str,
+    config: Optional[Dict[str, Any]] = None,
+    on_partial: Optional[OnPartial] = None,
+) -> Dict[str, Any]:
+    """
+    Async-Variante über LangGraph ainvoke.
+
+    Gleicher Graph mit async Nodes. Timeouts brechen hier den Request
+    wirklich ab (asyncio.wait_for), statt Worker-Thread aufzugeben.
+    """
+    config_dict = config or {}
+    configure(config_dict)
+    start_total = perf_counter()
+    
+    workflow = _get_workflow(_graph_variant(config_dict, async_nodes=True))
+    with listen(on_partial), track(config_dict) as cache_stats, track_usage(config_dict) as usage_stats:
+        final_state = await _ainvoke(workflow, input_text, config_dict)
     total_duration = round(perf_counter() - start_total, 2)
-    input_chars = len(final_state.get("analysis_context") or input_text or "")
+    return _finish_run(final_state, input_text, config_dict, total_duration, cache_stats, usage_stats)
+
+
+def _verifier_row(final_state: Dict[str, Any]) -> Dict[str, int]:
+    return verifier_row(
+        final_state.get("verifier_runs", 0),
+        final_state.get("verifier_failures", 0),
+        final_state.get("critic_llm_skipped", 0),
+    )
+
+
+def _finish_run(
+    final_state: Dict[str, Any],
+    input_text: str,
+    config_dict: Dict[str, Any],
+    total_duration: float,
+    cache_stats: CacheStats,
+    usage_stats: UsageStats,
+) -> Dict[str, Any]:
+    """Telemetrie schreiben und Ergebnis bauen. Gemeinsam für sync und async."""
+    input_chars = final_state.get("input_chars") or len(input_text or "")
     confidence_line = extract_confidence_line(final_state.get("meta", "") or "") or ""
     final_state["confidence"] = confidence_line or final_state.get("confidence", "")
     metrics_count = count_numeric_results(final_state.get("notes", ""))
@@ -391,8 +1227,18 @@ def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Di
             "integrator_s": final_state.get("integrator_s", 0.0),
             "critic_score": final_state.get("critic_score", 0.0),
             "critic_loops": final_state.get("critic_loops", 0),
+            "reviser_s": final_state.get("reviser_s", 0.0),
+            # JSON-Liste, eine Zeile pro Lauf bleibt erhalten
+            "loop_stats": json.dumps(final_state.get("loop_stats", []) or []),
+            "summary_candidates": json.dumps(final_state.get("summary_candidates", []) or []),
             "extracted_metrics_count": metrics_count,
             "confidence": final_state.get("confidence", ""),
+            **cache_stats.as_row(),
+            **usage_stats.as_row(),
+            **_timeout_row(final_state),
+            **reused_row(final_state.get("reused_stages", []) or []),
+            **_verifier_row(final_state),
+            **_checkpoint_row(final_state),
         })
     
     return {
@@ -406,10 +1252,19 @@ def run_pipeline(input_text: str, config: Optional[Dict[str, Any]] = None) -> Di
         "integrator_s": final_state.get("integrator_s", 0.0),
         "critic_score": final_state.get("critic_score", 0.0),
         "critic_loops": final_state.get("critic_loops", 0),
+        "reviser_s": final_state.get("reviser_s", 0.0),
+        "loop_stats": final_state.get("loop_stats", []) or [],
+        "summary_candidates": final_state.get("summary_candidates", []) or [],
         "latency_s": total_duration,
         "input_chars": input_chars,
         "graph_dot": _generate_graph_visualization_dot(final_state),
         "execution_trace": final_state.get("execution_trace", []) or [],
         "routing_trace": final_state.get("routing_trace", []) or [],
         "confidence": final_state.get("confidence", "") or confidence_line or "",
+        **cache_stats.as_row(),
+        **usage_stats.as_row(),
+        **_timeout_row(final_state),
+        **reused_row(final_state.get("reused_stages", []) or []),
+        **_verifier_row(final_state),
+        **_checkpoint_row(final_state),
     }
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from agents.reader import run_with_config as run_reader_with_config
+from agents.summarizer import run as run_summarizer
+from llm import configure
+from llm_cache import track
+from usage import track as track_usage
+
+# Geteilte Stages für Vergleichsläufe. LangChain und LangGraph rufen denselben
+# Reader mit demselben Prompt auf denselben Kontext auf. In Compare-Tab und
+# eval_runner muss das nur einmal bezahlt werden. Ergebnisse kommen über
+# config["shared_stages"] in die Pipelines, Telemetrie markiert sie als reused.
+
+SHAREABLE_STAGES = ("notes", "summary")
+
+# Schlüssel im Pipeline-Ergebnis
+_RESULT_KEYS = {"notes": "structured", "summary": "summary"}
+
+
+def _usable(value: Any) -> bool:
+    # Timeouts und leere Ausgaben nicht weiterreichen, sonst erbt jede Engine den Fehler
+    return isinstance(value, str) and bool(value.strip()) and value != "__TIMEOUT__"
+
+
+def shared_output(config: Optional[Dict[str, Any]], stage: str) -> Optional[str]:
+    """Geteilte Ausgabe für stage ("notes" / "summary") oder None."""
+    shared = (config or {}).get("shared_stages") or {}
+    value = shared.get(stage)
+    return value if _usable(value) else None
+
+
+def with_shared_stages(
+    config: Dict[str, Any],
+    result: Dict[str, Any],
+    stages: Iterable[str] = ("notes",),
+) -> Dict[str, Any]:
+    """
+    Neue Config mit Ausgaben aus result als geteilte Stages.
+
+    result ist ein normales Pipeline-Ergebnis (Keys "structured", "summary")
+    oder Ausgabe von compute_shared_stages. Summary ohne Notes wird nicht
+    geteilt, sonst passen Critic-Eingaben nicht mehr zusammen.
+    """
+    shared: Dict[str, str] = {}
+    for stage in stages:
+        if stage not in SHAREABLE_STAGES:
+            continue
+        value = result.get(stage, result.get(_RESULT_KEYS[stage]))
+        if _usable(value):
+            shared[stage] = value
+    if "notes" not in shared:
+        shared.pop("summary", None)
+    return {**config, "shared_stages": shared} if shared else dict(config)
+
+
+def compute_shared_stages(
+    analysis_context: str,
+    config: Dict[str, Any],
+    stages: Iterable[str] = ("notes",),
+) -> Dict[str, Any]:
+    """
+    Führt Reader (und optional Summarizer) einmal vorab aus.
+
+    Für parallele Vergleiche. Engines warten dann nicht aufeinander, sondern
+    starten alle mit denselben Notes. Zeiten und Cache-Zähler kommen mit
+    zurück, damit UI die geteilten Kosten separat zeigen kann.
+    """
+    stages = [s for s in stages if s in SHAREABLE_STAGES]
+    configure(config)
+    result: Dict[str, Any] = {"reader_s": 0.0, "summarizer_s": 0.0}
+    with track(config) as cache_stats, track_usage(config) as usage_stats:
+        start = perf_counter()
+        result["notes"] = run_reader_with_config(analysis_context, config)
+        result["reader_s"] = round(perf_counter() - start, 2)
+        if "summary" in stages and _usable(result["notes"]):
+            start = perf_counter()
+            result["summary"] = run_summarizer(result["notes"])
+            result["summarizer_s"] = round(perf_counter() - start, 2)
+    result.update(cache_stats.as_row())
+    result.update(usage_stats.as_row())
+    return result
+
+
+def reused_row(reused: List[str]) -> Dict[str, str]:
+    """Telemetrie-Spalte. Immer gesetzt, damit CSV-Header stabil bleibt."""
+    return {"reused_stages": ",".join(reused)}
+
+
+def reused_label(stage_name: str) -> str:
+    return f"{stage_name} (reused)"
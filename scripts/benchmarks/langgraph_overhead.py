@@ -0,0 +1,154 @@
+"""
+Benchmark für Graph-Overhead der LangGraph-Pipeline, mit Stub-LLM.
+
+Beispiel (aus Projekt-Root):
+    python scripts/benchmarks/langgraph_overhead.py --runs 20 --scale 1,10
+
+Stub antwortet sofort mit festen Texten, gemessen wird also nur, was
+LangGraph und die Nodes selbst kosten. Drei Zahlen:
+- Bauen + Kompilieren des Graphen (früher bei jedem Lauf)
+- Lauf mit neu gebautem Graphen gegen Lauf mit Graph aus Cache
+- Zeichen, die pro Schritt in den State geschrieben werden: ganzer State
+  (früheres Verhalten, jede Node gab alles zurück) gegen Teil-Updates
+Korpus ist das erste Paper aus local_cache/pdf_text/*.txt, scale N hängt
+es N-mal an sich selbst.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import statistics
+import sys
+from time import perf_counter
+from typing import Any, List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+sys.path.insert(0, os.path.join(ROOT, "app"))
+# llm erzeugt beim Import einen Client, braucht dafür irgendeinen Key
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+
+import llm  # noqa: E402
+from utils import build_analysis_context  # noqa: E402
+from workflows import langgraph_pipeline as lg  # noqa: E402
+
+NOTES = (
+    "Title: Benchmark Paper\nObjective: Measure things.\nMethods: stub\nDatasets/Corpora: none\n"
+    "Results:\n- Acc=90.1\nMetrics (BLEU/F1/Acc/etc): Acc\nLimitations: synthetic\n"
+)
+SUMMARY = (
+    "Title: Benchmark Paper\nObjective: Measure things.\nMethod: stub\nResults: Acc=90.1\n"
+    "Limitations: synthetic\nPractical Takeaways:\n- a\n- b\n- c"
+)
+CRITIC = "Makes sense: 4\nAccuracy: 4\nCoverage: 4\nDetails: 4\nImprovements:\n- none"
+META = "Title: Benchmark Paper\nConfidence: High - stub."
+
+
+class StubChat(BaseChatModel):
+    """Antwortet je nach Prompt mit festem Text, ohne Netz."""
+
+    model_name: str = "stub"
+    temperature: float = 0.0
+    max_tokens: int = 256
+    openai_api_base: str = ""
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _answer(self, messages: List[Any]) -> str:
+        text = "\n".join(str(m.content) for m in messages)
+        if "careful scientific note-taker" in text or "partial notes" in text.lower():
+            return NOTES
+        if "Judge SUMMARY against NOTES" in text:
+            return CRITIC
+        if "final Meta Summary" in text:
+            return META
+        return SUMMARY
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        yield ChatGenerationChunk(message=AIMessageChunk(content=self._answer(messages)))
+
+
+def _load_paper() -> str:
+    paths = sorted(glob.glob(os.path.join(ROOT, "local_cache", "pdf_text", "*.txt")))
+    if paths:
+        with open(paths[0], "r", encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    return ("Introduction\nWe study things. Results show Acc 90.1 on the test set.\n\n" * 400)
+
+
+def _timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = perf_counter()
+        fn()
+        samples.append(perf_counter() - start)
+    return statistics.median(samples)
+
+
+def _written_chars(text: str, config: dict) -> tuple:
+    """
+    (Zeichen bei ganzem State pro Schritt wie früher, Zeichen bei Teil-Updates).
+
+    Früher blieben input_text und analysis_context bis zum Ende im State und
+    jede Node gab ganzen State zurück. Für den alten Wert zählen beide daher
+    in jedem Schritt mit voller Länge.
+    """
+    workflow = lg._get_workflow(lg._graph_variant(config))
+    carried = len(text) + len(build_analysis_context(text, config))
+    full = partial = 0
+    for update in workflow.stream(lg._initial_state(text, config), stream_mode="updates"):
+        for node_update in update.values():
+            partial += sum(len(str(v)) for v in (node_update or {}).values())
+    for index, values in enumerate(workflow.stream(lg._initial_state(text, config), stream_mode="values")):
+        if index == 0:
+            continue  # Eingabe, kein Node-Schritt
+        full += carried + sum(
+            len(str(v)) for k, v in values.items() if k not in ("_config", "input_text", "analysis_context")
+        )
+    return full, partial
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--scale", default="1,10")
+    args = parser.parse_args()
+
+    stub = StubChat()
+    llm._client_for = lambda settings: stub
+    config = {"llm_cache": False, "csv_telemetry": False, "preprocess_cache": False}
+    paper = _load_paper()
+
+    compile_s = _timed(lambda: lg._build_langgraph_workflow(), args.runs)
+    print(f"build + compile: {compile_s * 1000:.1f} ms")
+
+    for scale in [int(s) for s in args.scale.split(",") if s.strip()]:
+        text = paper * scale
+
+        def _fresh_graph() -> None:
+            lg._compiled_workflows.clear()
+            lg.run_pipeline(text, config)
+
+        lg.run_pipeline(text, config)  # Warmlauf, Imports und Cache
+        fresh_s = _timed(_fresh_graph, args.runs)
+        cached_s = _timed(lambda: lg.run_pipeline(text, config), args.runs)
+        full, partial = _written_chars(text, config)
+        print(
+            f"{len(text):>9} chars  run (graph rebuilt): {fresh_s * 1000:7.1f} ms  "
+            f"run (cached graph): {cached_s * 1000:7.1f} ms  "
+            f"state written per run: {full:>9} chars (whole state) vs {partial:>7} (partial updates)"
+        )
+
+
+if __name__ == "__main__":
+    main()
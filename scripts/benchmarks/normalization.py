@@ -0,0 +1,128 @@
+"""
+Micro-Benchmark für Vorverarbeitung: alte Regex-Kette gegen utils._preprocess.
+
+Beispiel (aus Projekt-Root):
+    python scripts/benchmarks/normalization.py --repeat 5 --scale 1,10,50
+
+Korpus ist local_cache/pdf_text/*.txt. scale N hängt jedes Paper N-mal an
+sich selbst, simuliert also lange Eingaben (Bücher, Sammelbände). Prüft
+vorher, dass beide Varianten identische Ausgabe liefern, sonst Abbruch.
+Alte Kette steht unten als Referenz, so wie sie vor dem Umbau in utils war.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import re
+import sys
+from time import perf_counter
+from typing import List
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+from utils import build_analysis_context  # noqa: E402
+
+
+# Referenz: alte Implementierung
+
+
+def _legacy_normalize(raw_text: str) -> str:
+    if not raw_text:
+        return ""
+    text = raw_text
+    text = re.sub(r"(\w)-\s*\n\s*(\w)", r"\1\2", text)
+    text = re.sub(r"(?<!\n)\n(?!\n)", "\n", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    text = "\n".join([line.rstrip() for line in text.splitlines()])
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+_LEGACY_META = r"(?:university|institute|faculty|department|school of|affiliation|corresponding author|preprint|arxiv|doi|copyright|acknowledg(e)?ments?)"
+
+
+def _legacy_strip_meta_head(raw_text: str) -> str:
+    if not raw_text:
+        return ""
+    lines = raw_text.splitlines()
+    cleaned: List[str] = []
+    for line in lines[:200]:
+        s = line.strip()
+        if not s:
+            continue
+        if re.fullmatch(r"(abstract|ABSTRACT)", s):
+            cleaned.append("Abstract")
+            continue
+        if re.search(r"@|orcid\.org|https?://", s, re.I):
+            continue
+        if re.search(_LEGACY_META, s, re.I):
+            continue
+        if s.isupper() and len(s) > 6:
+            continue
+        if re.match(r"^[A-Z][a-z]+(?: [A-Z]\.)?(?: [A-Z][a-z]+)+(?:, [A-Z][a-z]+.*)*$", s):
+            continue
+        if re.search(r"(proceedings of|iclr|neurips|icml|acl|emnlp)\b", s, re.I):
+            continue
+        cleaned.append(line)
+    cleaned.extend(lines[200:])
+    return _legacy_normalize("\n".join(cleaned))
+
+
+def _legacy_strip_references_tail(raw_text: str) -> str:
+    if not raw_text:
+        return ""
+    match = re.search(r"\n\s*(references|bibliography)\s*\n", raw_text, re.I)
+    if match and len(raw_text) - match.start() > 800:
+        return raw_text[:match.start()].rstrip()
+    return raw_text
+
+
+def legacy_build_analysis_context(raw_text: str) -> str:
+    text = _legacy_normalize(raw_text or "")
+    text = _legacy_strip_meta_head(text)
+    return _legacy_strip_references_tail(text)
+
+
+def _best_of(fn, texts: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark text preprocessing.")
+    parser.add_argument("--corpus", default=os.path.join(ROOT, "local_cache", "pdf_text"))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scale", default="1,10,50", help="Comma-separated size multipliers")
+    args = parser.parse_args(argv)
+
+    corpus = [open(p, encoding="utf-8").read() for p in sorted(glob.glob(os.path.join(args.corpus, "*.txt")))]
+    if not corpus:
+        print(f"No .txt files in {args.corpus}", file=sys.stderr)
+        return 1
+    for text in corpus:
+        if legacy_build_analysis_context(text) != build_analysis_context(text, {}):
+            print("Output differs from legacy implementation", file=sys.stderr)
+            return 1
+
+    for scale in [int(s) for s in args.scale.split(",") if s.strip()]:
+        texts = [("\n\n".join([text] * scale)) for text in corpus]
+        chars = sum(len(t) for t in texts)
+        legacy_s = _best_of(legacy_build_analysis_context, texts, args.repeat)
+        new_s = _best_of(lambda t: build_analysis_context(t, {}), texts, args.repeat)
+        print(
+            f"scale={scale:<3} chars={chars:>10,} legacy={legacy_s * 1000:8.1f}ms "
+            f"new={new_s * 1000:8.1f}ms speedup={legacy_s / new_s:4.2f}x"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,58 @@
+"""
+Benchmark für PDF-Extraktion: sequenziell gegen seitenparallel.
+
+Beispiel (aus Projekt-Root):
+    python scripts/benchmarks/pdf_extraction.py test_papers/ --workers 1,2,4
+
+Gibt pro Datei und Worker-Zahl Gesamtzeit, Seiten pro Sekunde, langsamste
+Seiten und pypdf-Fallbacks aus. Läuft ohne Cache, misst also echte Extraktion.
+Erster parallele Lauf enthält Start vom Prozess-Pool, daher Warmup-Lauf.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "app"))
+
+from documents import extract_pdf_pages  # noqa: E402
+
+
+def _pdf_paths(source: str):
+    if os.path.isdir(source):
+        return [os.path.join(source, n) for n in sorted(os.listdir(source)) if n.lower().endswith(".pdf")]
+    return [source]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark page-parallel PDF extraction.")
+    parser.add_argument("source", help="PDF file or directory with PDFs")
+    parser.add_argument("--workers", default="1,4", help="Comma-separated worker counts")
+    parser.add_argument("--slowest", type=int, default=3, help="Show N slowest pages")
+    args = parser.parse_args(argv)
+    worker_counts = [int(w) for w in args.workers.split(",") if w.strip()]
+
+    for path in _pdf_paths(args.source):
+        with open(path, "rb") as f:
+            data = f.read()
+        texts = {}
+        for workers in worker_counts:
+            if workers > 1:
+                extract_pdf_pages(data, workers)  # Warmup: Pool starten
+            text, stats = extract_pdf_pages(data, workers)
+            texts[workers] = text
+            slowest = sorted(enumerate(stats.get("page_s", []), 1), key=lambda p: p[1], reverse=True)[: args.slowest]
+            print(
+                f"{os.path.basename(path)} workers={stats.get('workers')} pages={stats.get('pages')} "
+                f"total={stats.get('total_s')}s pages/s={stats.get('pages_per_s')} "
+                f"slowest={[(page, round(s, 3)) for page, s in slowest]} fallback={stats.get('fallback_pages')}"
+            )
+        if len(set(texts.values())) > 1:
+            print(f"  WARNING: output differs between worker counts for {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))